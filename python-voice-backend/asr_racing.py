@@ -0,0 +1,169 @@
+"""
+Hedged ASR orchestration
+Starts the primary transcription provider and, if it has not answered within
+a hedge delay learned from its own latency history, races a secondary
+provider against it. The first successful transcript wins; the loser is
+cancelled
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from audio_input import AudioClip, shared_clips
+
+Transcriber = Callable[[AudioClip], Awaitable[str]]
+
+
+class LatencyHistogram:
+    """Rolling window of recent latencies with fixed buckets for export"""
+
+    BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, float("inf"))
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self.bucket_counts = [0] * len(self.BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        for i, bound in enumerate(self.BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        return float(np.quantile(np.fromiter(self._samples, dtype=float), q))
+
+    def snapshot(self) -> Dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([str(b) for b in self.BUCKETS], self.bucket_counts)),
+        }
+
+
+class HedgedASR:
+    """
+    Race ASR providers with a hedge delay.
+
+    Args:
+        providers: Ordered (name, transcriber) pairs; the first is the primary
+        hedge_quantile: Primary latency quantile used as the hedge delay
+        default_delay: Hedge delay until enough latency samples exist
+        min_delay / max_delay: Bounds for the learned delay
+        min_samples: Samples required before the learned delay is used
+    """
+
+    def __init__(
+        self,
+        providers: List[Tuple[str, Transcriber]],
+        hedge_quantile: float = 0.95,
+        default_delay: float = 2.0,
+        min_delay: float = 0.3,
+        max_delay: float = 6.0,
+        min_samples: int = 20,
+    ):
+        if not providers:
+            raise ValueError("At least one ASR provider is required")
+        self.providers = providers
+        self.hedge_quantile = hedge_quantile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.latency = {name: LatencyHistogram() for name, _ in providers}
+        self._counters = {"requests": 0, "hedges": 0, "failovers": 0, "cancelled": 0}
+        self._wins = {name: 0 for name, _ in providers}
+
+    def hedge_delay(self) -> float:
+        """Current delay before the secondary provider is started"""
+        primary = self.latency[self.providers[0][0]]
+        if len(primary._samples) < self.min_samples:
+            return self.default_delay
+        learned = primary.quantile(self.hedge_quantile)
+        return min(max(learned, self.min_delay), self.max_delay)
+
+    async def transcribe(self, clip: AudioClip) -> Tuple[str, str]:
+        """
+        Transcribe `clip`, hedging across providers.
+
+        Returns:
+            (transcript, name of the provider that produced it)
+        """
+        self._counters["requests"] += 1
+        # Every racer gets its own reader over the audio, so a racer reading
+        # the upload doesn't move the others' position
+        clips = shared_clips(clip, len(self.providers)) if len(self.providers) > 1 else [clip]
+
+        running: Dict[asyncio.Task, str] = {}
+        pending = list(self.providers)
+        last_error: Optional[BaseException] = None
+
+        def launch():
+            name, transcriber = pending.pop(0)
+            task = asyncio.create_task(self._timed(name, transcriber, clips.pop(0)))
+            # A racer that fails after the winner is picked (or in the same
+            # wakeup) still has its exception retrieved
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            running[task] = name
+
+        launch()
+        try:
+            while running:
+                timeout = self.hedge_delay() if pending else None
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Primary is slow: hedge with the next provider
+                    self._counters["hedges"] += 1
+                    launch()
+                    continue
+                for task in done:
+                    name = running.pop(task)
+                    if task.exception() is None:
+                        self._wins[name] += 1
+                        return task.result(), name
+                    last_error = task.exception()
+                    print(f"ASR provider {name} failed: {last_error}")
+                if pending and not running:
+                    # Everything in flight failed: fail over without waiting
+                    self._counters["failovers"] += 1
+                    launch()
+            raise last_error or RuntimeError("All ASR providers failed")
+        finally:
+            for task in running:
+                if not task.done():
+                    task.cancel()
+                    self._counters["cancelled"] += 1
+
+    async def _timed(self, name: str, transcriber: Transcriber, clip: AudioClip) -> str:
+        started = time.perf_counter()
+        try:
+            transcript = await transcriber(clip)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.latency[name].errors += 1
+            raise
+        self.latency[name].observe(time.perf_counter() - started)
+        return transcript
+
+    def stats(self) -> Dict:
+        return {
+            **self._counters,
+            "wins": dict(self._wins),
+            "hedge_delay": self.hedge_delay(),
+            "latency": {name: histogram.snapshot() for name, histogram in self.latency.items()},
+        }
@@ -0,0 +1,188 @@
+"""
+Audio input adapters
+Lets the transcription APIs take audio as a path, bytes, memoryview, file
+object or async iterator without first copying it into a temp file
+"""
+
+import io
+import os
+import threading
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator, BinaryIO, List, Optional, Union
+
+CHUNK_SIZE = 64 * 1024
+
+AudioInput = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO, AsyncIterable[bytes]]
+
+
+@dataclass
+class AudioClip:
+    """Audio plus the metadata upstream transcription APIs need"""
+    data: AudioInput
+    filename: str = "audio.webm"
+    content_type: str = "audio/webm"
+    seconds: Optional[float] = None  # duration, when the container says
+
+
+class BufferReader(io.RawIOBase):
+    """Read-only, seekable file object over an in-memory buffer (no copy)"""
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview]):
+        super().__init__()
+        self._view = memoryview(data).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        n = min(len(buffer), len(self._view) - self._pos)
+        buffer[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else min(self._pos + size, len(self._view))
+        chunk = self._view[self._pos:end].tobytes()
+        self._pos = end
+        return chunk
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self) -> None:
+        self._view.release()
+        super().close()
+
+
+def is_async_stream(audio) -> bool:
+    return hasattr(audio, "__aiter__")
+
+
+def as_file(audio: AudioInput) -> BinaryIO:
+    """
+    Return a file object for any non-async audio input.
+
+    Paths are opened (the caller closes the result); in-memory buffers are
+    wrapped without copying; file objects are rewound and returned as-is.
+    """
+    if isinstance(audio, (str, os.PathLike)):
+        return open(audio, "rb")
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return BufferReader(audio)
+    if hasattr(audio, "read"):
+        if hasattr(audio, "seek"):
+            audio.seek(0)
+        return audio
+    raise TypeError(f"Unsupported audio input: {type(audio).__name__}")
+
+
+def input_filename(audio: AudioInput, default: str = "audio.webm") -> str:
+    if isinstance(audio, (str, os.PathLike)):
+        return os.path.basename(os.fspath(audio))
+    name = getattr(audio, "name", None)
+    if isinstance(name, str) and name:
+        return os.path.basename(name)
+    return default
+
+
+async def iter_chunks(audio: AudioInput, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Yield the audio as byte chunks, whatever form it arrives in"""
+    if is_async_stream(audio):
+        async for chunk in audio:
+            if chunk:
+                yield bytes(chunk)
+        return
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        view = memoryview(audio).cast("B")
+        for start in range(0, len(view), chunk_size):
+            yield view[start:start + chunk_size].tobytes()
+        return
+    owned = isinstance(audio, (str, os.PathLike))
+    f = as_file(audio)
+    try:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        if owned:
+            f.close()
+
+
+class SharedFileReader(io.RawIOBase):
+    """
+    Read-only file object with its own position over a file other readers
+    share (no copy). Each read seeks the shared file under `lock`, so readers
+    in different threads don't move each other's position.
+    """
+
+    def __init__(self, f: BinaryIO, lock: threading.Lock):
+        super().__init__()
+        self._file = f
+        self._lock = lock
+        self._pos = 0
+        self.name = getattr(f, "name", None)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        with self._lock:
+            self._file.seek(self._pos)
+            chunk = self._file.read(-1 if size is None else size)
+        self._pos += len(chunk)
+        return chunk
+
+    def readinto(self, buffer) -> int:
+        chunk = self.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_END:
+            with self._lock:
+                base = self._file.seek(0, io.SEEK_END)
+        else:
+            base = self._pos if whence == io.SEEK_CUR else 0
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+def shared_clips(clip: AudioClip, count: int) -> List[AudioClip]:
+    """
+    Return `count` clips that can be read concurrently, without copying the audio.
+
+    In-memory buffers and paths are already shareable (each consumer wraps
+    its own BufferReader or opens its own handle); a file object gets one
+    SharedFileReader per consumer.
+    """
+    if isinstance(clip.data, (str, os.PathLike, bytes, bytearray, memoryview)):
+        return [clip] * count
+    if is_async_stream(clip.data):
+        raise TypeError("Async audio streams can only be consumed once")
+    lock = threading.Lock()
+    return [
+        AudioClip(
+            data=SharedFileReader(clip.data, lock),
+            filename=clip.filename,
+            content_type=clip.content_type,
+            seconds=clip.seconds,
+        )
+        for _ in range(count)
+    ]
@@ -0,0 +1,184 @@
+"""
+TTS output format negotiation
+Picks the delivery encoding for synthesized speech from client hints (an
+explicit format, the audio types the client plays, Save-Data and the effective
+connection type) and transcodes locally when a provider can't produce it
+"""
+
+import os
+import subprocess
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from audio_preprocess import FFMPEG, OPUS_BITRATE
+
+# Both providers emit raw PCM as signed 16-bit little-endian mono at this rate
+PCM_RATE = 24000
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    name: str
+    media_type: str
+    sample_rate: int
+    bitrate: Optional[int] = None  # bits/s; None for PCM
+
+
+FORMATS = {
+    "mp3": AudioFormat("mp3", "audio/mpeg", 24000, 128000),
+    "mp3_low": AudioFormat("mp3_low", "audio/mpeg", 16000, 32000),
+    "opus": AudioFormat("opus", "audio/ogg; codecs=opus", 24000, int(OPUS_BITRATE.rstrip("k")) * 1000),
+    "pcm": AudioFormat("pcm", f"audio/pcm; rate={PCM_RATE}; channels=1", PCM_RATE),
+}
+
+# Formats each provider renders itself; anything else is encoded from its PCM
+PROVIDER_FORMATS = {
+    "openai": ("mp3", "opus", "pcm"),
+    "minimax": ("mp3", "mp3_low", "pcm"),
+}
+
+# Nearest natively rendered substitute when ffmpeg isn't installed
+FALLBACKS = {"opus": ("mp3_low", "mp3"), "mp3_low": ("mp3",)}
+
+# Accept media types -> format; wildcards don't count as asking for audio
+ACCEPT_TYPES = {
+    "audio/ogg": "opus",
+    "audio/opus": "opus",
+    "audio/mpeg": "mp3",
+    "audio/mp3": "mp3",
+    "audio/pcm": "pcm",
+    "audio/l16": "pcm",
+}
+
+# Equal q-values prefer the smaller encoding
+PREFERENCE = ("opus", "mp3", "pcm")
+
+SLOW_CONNECTIONS = {"slow-2g", "2g", "3g"}
+SLOW_DOWNLINK_MBPS = 1.0
+
+_ENCODERS = {
+    "opus": ["-c:a", "libopus", "-application", "voip", "-f", "ogg"],
+    "mp3": ["-c:a", "libmp3lame", "-f", "mp3"],
+    "mp3_low": ["-c:a", "libmp3lame", "-f", "mp3"],
+}
+
+
+def default_format() -> AudioFormat:
+    """Format for clients that send no hints (TTS_OUTPUT_FORMAT, mp3 by default)"""
+    return FORMATS[os.getenv("TTS_OUTPUT_FORMAT", "mp3")]
+
+
+def parse_accept(accept: Optional[str]) -> Dict[str, float]:
+    """Audio formats listed in an Accept header with their q-values (q=0 excluded)"""
+    accepted: Dict[str, float] = {}
+    for media_range in (accept or "").split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        name = ACCEPT_TYPES.get(media_type.lower())
+        if name is None:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted[name] = max(q, accepted.get(name, 0.0))
+    return accepted
+
+
+def constrained_network(save_data: Optional[str], ect: Optional[str], downlink: Optional[str]) -> bool:
+    """True when the client asked to save data or reports a slow connection"""
+    if (save_data or "").strip().lower() == "on":
+        return True
+    if (ect or "").strip().lower() in SLOW_CONNECTIONS:
+        return True
+    try:
+        return downlink is not None and float(downlink) < SLOW_DOWNLINK_MBPS
+    except ValueError:
+        return False
+
+
+def negotiate(
+    requested: Optional[str] = None,
+    accept: Optional[str] = None,
+    save_data: Optional[str] = None,
+    ect: Optional[str] = None,
+    downlink: Optional[str] = None,
+) -> AudioFormat:
+    """
+    Choose the output format for one turn.
+
+    Args:
+        requested: Explicit format name (mp3, mp3_low, opus, pcm); wins outright
+        accept: Accept-style list of playable audio types
+        save_data, ect, downlink: Save-Data / ECT / Downlink client hint values
+
+    Returns:
+        The AudioFormat to deliver; MP3 becomes low-bitrate MP3 on a
+        constrained connection
+
+    Raises:
+        ValueError: `requested` is not a known format
+    """
+    if requested:
+        if requested not in FORMATS:
+            raise ValueError(f"Unknown audio format: {requested}. Allowed: {', '.join(FORMATS)}")
+        return FORMATS[requested]
+
+    accepted = parse_accept(accept)
+    if accepted:
+        name = max(accepted, key=lambda n: (accepted[n], -PREFERENCE.index(n)))
+    else:
+        name = default_format().name
+
+    if name == "mp3" and constrained_network(save_data, ect, downlink):
+        name = "mp3_low"
+    return FORMATS[name]
+
+
+def plan(provider: str, requested: AudioFormat) -> Tuple[AudioFormat, AudioFormat]:
+    """
+    (format to request from `provider`, format delivered to the client).
+
+    Formats the provider can't render are encoded from its PCM, so there is
+    only one lossy pass. Without ffmpeg the nearest native format is
+    delivered instead.
+    """
+    native = PROVIDER_FORMATS[provider]
+    if requested.name in native:
+        return requested, requested
+    if FFMPEG:
+        return FORMATS["pcm"], requested
+    for name in FALLBACKS.get(requested.name, ()):
+        if name in native:
+            return FORMATS[name], FORMATS[name]
+    return FORMATS["mp3"], FORMATS["mp3"]
+
+
+def minimax_audio_setting(fmt: AudioFormat) -> Dict:
+    """T2A v2 `audio_setting` that renders `fmt` directly"""
+    setting = {"format": "pcm" if fmt.name == "pcm" else "mp3", "sample_rate": fmt.sample_rate, "channel": 1}
+    if fmt.bitrate:
+        setting["bitrate"] = fmt.bitrate
+    return setting
+
+
+def openai_response_format(fmt: AudioFormat) -> str:
+    """OpenAI speech `response_format` for a natively rendered format (Opus comes in Ogg)"""
+    return fmt.name if fmt.name in ("opus", "pcm") else "mp3"
+
+
+def transcode(pcm: bytes, target: AudioFormat) -> bytes:
+    """Encode provider PCM (s16le mono at PCM_RATE) to `target` with ffmpeg"""
+    if target.name == "pcm":
+        return pcm
+    result = subprocess.run(
+        [FFMPEG, "-hide_banner", "-loglevel", "error",
+         "-f", "s16le", "-ar", str(PCM_RATE), "-ac", "1", "-i", "pipe:0",
+         "-ar", str(target.sample_rate), "-b:a", str(target.bitrate), *_ENCODERS[target.name], "pipe:1"],
+        input=pcm, capture_output=True, check=True,
+    )
+    return result.stdout
@@ -0,0 +1,223 @@
+"""
+Server-side audio preprocessing before ASR
+Decodes the upload, trims leading/trailing silence with an energy VAD,
+downmixes to 16kHz mono and re-encodes compactly (Opus when ffmpeg is
+available, otherwise 16-bit WAV) so less audio is uploaded and transcribed
+"""
+
+import io
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from audio_input import CHUNK_SIZE, AudioClip, as_file
+
+TARGET_RATE = 16000
+FRAME_MS = 20
+PAD_MS = 200  # keep a little context around detected speech
+OPUS_BITRATE = "24k"
+
+FFMPEG = shutil.which("ffmpeg")
+
+# WAV sample width -> (dtype, offset, full scale); 8-bit WAV is unsigned
+_WAV_FORMATS = {1: (np.uint8, 128.0, 128.0), 2: ("<i2", 0.0, 32768.0), 4: ("<i4", 0.0, 2147483648.0)}
+
+
+@dataclass
+class PreprocessResult:
+    clip: AudioClip
+    input_bytes: int
+    output_bytes: int
+    input_seconds: float
+    output_seconds: float
+    elapsed_ms: float
+
+
+def decode_wav(source):
+    """
+    Decode PCM WAV with the stdlib; returns (float32 samples [n, channels], rate).
+
+    `source` is bytes or a readable file object; frames are read in chunks,
+    so the encoded audio is never copied whole.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    with wave.open(source) as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        total = wav.getnframes()
+        if width not in _WAV_FORMATS:
+            raise ValueError(f"Unsupported WAV sample width: {width}")
+        dtype, offset, scale = _WAV_FORMATS[width]
+        samples = np.empty(total * channels, dtype=np.float32)
+        filled = 0
+        chunk_frames = max(CHUNK_SIZE // (width * channels), 1)
+        while filled < len(samples):
+            frames = wav.readframes(chunk_frames)
+            if not frames:
+                break
+            block = np.frombuffer(frames, dtype=dtype)
+            samples[filled:filled + len(block)] = (block.astype(np.float32) - offset) / scale
+            filled += len(block)
+    return samples[:filled - filled % channels].reshape(-1, channels), rate
+
+
+def decode_ffmpeg(source) -> np.ndarray:
+    """
+    Decode any container/codec ffmpeg understands straight to 16kHz mono float32.
+
+    `source` is bytes or a readable file object, fed to ffmpeg's stdin in
+    chunks from a writer thread while its output is read.
+    """
+    reader = as_file(source)
+    process = subprocess.Popen(
+        [FFMPEG, "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+         "-ac", "1", "-ar", str(TARGET_RATE), "-f", "f32le", "pipe:1"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+
+    def feed():
+        try:
+            while True:
+                chunk = reader.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                process.stdin.write(chunk)
+        except (BrokenPipeError, OSError):
+            pass  # ffmpeg exited early; its return code reports why
+        finally:
+            process.stdin.close()
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    output = process.stdout.read()
+    writer.join()
+    if process.wait() != 0:
+        raise subprocess.CalledProcessError(process.returncode, process.args)
+    return np.frombuffer(output, dtype="<f4")
+
+
+def downmix(samples: np.ndarray) -> np.ndarray:
+    return samples.mean(axis=1) if samples.ndim == 2 else samples
+
+
+def resample(samples: np.ndarray, rate: int, target: int = TARGET_RATE) -> np.ndarray:
+    """
+    Resample mono audio.
+
+    Integer downsampling ratios (48k/16k, 32k/16k) average blocks of samples,
+    which doubles as a cheap anti-alias filter; other ratios interpolate.
+    """
+    if rate == target or len(samples) == 0:
+        return samples
+    if rate > target and rate % target == 0:
+        factor = rate // target
+        usable = len(samples) - len(samples) % factor
+        return samples[:usable].reshape(-1, factor).mean(axis=1)
+    positions = np.arange(0, len(samples), rate / target)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def trim_silence(samples: np.ndarray, rate: int = TARGET_RATE, threshold_ratio: float = 3.0,
+                 min_level: float = 1e-3) -> np.ndarray:
+    """
+    Drop leading and trailing silence using frame RMS energy.
+
+    The noise floor is the 10th percentile of frame energy; frames louder than
+    `threshold_ratio` times the floor count as speech. Clips with no speech
+    are returned unchanged so the ASR provider makes the final call.
+    """
+    frame = rate * FRAME_MS // 1000
+    count = len(samples) // frame
+    if count < 3:
+        return samples
+    frames = samples[:count * frame].reshape(count, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    threshold = max(np.percentile(rms, 10) * threshold_ratio, min_level)
+    voiced = np.flatnonzero(rms > threshold)
+    if len(voiced) == 0:
+        return samples
+    pad = PAD_MS // FRAME_MS
+    start = max(voiced[0] - pad, 0) * frame
+    end = min((voiced[-1] + 1 + pad) * frame, len(samples))
+    return samples[start:end]
+
+
+def encode(samples: np.ndarray, rate: int = TARGET_RATE):
+    """Encode mono float32 audio; returns (bytes, filename, content_type)"""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+    if FFMPEG:
+        result = subprocess.run(
+            [FFMPEG, "-hide_banner", "-loglevel", "error",
+             "-f", "s16le", "-ar", str(rate), "-ac", "1", "-i", "pipe:0",
+             "-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip",
+             "-f", "ogg", "pipe:1"],
+            input=pcm, capture_output=True, check=True,
+        )
+        return result.stdout, "audio.ogg", "audio/ogg"
+
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm)
+    return out.getvalue(), "audio.wav", "audio/wav"
+
+
+def preprocess(clip: AudioClip) -> Optional[PreprocessResult]:
+    """
+    Run the full preprocessing stage on a clip.
+
+    Returns None when the clip cannot be decoded locally (e.g. WebM without
+    ffmpeg); callers should then send the original audio unchanged.
+    """
+    started = time.perf_counter()
+    reader = as_file(clip.data)
+    try:
+        # Only the header is read up front; the decoders stream the rest
+        reader.seek(0, io.SEEK_END)
+        input_bytes = reader.tell()
+        reader.seek(0)
+        header = reader.read(12)
+        reader.seek(0)
+
+        if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+            samples, rate = decode_wav(reader)
+            samples = resample(downmix(samples), rate)
+        elif FFMPEG:
+            samples = decode_ffmpeg(reader)
+        else:
+            return None
+
+        input_seconds = len(samples) / TARGET_RATE
+        samples = trim_silence(samples)
+        encoded, filename, content_type = encode(samples)
+    except (ValueError, EOFError, wave.Error, subprocess.CalledProcessError) as e:
+        print(f"Audio preprocessing skipped: {e}")
+        return None
+    finally:
+        if reader is not clip.data:
+            reader.close()
+        else:
+            reader.seek(0)
+
+    if len(encoded) >= input_bytes and len(samples) / TARGET_RATE >= input_seconds:
+        # Nothing gained; keep the client's encoding
+        return None
+
+    return PreprocessResult(
+        clip=AudioClip(data=encoded, filename=filename, content_type=content_type, seconds=len(samples) / TARGET_RATE),
+        input_bytes=input_bytes,
+        output_bytes=len(encoded),
+        input_seconds=input_seconds,
+        output_seconds=len(samples) / TARGET_RATE,
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+    )
@@ -0,0 +1,266 @@
+"""
+TTS audio artifact store
+Keeps synthesized replies in a byte-budgeted in-memory LRU with TTL, an
+optional disk spill tier and a background reaper, instead of leaving MP3s
+behind in the system temp directory. With a shared state backend, audio is
+also written through so any worker can serve it
+"""
+
+import asyncio
+import os
+import re
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from shared_state import StateBackend
+
+AUDIO_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+
+@dataclass
+class AudioArtifact:
+    data: bytes
+    media_type: str
+    expires_at: float
+
+
+class AudioStore:
+    """
+    In-process LRU store for generated audio.
+
+    Entries are evicted when they expire or when the total size exceeds
+    `max_bytes`. If `spill_dir` is set, entries evicted for space are written
+    to disk and still served until their TTL runs out; spill files older than
+    the TTL (left by a restarted or crashed worker) are removed when the
+    store is created. If `shared` is set,
+    entries are written through to it and local misses are looked up there;
+    request handlers use put_async/get_async so those blocking backend calls
+    run in a worker thread instead of on the event loop.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 900.0,
+        spill_dir: Optional[str] = None,
+        shared: Optional[StateBackend] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.spill_dir = spill_dir
+        self.shared = shared
+
+        self._entries: "OrderedDict[str, AudioArtifact]" = OrderedDict()
+        self._spilled: Dict[str, AudioArtifact] = {}  # data is b"" for spilled entries
+        self._bytes = 0
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "spills": 0, "spill_hits": 0,
+                          "shared_hits": 0, "stale_spills_removed": 0}
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._remove_stale_spills()
+
+    @classmethod
+    def from_env(cls, shared: Optional[StateBackend] = None) -> "AudioStore":
+        """Build a store from AUDIO_STORE_* environment variables"""
+        return cls(
+            max_bytes=int(float(os.getenv("AUDIO_STORE_MAX_MB", "64")) * 1024 * 1024),
+            ttl_seconds=float(os.getenv("AUDIO_STORE_TTL_SECONDS", "900")),
+            spill_dir=os.getenv("AUDIO_STORE_SPILL_DIR") or None,
+            shared=shared,
+        )
+
+    def put(self, data: bytes, media_type: str = "audio/mpeg") -> str:
+        """Store audio and return an opaque, unguessable ID"""
+        audio_id = self._put_local(data, media_type)
+        if self.shared is not None:
+            self.shared.put("audio", audio_id, data, self.ttl_seconds, media_type)
+        return audio_id
+
+    async def put_async(self, data: bytes, media_type: str = "audio/mpeg") -> str:
+        """put() for the event loop: the shared write-through runs in a worker thread"""
+        audio_id = self._put_local(data, media_type)
+        if self.shared is not None:
+            await asyncio.to_thread(self.shared.put, "audio", audio_id, data, self.ttl_seconds, media_type)
+        return audio_id
+
+    def get(self, audio_id: str) -> Optional[AudioArtifact]:
+        """Return the artifact for `audio_id`, or None if unknown or expired"""
+        artifact = self._get_local(audio_id)
+        if artifact is None and self.shared is not None:
+            artifact = self._from_shared(self.shared.get("audio", audio_id))
+        if artifact is None:
+            self._counters["misses"] += 1
+        return artifact
+
+    async def get_async(self, audio_id: str) -> Optional[AudioArtifact]:
+        """get() for the event loop: the shared lookup runs in a worker thread"""
+        artifact = self._get_local(audio_id)
+        if artifact is None and self.shared is not None:
+            artifact = self._from_shared(await asyncio.to_thread(self.shared.get, "audio", audio_id))
+        if artifact is None:
+            self._counters["misses"] += 1
+        return artifact
+
+    def reap(self) -> int:
+        """Remove expired entries from memory and disk; return how many were removed"""
+        removed = self._reap_local()
+        if self.shared is not None:
+            shared_removed = self.shared.reap()
+            self._counters["expired"] += shared_removed
+            removed += shared_removed
+        return removed
+
+    async def run_reaper(self, interval: float = 30.0) -> None:
+        """Background task: periodically reap expired entries"""
+        while True:
+            await asyncio.sleep(interval)
+            self._reap_local()
+            if self.shared is not None:
+                self._counters["expired"] += await asyncio.to_thread(self.shared.reap)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **self._counters,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "spilled_entries": len(self._spilled),
+        }
+
+    def _put_local(self, data: bytes, media_type: str) -> str:
+        audio_id = secrets.token_urlsafe(24)
+        self._entries[audio_id] = AudioArtifact(data, media_type, time.monotonic() + self.ttl_seconds)
+        self._bytes += len(data)
+        self._enforce_budget()
+        return audio_id
+
+    def _from_shared(self, found: Optional[Tuple[bytes, str]]) -> Optional[AudioArtifact]:
+        # Written by another worker
+        if found is None:
+            return None
+        self._counters["shared_hits"] += 1
+        return AudioArtifact(found[0], found[1], time.monotonic() + self.ttl_seconds)
+
+    def _get_local(self, audio_id: str) -> Optional[AudioArtifact]:
+        now = time.monotonic()
+        artifact = self._entries.get(audio_id)
+        if artifact is not None:
+            if artifact.expires_at <= now:
+                self._drop(audio_id)
+                self._counters["expired"] += 1
+            else:
+                self._entries.move_to_end(audio_id)
+                self._counters["hits"] += 1
+                return artifact
+
+        spilled = self._spilled.get(audio_id)
+        if spilled is not None:
+            if spilled.expires_at <= now:
+                self._drop_spilled(audio_id)
+                self._counters["expired"] += 1
+            else:
+                try:
+                    with open(self._spill_path(audio_id), "rb") as f:
+                        data = f.read()
+                except OSError:
+                    self._spilled.pop(audio_id, None)
+                else:
+                    self._counters["spill_hits"] += 1
+                    return AudioArtifact(data, spilled.media_type, spilled.expires_at)
+        return None
+
+    def _reap_local(self) -> int:
+        now = time.monotonic()
+        expired = [key for key, artifact in self._entries.items() if artifact.expires_at <= now]
+        for key in expired:
+            self._drop(key)
+        expired_spilled = [key for key, artifact in self._spilled.items() if artifact.expires_at <= now]
+        for key in expired_spilled:
+            self._drop_spilled(key)
+        removed = len(expired) + len(expired_spilled)
+        self._counters["expired"] += removed
+        return removed
+
+    def _enforce_budget(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            audio_id, artifact = self._entries.popitem(last=False)
+            self._bytes -= len(artifact.data)
+            self._counters["evictions"] += 1
+            if self.spill_dir:
+                self._spill(audio_id, artifact)
+
+    def _spill(self, audio_id: str, artifact: AudioArtifact) -> None:
+        try:
+            with open(self._spill_path(audio_id), "wb") as f:
+                f.write(artifact.data)
+        except OSError as e:
+            print(f"Warning: audio spill to disk failed: {e}")
+            return
+        self._spilled[audio_id] = AudioArtifact(b"", artifact.media_type, artifact.expires_at)
+        self._counters["spills"] += 1
+
+    def _remove_stale_spills(self) -> None:
+        # Only files no worker can still serve: an entry expires ttl_seconds
+        # after it was stored, so a spill file older than that is dead in
+        # every worker sharing the directory
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            names = os.listdir(self.spill_dir)
+        except OSError as e:
+            print(f"Warning: could not list audio spill directory: {e}")
+            return
+        for name in names:
+            if not AUDIO_ID_PATTERN.match(name):
+                continue
+            path = self._spill_path(name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+                    self._counters["stale_spills_removed"] += 1
+            except OSError:
+                pass
+
+    def _spill_path(self, audio_id: str) -> str:
+        return os.path.join(self.spill_dir, audio_id)
+
+    def _drop(self, audio_id: str) -> None:
+        artifact = self._entries.pop(audio_id, None)
+        if artifact is not None:
+            self._bytes -= len(artifact.data)
+
+    def _drop_spilled(self, audio_id: str) -> None:
+        self._spilled.pop(audio_id, None)
+        try:
+            os.unlink(self._spill_path(audio_id))
+        except OSError:
+            pass
+
+
+def parse_range(range_header: Optional[str], size: int):
+    """
+    Parse a single-range `Range: bytes=...` header.
+
+    Returns:
+        (start, end) inclusive byte offsets, None when the header is absent or
+        not a bytes range, or raises ValueError if the range is unsatisfiable
+    """
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+    spec = range_header[len("bytes="):].split(",")[0].strip()
+    start_text, _, end_text = spec.partition("-")
+    if start_text:
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    else:
+        # Suffix range: the last N bytes
+        length = int(end_text)
+        if length <= 0:
+            raise ValueError("empty suffix range")
+        start, end = max(size - length, 0), size - 1
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise ValueError("unsatisfiable range")
+    return start, end
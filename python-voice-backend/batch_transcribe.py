@@ -0,0 +1,343 @@
+"""
+Batch transcription and Guardian scoring job
+Streams a directory or manifest of stored session audio through a bounded
+async pipeline (ASR with Minimax or Whisper, Guardian scoring in batches) and
+writes one record per clip to JSONL or Parquet, e.g. to backfill
+voice_sessions.wbc_score / risk_level. Completed clips are checkpointed, so an
+interrupted run can be resumed
+
+Usage:
+    python batch_transcribe.py sessions/ --output scores.jsonl
+    python batch_transcribe.py manifest.csv --provider openai --parallelism 16 --output scores.jsonl
+    python batch_transcribe.py sessions/ --format parquet --output scores/ --resume
+
+Manifests are CSV or JSONL with a `path` column and optional `id` /
+`session_id`; other columns are carried through to the output.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Set
+
+import numpy as np
+from dotenv import load_dotenv
+
+from audio_input import AudioClip
+from guardian_safety import GuardianSafety
+from upstream_limits import AdaptiveLimiter
+
+AUDIO_EXTENSIONS = {".webm": "audio/webm", ".wav": "audio/wav", ".mp3": "audio/mpeg",
+                    ".ogg": "audio/ogg", ".m4a": "audio/mp4"}
+
+
+@dataclass
+class BatchItem:
+    id: str
+    path: str
+    session_id: Optional[str] = None
+    extra: Dict = field(default_factory=dict)
+
+
+@dataclass
+class Transcribed:
+    item: BatchItem
+    transcript: Optional[str]
+    asr_seconds: float
+    audio_bytes: int
+    error: Optional[str] = None
+
+
+def iter_items(source: str) -> Iterator[BatchItem]:
+    """Audio files under a directory (sorted), or the rows of a CSV/JSONL manifest"""
+    if os.path.isdir(source):
+        for root, _, files in sorted(os.walk(source)):
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS:
+                    path = os.path.join(root, name)
+                    item_id = os.path.splitext(os.path.relpath(path, source))[0]
+                    yield BatchItem(id=item_id, path=path, session_id=os.path.basename(item_id))
+        return
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, newline="") as f:
+        rows = (json.loads(line) for line in f if line.strip()) if source.endswith(".jsonl") else csv.DictReader(f)
+        for row in rows:
+            path = row.pop("path")
+            if not os.path.isabs(path):
+                path = os.path.join(base, path)
+            session_id = row.pop("session_id", None)
+            item_id = str(row.pop("id", None) or session_id or path)
+            yield BatchItem(id=item_id, path=path, session_id=session_id, extra=row)
+
+
+class Checkpoint:
+    """Append-only list of completed item ids (one per line)"""
+
+    def __init__(self, path: str, resume: bool):
+        self.path = path
+        self.done: Set[str] = set()
+        if resume and os.path.exists(path):
+            with open(path) as f:
+                self.done = {line.rstrip("\n") for line in f if line.strip()}
+        elif os.path.exists(path):
+            os.remove(path)
+        self._file = open(path, "a")
+
+    def mark(self, ids: List[str]) -> None:
+        self._file.write("".join(f"{item_id}\n" for item_id in ids))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.done.update(ids)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class JSONLWriter:
+    def __init__(self, path: str, resume: bool):
+        self._file = open(path, "a" if resume else "w")
+
+    def write(self, records: List[Dict]) -> None:
+        self._file.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetWriter:
+    """
+    One Parquet part file per run inside the output directory, one row group
+    per scored batch (Parquet files cannot be appended to, so a resumed run
+    starts a new part)
+    """
+
+    def __init__(self, directory: str, resume: bool):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            sys.exit("Parquet output needs pyarrow: pip install pyarrow")
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        os.makedirs(directory, exist_ok=True)
+        parts = sorted(name for name in os.listdir(directory) if name.startswith("part-"))
+        if parts and not resume:
+            for name in parts:
+                os.remove(os.path.join(directory, name))
+            parts = []
+        self.path = os.path.join(directory, f"part-{len(parts):05d}.parquet")
+        self._writer = None
+
+    def write(self, records: List[Dict]) -> None:
+        table = self._pa.Table.from_pylist(records)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table.cast(self._writer.schema))
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+def build_transcriber(provider: str):
+    """Async `transcribe(clip) -> str` for the chosen provider"""
+    if provider == "minimax":
+        from minimax_service import AsyncMinimaxVoiceService
+        service = AsyncMinimaxVoiceService()
+
+        async def transcribe(clip: AudioClip) -> str:
+            return await service.speech_to_text(clip.data, filename=clip.filename, content_type=clip.content_type)
+
+        return transcribe, service.aclose
+
+    from openai import AsyncOpenAI
+    client = AsyncOpenAI(max_retries=0)
+
+    async def transcribe(clip: AudioClip) -> str:
+        result = await client.audio.transcriptions.create(
+            model="whisper-1", file=(clip.filename, clip.data, clip.content_type), response_format="text"
+        )
+        return result if isinstance(result, str) else result.text
+
+    return transcribe, client.close
+
+
+class Progress:
+    """Throughput counters, printed every `interval` seconds and at the end"""
+
+    def __init__(self, total: int, interval: float):
+        self.total = total
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.done = 0
+        self.failed = 0
+        self.audio_bytes = 0
+        self.asr_seconds: List[float] = []
+        self._last_report = self.started
+
+    def add(self, result: Transcribed) -> None:
+        if result.error:
+            self.failed += 1
+        else:
+            self.done += 1
+            self.audio_bytes += result.audio_bytes
+            self.asr_seconds.append(result.asr_seconds)
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            print(self.line())
+
+    def line(self) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        finished = self.done + self.failed
+        rate = finished / elapsed
+        eta = f"{(self.total - finished) / rate:.0f}s" if rate else "-"
+        return (f"{finished}/{self.total} clips ({self.failed} failed)  {rate:.1f} clips/s  "
+                f"{self.audio_bytes / elapsed / 2 ** 20:.2f} MB/s  eta {eta}")
+
+    def summary(self) -> Dict:
+        elapsed = time.perf_counter() - self.started
+        latencies = np.array(self.asr_seconds) * 1000
+        p50, p95 = np.percentile(latencies, [50, 95]) if len(latencies) else (float("nan"),) * 2
+        return {
+            "clips": self.done,
+            "failed": self.failed,
+            "seconds": round(elapsed, 2),
+            "clips_per_second": round((self.done + self.failed) / elapsed, 2) if elapsed else 0.0,
+            "audio_mb": round(self.audio_bytes / 2 ** 20, 2),
+            "asr_p50_ms": round(float(p50), 1),
+            "asr_p95_ms": round(float(p95), 1),
+        }
+
+
+async def run(args) -> Dict:
+    items = list(iter_items(args.source))
+    checkpoint = Checkpoint(args.checkpoint or f"{args.output.rstrip('/')}.checkpoint", args.resume)
+    pending = [item for item in items if item.id not in checkpoint.done]
+    print(f"{len(items)} clips, {len(items) - len(pending)} already done, {len(pending)} to process "
+          f"({args.provider}, parallelism {args.parallelism})")
+
+    writer = (ParquetWriter if args.format == "parquet" else JSONLWriter)(args.output, args.resume)
+    errors = open(f"{args.output.rstrip('/')}.errors.jsonl", "a" if args.resume else "w")
+    transcribe, close_transcriber = build_transcriber(args.provider)
+    limiter = AdaptiveLimiter(args.provider, initial_limit=args.parallelism, max_limit=args.parallelism,
+                              max_queue=args.parallelism * 2, max_wait=300.0)
+    guardian = GuardianSafety()
+    progress = Progress(len(pending), args.report_every)
+
+    # Bounded queues keep at most a few clips per worker in memory
+    todo: asyncio.Queue = asyncio.Queue(maxsize=args.parallelism * 2)
+    results: asyncio.Queue = asyncio.Queue(maxsize=args.batch_size * 2)
+
+    async def produce():
+        for item in pending:
+            await todo.put(item)
+        for _ in range(args.parallelism):
+            await todo.put(None)
+
+    async def asr_worker():
+        while (item := await todo.get()) is not None:
+            started = time.perf_counter()
+            size = 0
+            try:
+                with open(item.path, "rb") as f:
+                    data = f.read()
+                size = len(data)
+                ext = os.path.splitext(item.path)[1].lower()
+                clip = AudioClip(data, os.path.basename(item.path), AUDIO_EXTENSIONS.get(ext, "application/octet-stream"))
+                if args.preprocess:
+                    from audio_preprocess import preprocess
+                    prepared = await asyncio.to_thread(preprocess, clip)
+                    clip = prepared.clip if prepared else clip
+                transcript = await limiter.call(lambda: transcribe(clip))
+                await results.put(Transcribed(item, transcript.strip(), time.perf_counter() - started, size))
+            except Exception as e:
+                await results.put(Transcribed(item, None, time.perf_counter() - started, size,
+                                              f"{type(e).__name__}: {e}"))
+
+    def flush(batch: List[Transcribed]) -> None:
+        if not batch:
+            return
+        analyses = guardian.analyze_many([result.transcript for result in batch])
+        records = [{
+            "id": result.item.id,
+            "session_id": result.item.session_id,
+            "path": result.item.path,
+            **result.item.extra,
+            "transcript": result.transcript,
+            "wbc_score": analysis.wbc_score,
+            "risk_level": analysis.risk_level,
+            "crisis_detected": analysis.crisis_detected,
+            "requires_intervention": analysis.requires_intervention,
+            "provider": args.provider,
+            "asr_seconds": round(result.asr_seconds, 3),
+            "audio_bytes": result.audio_bytes,
+        } for result, analysis in zip(batch, analyses)]
+        # Records first, then the checkpoint: a crash in between re-processes
+        # the batch instead of losing it
+        writer.write(records)
+        checkpoint.mark([result.item.id for result in batch])
+        batch.clear()
+
+    async def score():
+        batch: List[Transcribed] = []
+        finished = 0
+        while finished < len(pending):
+            try:
+                result = await asyncio.wait_for(results.get(), timeout=args.flush_seconds)
+            except asyncio.TimeoutError:
+                flush(batch)
+                continue
+            finished += 1
+            progress.add(result)
+            if result.error:
+                errors.write(json.dumps({"id": result.item.id, "path": result.item.path, "error": result.error}) + "\n")
+                errors.flush()
+                continue
+            batch.append(result)
+            if len(batch) >= args.batch_size:
+                flush(batch)
+        flush(batch)
+
+    try:
+        await asyncio.gather(produce(), score(), *(asr_worker() for _ in range(args.parallelism)))
+    finally:
+        writer.close()
+        checkpoint.close()
+        errors.close()
+        await close_transcriber()
+
+    print(progress.line())
+    summary = {**progress.summary(), "upstream": limiter.stats()}
+    print(json.dumps(summary, indent=2))
+    return summary
+
+
+def main() -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("source", help="directory of audio files, or a CSV/JSONL manifest")
+    parser.add_argument("--output", required=True, help="JSONL file, or directory for Parquet parts")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--provider", choices=["minimax", "openai"], default="minimax")
+    parser.add_argument("--parallelism", type=int, default=8, help="concurrent ASR requests")
+    parser.add_argument("--batch-size", type=int, default=64, help="transcripts per Guardian batch and write")
+    parser.add_argument("--flush-seconds", type=float, default=5.0, help="write a partial batch after this idle time")
+    parser.add_argument("--checkpoint", help="completed-id file (default: <output>.checkpoint)")
+    parser.add_argument("--resume", action="store_true", help="skip clips recorded in the checkpoint")
+    parser.add_argument("--preprocess", action="store_true", help="trim silence / downmix before ASR")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between progress lines")
+    summary = asyncio.run(run(parser.parse_args()))
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+TTS output format benchmark
+Encodes a synthetic spoken reply in every negotiable output format and reports
+bytes per turn and estimated time-to-playback on typical mobile links, for a
+whole-reply download (REST) and for the first sentence (streaming)
+
+Usage:
+    python benchmark_audio_output.py
+    python benchmark_audio_output.py --seconds 20 --sentences 5
+
+Without ffmpeg, compressed sizes are estimated from the nominal bitrate.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from audio_output import FFMPEG, FORMATS, PCM_RATE, negotiate, transcode
+from audio_preprocess import decode_wav, downmix, resample
+from benchmark_preprocess import synthetic_clip
+
+# NetInfo effective connection types: (downlink Mbps, RTT ms)
+LINKS = {"slow-2g": (0.05, 2000), "2g": (0.07, 1400), "3g": (0.7, 270), "4g": (4.0, 100)}
+
+
+def reply_pcm(seconds: float) -> bytes:
+    """Speech-like reply as s16le mono at PCM_RATE"""
+    samples, rate = decode_wav(synthetic_clip(seconds, 0.1, 0.1))
+    mono = resample(downmix(samples), rate, PCM_RATE)
+    return (np.clip(mono, -1, 1) * 32767).astype("<i2").tobytes()
+
+
+def encoded_size(pcm: bytes, seconds: float, name: str):
+    """(bytes, encode ms, measured?) for one format"""
+    fmt = FORMATS[name]
+    if name == "pcm":
+        return len(pcm), 0.0, True
+    if not FFMPEG:
+        return int(fmt.bitrate / 8 * seconds), 0.0, False
+    started = time.perf_counter()
+    size = len(transcode(pcm, fmt))
+    return size, (time.perf_counter() - started) * 1000, True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=12.0, help="Spoken reply length")
+    parser.add_argument("--sentences", type=int, default=4, help="Sentences per reply (streamed separately)")
+    args = parser.parse_args()
+
+    pcm = reply_pcm(args.seconds)
+    print(f"{args.seconds:.0f}s reply in {args.sentences} sentences"
+          f"{'' if FFMPEG else ' (ffmpeg not found: compressed sizes are nominal-bitrate estimates)'}")
+    header = f"{'format':>8} {'KB/turn':>8} {'encode ms':>10}"
+    for link in LINKS:
+        header += f" {link + ' rest':>13} {link + ' first':>13}"
+    print(header)
+    for name in FORMATS:
+        size, encode_ms, measured = encoded_size(pcm, args.seconds, name)
+        row = f"{name:>8} {size / 1024:>7.1f}{'' if measured else '~'} {encode_ms:>10.1f}"
+        for downlink, rtt in LINKS.values():
+            per_second = downlink * 1e6 / 8
+            rest = rtt / 1000 + size / per_second + encode_ms / 1000
+            first = rtt / 1000 + size / args.sentences / per_second + encode_ms / args.sentences / 1000
+            row += f" {rest:>12.2f}s {first:>12.2f}s"
+        print(row)
+
+    print("\nNegotiated format (Accept: audio/mpeg | audio/ogg, audio/mpeg)")
+    for link in LINKS:
+        mp3_only = negotiate(accept="audio/mpeg", ect=link).name
+        with_opus = negotiate(accept="audio/ogg, audio/mpeg", ect=link).name
+        print(f"{link:>8}: {mp3_only:>8} | {with_opus}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Concurrency benchmark for the voice pipelines
+Drives the FastAPI app in-process against a local mock upstream and reports
+how requests-per-second scales with the number of in-flight sessions
+
+Usage:
+    python benchmark_concurrency.py --latency-ms 50 --levels 1,2,4,8,16,32
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from mock_upstream import MockUpstreamServer, FAKE_AUDIO
+
+ENDPOINTS = {
+    "openai": "/api/voice-therapy",
+    "minimax": "/api/voice-therapy-minimax",
+}
+
+
+async def run_level(app, endpoint: str, concurrency: int, rounds: int) -> float:
+    """Run `concurrency` sessions for `rounds` turns each; return requests/sec."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+
+        async def session():
+            for _ in range(rounds):
+                response = await http.post(
+                    endpoint,
+                    files={"audio": ("turn.webm", FAKE_AUDIO, "audio/webm")},
+                )
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(session() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return concurrency * rounds / elapsed
+
+
+async def main_async(args) -> None:
+    import main  # imported after the environment points at the mock upstream
+
+    levels = [int(level) for level in args.levels.split(",")]
+    for pipeline in args.pipelines.split(","):
+        endpoint = ENDPOINTS[pipeline]
+        print(f"\n{pipeline} pipeline ({endpoint}), upstream latency {args.latency_ms:.0f}ms/stage")
+        print(f"{'in-flight':>10} {'req/s':>10} {'scaling':>10}")
+        baseline = None
+        for concurrency in levels:
+            rps = await run_level(main.app, endpoint, concurrency, args.rounds)
+            baseline = baseline or rps
+            print(f"{concurrency:>10} {rps:>10.1f} {rps / baseline:>9.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--levels", default="1,2,4,8,16,32")
+    parser.add_argument("--rounds", type=int, default=5, help="turns per session")
+    parser.add_argument("--pipelines", default="openai,minimax")
+    args = parser.parse_args()
+
+    with MockUpstreamServer(latency_ms=args.latency_ms) as upstream:
+        os.environ["OPENAI_BASE_URL"] = upstream.base_url
+        os.environ["MINIMAX_BASE_URL"] = upstream.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "bench")
+        os.environ.setdefault("MINIMAX_API_KEY", "bench")
+        asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Guardian safety microbenchmark
+Measures per-transcript analysis latency as the lexicon grows from the
+built-in keywords to thousands of patterns, for single and batched calls
+
+Usage:
+    python benchmark_guardian.py
+    python benchmark_guardian.py --sizes 0 1000 10000 --transcripts 2000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from guardian_safety import CRITICAL, HIGH_RISK, MODERATE, GuardianSafety
+
+SAMPLE_TRANSCRIPTS = [
+    "I've been feeling a bit stressed about work lately and I can't sleep well.",
+    "Honestly things are fine, I just wanted to talk about my week and my family.",
+    "I feel hopeless and alone, like there's no point in trying anymore.",
+    "Sometimes I think everyone would be better off dead without me around.",
+    "My partner and I argued again and I'm frustrated and angry at myself.",
+    "I went for a run this morning and it helped, I want to keep that habit going.",
+]
+
+WORDS = ("feel", "never", "always", "nobody", "tired", "pain", "sleep", "night", "hurt", "lost",
+         "empty", "numb", "cry", "dark", "heavy", "broken", "stuck", "afraid", "panic", "shame")
+
+
+def synthetic_patterns(count: int, seed: int = 7):
+    """Distinct two/three-word phrases spread across the three categories"""
+    rng = np.random.default_rng(seed)
+    patterns = set()
+    while len(patterns) < count:
+        n = rng.integers(2, 4)
+        patterns.add(" ".join(rng.choice(WORDS, size=n)) + f" {rng.integers(0, 10 ** 6)}")
+    categories = (CRITICAL, HIGH_RISK, MODERATE)
+    return [(p, categories[i % 3], GuardianSafety.CATEGORY_WEIGHTS[categories[i % 3]]) for i, p in enumerate(sorted(patterns))]
+
+
+def synthetic_transcripts(count: int, seed: int = 11):
+    rng = np.random.default_rng(seed)
+    return [" ".join([SAMPLE_TRANSCRIPTS[i % len(SAMPLE_TRANSCRIPTS)], *rng.choice(WORDS, size=10)])
+            for i in range(count)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 100, 1000, 5000, 20000],
+                        help="extra lexicon patterns on top of the built-in keywords")
+    parser.add_argument("--transcripts", type=int, default=1000)
+    args = parser.parse_args()
+
+    transcripts = synthetic_transcripts(args.transcripts)
+    print(f"{'patterns':>9} {'compile ms':>11} {'single us':>10} {'p99 us':>8} {'batch us':>9}")
+    for size in args.sizes:
+        started = time.perf_counter()
+        guardian = GuardianSafety(extra_patterns=synthetic_patterns(size))
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        for text in transcripts[:50]:
+            guardian.analyze_safety(text)
+
+        timings = np.empty(len(transcripts))
+        for i, text in enumerate(transcripts):
+            started = time.perf_counter()
+            guardian.analyze_safety(text)
+            timings[i] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        batch = guardian.analyze_many(transcripts)
+        batch_us = (time.perf_counter() - started) / len(transcripts) * 1e6
+
+        single = [guardian.analyze_safety(text) for text in transcripts]
+        assert [(a.wbc_score, a.risk_level) for a in batch] == [(a.wbc_score, a.risk_level) for a in single]
+
+        print(f"{guardian.lexicon.size:>9} {compile_ms:>11.1f} {np.median(timings) * 1e6:>10.1f} "
+              f"{np.quantile(timings, 0.99) * 1e6:>8.1f} {batch_us:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
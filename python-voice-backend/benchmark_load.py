@@ -0,0 +1,170 @@
+"""
+Offline load test for the voice pipelines
+Runs the backend and a mock OpenAI/Minimax upstream (with optional latency
+jitter and error injection) as local processes, drives the voice endpoints at
+fixed concurrency and reports latency percentiles, throughput, errors and
+backend memory. Needs no network access or API keys
+
+Usage:
+    python benchmark_load.py --levels 1,8,32 --duration 10
+    python benchmark_load.py --jitter-ms 100 --error-rate 0.05 --json results.json
+    python benchmark_load.py --max-p95-ms 900     # exit 1 if any level regresses
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+from benchmark_preprocess import synthetic_clip
+from benchmark_upload_memory import free_port, rss_bytes, wait_for
+from mock_upstream import FAKE_AUDIO
+
+ENDPOINTS = {
+    "openai": "/api/voice-therapy",
+    "minimax": "/api/voice-therapy-minimax",
+}
+
+
+async def run_level(base_url: str, pid: int, endpoint: str, payload, concurrency: int, duration: float) -> dict:
+    """Closed-loop load: `concurrency` clients send back-to-back turns for `duration` seconds"""
+    latencies = []
+    statuses = {}
+    peak_rss = rss_bytes(pid)
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as http:
+
+        async def client():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await http.post(endpoint, files={"audio": payload})
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append((time.perf_counter() - started, status))
+                statuses[status] = statuses.get(status, 0) + 1
+
+        async def sample_memory():
+            nonlocal peak_rss
+            while time.perf_counter() < deadline:
+                peak_rss = max(peak_rss, rss_bytes(pid))
+                await asyncio.sleep(0.05)
+
+        started = time.perf_counter()
+        await asyncio.gather(sample_memory(), *(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    ok = np.array([seconds for seconds, status in latencies if status == "200"]) * 1000
+    percentiles = np.percentile(ok, [50, 95, 99]) if len(ok) else [float("nan")] * 3
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(latencies) - len(ok),
+        "statuses": statuses,
+        "rps": len(ok) / elapsed,
+        "p50_ms": float(percentiles[0]),
+        "p95_ms": float(percentiles[1]),
+        "p99_ms": float(percentiles[2]),
+        "peak_rss_mb": peak_rss / 2 ** 20,
+    }
+
+
+async def run(args, base_url: str, pid: int) -> list:
+    if args.payload == "wav":
+        payload = ("turn.wav", synthetic_clip(3.0, 0.5, 0.5), "audio/wav")
+    else:
+        payload = ("turn.webm", FAKE_AUDIO, "audio/webm")
+
+    results = []
+    for pipeline in args.pipelines.split(","):
+        endpoint = ENDPOINTS[pipeline]
+        # Warm up connection pools and lazy imports
+        await run_level(base_url, pid, endpoint, payload, 1, 1.0)
+        print(f"\n{pipeline} ({endpoint}) latency {args.latency_ms:.0f}ms + jitter {args.jitter_ms:.0f}ms, "
+              f"error rate {args.error_rate:.1%}")
+        print(f"{'in-flight':>10} {'requests':>9} {'errors':>7} {'req/s':>8} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'RSS MB':>8}")
+        for concurrency in [int(level) for level in args.levels.split(",")]:
+            result = await run_level(base_url, pid, endpoint, payload, concurrency, args.duration)
+            result["pipeline"] = pipeline
+            results.append(result)
+            print(f"{concurrency:>10} {result['requests']:>9} {result['errors']:>7} {result['rps']:>8.1f} "
+                  f"{result['p50_ms']:>8.0f} {result['p95_ms']:>8.0f} {result['p99_ms']:>8.0f} "
+                  f"{result['peak_rss_mb']:>8.1f}")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pipelines", default="openai,minimax")
+    parser.add_argument("--levels", default="1,8,32", help="comma-separated in-flight request counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per level")
+    parser.add_argument("--payload", choices=["wav", "webm"], default="wav")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="base upstream latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--tts-cache", action="store_true", help="keep the TTS cache on (mock replies repeat)")
+    parser.add_argument("--json", help="also write results to this file")
+    parser.add_argument("--max-p95-ms", type=float, help="fail if any level's p95 exceeds this")
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    upstream_port, app_port = free_port(), free_port()
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{upstream_port}/v1",
+        "MINIMAX_BASE_URL": f"http://127.0.0.1:{upstream_port}/v1",
+        "OPENAI_API_KEY": "bench",
+        "MINIMAX_API_KEY": "bench",
+    }
+    env.pop("GEMINI_API_KEY", None)
+    if not args.tts_cache:
+        env["TTS_CACHE_MAX_MB"] = "0"
+
+    upstream = subprocess.Popen(
+        [sys.executable, "mock_upstream.py", "--port", str(upstream_port),
+         "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+         "--error-rate", str(args.error_rate), "--error-status", str(args.error_status),
+         "--seed", str(args.seed)],
+        cwd=here, env=env,
+    )
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port), "--log-level", "warning"],
+        cwd=here, env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{app_port}"
+        wait_for(f"http://127.0.0.1:{upstream_port}/docs")
+        wait_for(f"{base_url}/health")
+        results = asyncio.run(run(args, base_url, app.pid))
+    finally:
+        app.terminate()
+        upstream.terminate()
+        app.wait()
+        upstream.wait()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.max_p95_ms is not None:
+        slow = [r for r in results if not r["p95_ms"] <= args.max_p95_ms]
+        if slow:
+            for r in slow:
+                print(f"p95 regression: {r['pipeline']} x{r['concurrency']} p95 {r['p95_ms']:.0f}ms "
+                      f"> {args.max_p95_ms:.0f}ms")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Minimax TTS decoding benchmark
+Compares whole-body JSON + base64 decoding with the incremental parser, and
+the streaming T2A mode, on synthetic replies served over a simulated network
+(peak Python heap via tracemalloc and time to first audio byte)
+
+Usage:
+    python benchmark_minimax_tts.py
+    python benchmark_minimax_tts.py --seconds 10 60 --chunk-kb 16 --chunk-delay-ms 2
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import time
+import tracemalloc
+
+import httpx
+
+os.environ.setdefault("MINIMAX_API_KEY", "bench")
+
+from minimax_service import AsyncMinimaxVoiceService  # noqa: E402
+
+MP3_BYTES_PER_SECOND = 128_000 // 8
+
+
+def mock_transport(audio: bytes, chunk_size: int, chunk_delay: float) -> httpx.MockTransport:
+    """
+    T2A v2 upstream that sends its body in `chunk_size` pieces, `chunk_delay` apart.
+
+    Bodies are built up front so the measured heap is the client's alone.
+    """
+    step = 32 * 1024
+    streamed = b"".join(
+        b"data: " + json.dumps({"data": {"audio": base64.b64encode(audio[i:i + step]).decode(), "status": 1}})
+        .encode() + b"\n\n"
+        for i in range(0, len(audio), step)
+    )
+    whole = json.dumps({
+        "data": {"audio": base64.b64encode(audio).decode(), "status": 2},
+        "base_resp": {"status_code": 0, "status_msg": "success"},
+    }).encode()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = streamed if json.loads(request.content).get("stream") else whole
+
+        async def stream():
+            for i in range(0, len(body), chunk_size):
+                await asyncio.sleep(chunk_delay)
+                yield body[i:i + chunk_size]
+
+        return httpx.Response(200, headers={"content-length": str(len(body))}, content=stream())
+
+    return httpx.MockTransport(handler)
+
+
+async def whole_body(service: AsyncMinimaxVoiceService) -> bytes:
+    """The previous approach: buffer the body, json-parse it, decode the full string"""
+    response = await service._client.post(f"{service.base_url}/t2a_v2", json={"text": "x"})
+    return base64.b64decode(response.json()["data"]["audio"])
+
+
+async def measure(label: str, run) -> None:
+    tracemalloc.start()
+    started = time.perf_counter()
+    first_byte, total = await run()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<22} total {elapsed * 1000:>7.1f}ms  first audio {(first_byte - started) * 1000:>7.1f}ms  "
+          f"peak heap {peak / 2 ** 20:>6.1f}MB  ({total / 2 ** 20:.1f}MB audio)")
+
+
+async def run(args) -> None:
+    for seconds in args.seconds:
+        audio = os.urandom(seconds * MP3_BYTES_PER_SECOND)
+        service = AsyncMinimaxVoiceService()
+        await service.aclose()
+        service._client = httpx.AsyncClient(
+            transport=mock_transport(audio, args.chunk_kb * 1024, args.chunk_delay_ms / 1000.0)
+        )
+        print(f"\n{seconds}s of audio ({len(audio) / 2 ** 20:.1f}MB)")
+
+        async def baseline():
+            data = await whole_body(service)
+            return time.perf_counter(), len(data)
+
+        async def incremental():
+            data = await service.text_to_speech("x")
+            return time.perf_counter(), len(data)
+
+        async def streaming():
+            first, total = None, 0
+            async for chunk in service.text_to_speech_stream("x"):
+                first = first or time.perf_counter()
+                total += len(chunk)
+            return first, total
+
+        await measure("json + b64decode", baseline)
+        await measure("incremental decode", incremental)
+        await measure("streaming chunks", streaming)
+        await service.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=int, nargs="+", default=[10, 30, 120], help="reply lengths")
+    parser.add_argument("--chunk-kb", type=int, default=16, help="network read size")
+    parser.add_argument("--chunk-delay-ms", type=float, default=1.0, help="delay between network reads")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Audio preprocessing benchmark
+Runs the preprocessing stage over a corpus of clips and reports payload and
+duration reduction, processing time, and estimated upload time saved
+
+Usage:
+    python benchmark_preprocess.py --corpus ./samples --uplink-kbps 1000
+    python benchmark_preprocess.py              # synthetic 48kHz stereo WAV corpus
+"""
+
+import argparse
+import io
+import os
+import wave
+
+import numpy as np
+
+from audio_input import AudioClip
+from audio_preprocess import FFMPEG, preprocess
+
+CONTENT_TYPES = {".wav": "audio/wav", ".webm": "audio/webm", ".ogg": "audio/ogg", ".mp3": "audio/mpeg"}
+
+
+def synthetic_clip(seconds_speech: float, lead: float, trail: float, rate: int = 48000) -> bytes:
+    """Stereo WAV with quiet noise around a speech-like amplitude-modulated tone burst"""
+    rng = np.random.default_rng(int(seconds_speech * 1000 + lead * 10 + trail))
+    t = np.arange(int(seconds_speech * rate)) / rate
+    speech = 0.3 * np.sin(2 * np.pi * 180 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+    mono = np.concatenate([
+        rng.normal(0, 0.002, int(lead * rate)),
+        speech + rng.normal(0, 0.01, len(t)),
+        rng.normal(0, 0.002, int(trail * rate)),
+    ])
+    stereo = np.stack([mono, mono * 0.9], axis=1)
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes((np.clip(stereo, -1, 1) * 32767).astype("<i2").tobytes())
+    return out.getvalue()
+
+
+def load_corpus(path):
+    if not path:
+        shapes = [(2.0, 1.5, 2.0), (4.0, 0.5, 3.0), (6.0, 2.5, 1.0), (1.0, 3.0, 3.0), (8.0, 0.2, 0.5)]
+        return [(f"synthetic_{i}.wav", synthetic_clip(*shape), "audio/wav") for i, shape in enumerate(shapes)]
+    clips = []
+    for name in sorted(os.listdir(path)):
+        ext = os.path.splitext(name)[1].lower()
+        if ext in CONTENT_TYPES:
+            with open(os.path.join(path, name), "rb") as f:
+                clips.append((name, f.read(), CONTENT_TYPES[ext]))
+    return clips
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", help="directory of .wav/.webm/.ogg/.mp3 clips")
+    parser.add_argument("--uplink-kbps", type=float, default=1000.0, help="assumed upload bandwidth")
+    args = parser.parse_args()
+
+    clips = load_corpus(args.corpus)
+    print(f"encoder: {'ffmpeg/opus' if FFMPEG else 'wav (ffmpeg not found)'}")
+    print(f"{'clip':<22} {'in KB':>8} {'out KB':>8} {'in s':>6} {'out s':>6} {'ms':>7} {'upload saved ms':>16}")
+
+    totals = np.zeros(5)
+    for name, data, content_type in clips:
+        result = preprocess(AudioClip(data=data, filename=name, content_type=content_type))
+        if result is None:
+            print(f"{name:<22} {'skipped (not decodable locally)':>40}")
+            continue
+        saved_ms = (result.input_bytes - result.output_bytes) * 8 / args.uplink_kbps
+        totals += [result.input_bytes, result.output_bytes, result.input_seconds, result.output_seconds, result.elapsed_ms]
+        print(f"{name:<22} {result.input_bytes / 1024:>8.1f} {result.output_bytes / 1024:>8.1f} "
+              f"{result.input_seconds:>6.2f} {result.output_seconds:>6.2f} {result.elapsed_ms:>7.1f} {saved_ms:>16.0f}")
+
+    if totals[0]:
+        print(f"\npayload: {totals[1] / totals[0]:.1%} of original, "
+              f"audio duration: {totals[3] / totals[2]:.1%} of original, "
+              f"processing: {totals[4]:.1f}ms total")
+
+
+if __name__ == "__main__":
+    main()
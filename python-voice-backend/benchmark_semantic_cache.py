@@ -0,0 +1,111 @@
+"""
+Semantic response cache benchmark
+Replays a synthetic stream of opening turns (common concerns with filler,
+casing and contraction variations) through the cache and reports hit rate,
+wrong-intent hits, lookup latency by index size and LLM time saved. Needs
+sentence-transformers (pip install -r requirements-semantic-cache.txt): the
+cache won't enable with the hashing embedder
+
+Usage:
+    python benchmark_semantic_cache.py
+    python benchmark_semantic_cache.py --turns 5000 --threshold 0.8 --variants 1
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from semantic_cache import SemanticResponseCache, default_embedder
+
+CONCERNS = [
+    "I'm feeling stressed about work",
+    "I can't sleep at night",
+    "I feel anxious all the time",
+    "I'm stressed about my exams",
+    "I feel lonely",
+    "I had a fight with my partner",
+    "I feel stressed about school",
+    "I'm worried about money",
+    "I don't have any motivation",
+    "I feel overwhelmed with everything",
+    "My boss is making me anxious",
+    "I keep overthinking everything",
+]
+PREFIXES = ["", "Hi, ", "Um, ", "So ", "Honestly, ", "Hey. "]
+FILLERS = ["", " lately", " right now", " these days", " a lot"]
+ENDINGS = [".", "", "...", "!"]
+
+
+def turn(rng: random.Random, concern: str) -> str:
+    text = rng.choice(PREFIXES) + concern + rng.choice(FILLERS) + rng.choice(ENDINGS)
+    if rng.random() < 0.3:
+        text = text.lower()
+    if rng.random() < 0.2:
+        text = text.replace("I'm", "I am").replace("can't", "cannot")
+    return text
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--variants", type=int, default=3)
+    parser.add_argument("--llm-ms", type=float, default=1800.0, help="Assumed chat completion latency")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    embedder = default_embedder()
+    if not embedder.semantic:
+        raise SystemExit(
+            "sentence-transformers is not installed (pip install -r requirements-semantic-cache.txt); "
+            "the semantic cache stays disabled without it"
+        )
+    embedder.load()  # as the server does at startup; not part of lookup latency
+
+    rng = random.Random(args.seed)
+    cache = SemanticResponseCache(
+        enabled=True, embedder=embedder, threshold=args.threshold, variants=args.variants, seed=args.seed
+    )
+    cache.observe("llm", "openai", "ok", args.llm_ms / 1000)
+    # Zipf-ish: a few concerns dominate, as in real opening turns
+    weights = [1 / (rank + 1) for rank in range(len(CONCERNS))]
+    wrong = 0
+    for _ in range(args.turns):
+        concern = rng.choices(CONCERNS, weights)[0]
+        query = cache.lookup("openai", turn(rng, concern), "clear")
+        if query.reply is not None:
+            if not query.reply.startswith(f"[{concern}]"):
+                wrong += 1
+        else:
+            cache.add(query, f"[{concern}] reply {rng.random():.6f}")
+
+    s = cache.stats()
+    print(f"{args.turns} turns, {len(CONCERNS)} concerns, threshold {cache.threshold}, {args.variants} variants")
+    print(f"hit rate {s['hit_rate']:.1%}  hits {s['hits']}  fills {s['fills']}  misses {s['misses']}  "
+          f"entries {s['entries']}  wrong-intent hits {wrong}")
+    print(f"LLM time saved {s['saved_ms'] / 1000:.0f}s of {args.turns * args.llm_ms / 1000:.0f}s  "
+          f"(mean lookup {s['lookup_ms'] / args.turns:.3f}ms)")
+
+    print("\nLookup latency by index size")
+    for size in (100, 1000, 5000):
+        big = SemanticResponseCache(enabled=True, embedder=embedder, max_entries=size, variants=1, threshold=1.01)
+        for i in range(size):
+            big.add(big.lookup("openai", f"turn {i} about topic {i * 7919 % 1013}", "clear"), "reply")
+        vector = embedder.embed("I'm feeling stressed about work")
+        index = big._indexes["openai"]
+        started = time.perf_counter()
+        for _ in range(200):
+            index.search(vector)
+        search_ms = (time.perf_counter() - started) / 200 * 1000
+        started = time.perf_counter()
+        for _ in range(200):
+            embedder.embed("I'm feeling stressed about work lately")
+        embed_ms = (time.perf_counter() - started) / 200 * 1000
+        print(f"{size:>6} entries: search {search_ms:.3f}ms  embed {embed_ms:.3f}ms  "
+              f"index {index.vectors.nbytes / 2 ** 20:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
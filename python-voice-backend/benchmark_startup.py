@@ -0,0 +1,109 @@
+"""
+Cold start benchmark
+Launches the backend against the mock upstream and measures time until it is
+live (/health), ready (/ready) and has answered its first voice request, with
+startup warm-up on and off
+
+Usage:
+    python benchmark_startup.py
+    python benchmark_startup.py --runs 5 --latency-ms 200
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmark_preprocess import synthetic_clip
+from benchmark_upload_memory import free_port, wait_for
+
+
+def poll(http: httpx.Client, url: str, started: float, timeout: float = 60.0) -> float:
+    """Seconds from `started` until `url` answers 200"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if http.get(url).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        # Poll gently: on small machines a busy poller slows the startup it measures
+        time.sleep(0.02)
+    raise RuntimeError(f"{url} did not become available")
+
+
+def cold_start(env: dict, here: str) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    payload = synthetic_clip(2.0, 0.3, 0.3)
+    started = time.perf_counter()
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=here, env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=base_url, timeout=60.0) as http:
+            live = poll(http, "/health", started)
+            ready = poll(http, "/ready", started)
+            request_started = time.perf_counter()
+            response = http.post(
+                "/api/voice-therapy",
+                files={"audio": ("turn.wav", payload, "audio/wav")},
+            )
+            first_request = time.perf_counter() - request_started
+            report = http.get("/ready").json()
+    finally:
+        app.terminate()
+        app.wait()
+    if response.status_code != 200:
+        raise RuntimeError(f"first request failed: {response.status_code} {response.text}")
+    return {
+        "live": live,
+        "ready": ready,
+        "first_request": first_request,
+        "import": report["import_seconds"],
+        "warmup": report["warmup_seconds"] or 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="mock upstream latency per call")
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    upstream_port = free_port()
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{upstream_port}/v1",
+        "MINIMAX_BASE_URL": f"http://127.0.0.1:{upstream_port}/v1",
+        "OPENAI_API_KEY": "bench",
+        "MINIMAX_API_KEY": "bench",
+        "TTS_CACHE_MAX_MB": "0",
+    }
+    env.pop("GEMINI_API_KEY", None)
+    upstream = subprocess.Popen(
+        [sys.executable, "mock_upstream.py", "--port", str(upstream_port), "--latency-ms", str(args.latency_ms)],
+        cwd=here, env=env,
+    )
+    try:
+        wait_for(f"http://127.0.0.1:{upstream_port}/docs")
+        print(f"median of {args.runs} runs, seconds since process launch")
+        print(f"{'warm-up':>8} {'import':>8} {'live':>8} {'ready':>8} {'warm-up s':>10} {'1st request':>12}")
+        for warmup in ("true", "false"):
+            runs = [cold_start({**env, "STARTUP_WARMUP": warmup}, here) for _ in range(args.runs)]
+            median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            print(f"{warmup:>8} {median['import']:>8.2f} {median['live']:>8.2f} {median['ready']:>8.2f} "
+                  f"{median['warmup']:>10.2f} {median['first_request']:>12.3f}")
+    finally:
+        upstream.terminate()
+        upstream.wait()
+
+
+if __name__ == "__main__":
+    main()
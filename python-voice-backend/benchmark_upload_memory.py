@@ -0,0 +1,143 @@
+"""
+Upload memory benchmark
+Runs the backend and a mock upstream as separate processes, fires concurrent
+audio uploads at the backend, and samples the backend's resident memory to
+report how many in-memory copies of each upload the pipeline holds (Linux).
+--payload garbage/oversize measures what rejected uploads cost instead
+
+Usage:
+    python benchmark_upload_memory.py --size-mb 5 --levels 1,4,16
+    python benchmark_upload_memory.py --payload garbage --size-mb 20
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+# MPEG-1 Layer III frame header, 320kbps 44.1kHz: enough for the upload to
+# pass codec sniffing, and keeps a 25MB body under the 300s duration limit
+MP3_HEADER = b"\xff\xfb\xe0\x64"
+MAX_UPLOAD_MB = 25
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_bytes(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def wait_for(url: str, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up")
+
+
+async def measure(base_url: str, pid: int, endpoint: str, payload: bytes, concurrency: int, expect: int = 200) -> int:
+    """Peak RSS increase (bytes) while `concurrency` uploads are in flight"""
+    baseline = rss_bytes(pid)
+    peak = baseline
+    done = asyncio.Event()
+
+    async def sample():
+        nonlocal peak
+        while not done.is_set():
+            peak = max(peak, rss_bytes(pid))
+            await asyncio.sleep(0.005)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0) as http:
+        sampler = asyncio.create_task(sample())
+        responses = await asyncio.gather(*(
+            http.post(endpoint, files={"audio": ("turn.webm", payload, "audio/webm")})
+            for _ in range(concurrency)
+        ))
+        done.set()
+        await sampler
+
+    for response in responses:
+        if response.status_code != expect:
+            raise RuntimeError(f"expected {expect}, got {response.status_code}: {response.text}")
+    return peak - baseline
+
+
+async def run(args, base_url: str, pid: int) -> None:
+    size = int(args.size_mb * 1024 * 1024)
+    if args.payload == "valid":
+        payload, expect = MP3_HEADER + os.urandom(size - len(MP3_HEADER)), 200
+    elif args.payload == "garbage":
+        payload, expect = os.urandom(size), 400
+    else:
+        size = max(size, (MAX_UPLOAD_MB + 1) * 1024 * 1024)
+        payload, expect = MP3_HEADER + os.urandom(size - len(MP3_HEADER)), 413
+    endpoint = "/api/voice-therapy-minimax" if args.pipeline == "minimax" else "/api/voice-therapy"
+
+    # Warm up allocator and lazy imports before measuring
+    await measure(base_url, pid, endpoint, payload, 1, expect)
+
+    print(f"{args.pipeline} pipeline, {len(payload) / 2**20:.1f}MB {args.payload} uploads")
+    print(f"{'in-flight':>10} {'peak MB':>10} {'MB/upload':>10} {'copies':>8}")
+    for concurrency in [int(level) for level in args.levels.split(",")]:
+        growth = await measure(base_url, pid, endpoint, payload, concurrency, expect)
+        per_upload = growth / concurrency
+        print(f"{concurrency:>10} {growth / 2**20:>10.1f} {per_upload / 2**20:>10.2f} "
+              f"{per_upload / len(payload):>8.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=float, default=5.0)
+    parser.add_argument("--levels", default="1,4,16")
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--pipeline", choices=["openai", "minimax"], default="minimax")
+    parser.add_argument("--payload", choices=["valid", "garbage", "oversize"], default="valid")
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    upstream_port, app_port = free_port(), free_port()
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{upstream_port}/v1",
+        "MINIMAX_BASE_URL": f"http://127.0.0.1:{upstream_port}/v1",
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "bench"),
+        "MINIMAX_API_KEY": os.getenv("MINIMAX_API_KEY", "bench"),
+    }
+    upstream = subprocess.Popen(
+        [sys.executable, "mock_upstream.py", "--port", str(upstream_port), "--latency-ms", str(args.latency_ms)],
+        cwd=here, env=env,
+    )
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port), "--log-level", "warning"],
+        cwd=here, env=env,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{app_port}"
+        wait_for(f"http://127.0.0.1:{upstream_port}/docs")
+        wait_for(f"{base_url}/health")
+        asyncio.run(run(args, base_url, app.pid))
+    finally:
+        app.terminate()
+        upstream.terminate()
+        app.wait()
+        upstream.wait()
+
+
+if __name__ == "__main__":
+    main()
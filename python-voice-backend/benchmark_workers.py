@@ -0,0 +1,153 @@
+"""
+Worker scaling benchmark
+Starts serve.py with 1, 2, 4 and 8 workers against the mock upstream, drives
+the voice endpoint at fixed concurrency and fetches every reply's audio on a
+fresh connection (so it usually lands on a different worker). Reports
+throughput, latency percentiles, cross-worker audio misses and total RSS
+
+Usage:
+    python benchmark_workers.py
+    python benchmark_workers.py --workers 1,4 --concurrency 64 --duration 20
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+from benchmark_preprocess import synthetic_clip
+from benchmark_upload_memory import free_port, rss_bytes, wait_for
+
+
+def tree_rss(pid: int) -> int:
+    """Resident memory of a process and its direct children (uvicorn workers)"""
+    total = rss_bytes(pid)
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(child) for child in f.read().split()]
+    except OSError:
+        children = []
+    for child in children:
+        try:
+            total += rss_bytes(child)
+        except OSError:
+            pass
+    return total
+
+
+async def drive(base_url: str, endpoint: str, payload, concurrency: int, duration: float) -> dict:
+    latencies = []
+    errors = 0
+    audio_misses = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as http:
+
+        async def client():
+            nonlocal errors, audio_misses
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await http.post(endpoint, files={"audio": payload}, params={"session_id": "bench"})
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                # A new connection is accepted by whichever worker wins it
+                async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as fresh:
+                    audio = await fresh.get(response.json()["audio_url"])
+                if audio.status_code != 200:
+                    audio_misses += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    ok = np.array(latencies) * 1000
+    percentiles = np.percentile(ok, [50, 95]) if len(ok) else [float("nan")] * 2
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "audio_misses": audio_misses,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": float(percentiles[0]),
+        "p95_ms": float(percentiles[1]),
+    }
+
+
+def run_workers(workers: int, args, env: dict, here: str) -> dict:
+    port = free_port()
+    state_dir = tempfile.mkdtemp(prefix="voice-state-")
+    server = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port),
+         "--host", "127.0.0.1", "--log-level", "warning",
+         "--state-path", os.path.join(state_dir, "state.db")],
+        cwd=here, env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_for(f"{base_url}/health", timeout=60.0)
+        payload = ("turn.wav", synthetic_clip(3.0, 0.5, 0.5), "audio/wav")
+        # Warm up every worker's pools and lazy imports
+        asyncio.run(drive(base_url, args.endpoint, payload, workers * 2, 2.0))
+        result = asyncio.run(drive(base_url, args.endpoint, payload, args.concurrency, args.duration))
+        result["rss_mb"] = tree_rss(server.pid) / 2 ** 20
+    finally:
+        server.terminate()
+        server.wait()
+    result["workers"] = workers
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--endpoint", default="/api/voice-therapy")
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    upstream_port = free_port()
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{upstream_port}/v1",
+        "MINIMAX_BASE_URL": f"http://127.0.0.1:{upstream_port}/v1",
+        "OPENAI_API_KEY": "bench",
+        "MINIMAX_API_KEY": "bench",
+        "TTS_CACHE_MAX_MB": "0",
+    }
+    env.pop("GEMINI_API_KEY", None)
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    upstream = subprocess.Popen(
+        [sys.executable, "mock_upstream.py", "--port", str(upstream_port), "--latency-ms", str(args.latency_ms)],
+        cwd=here, env=env,
+    )
+    try:
+        wait_for(f"http://127.0.0.1:{upstream_port}/docs")
+        print(f"{args.endpoint} at {args.concurrency} in flight, upstream latency {args.latency_ms:.0f}ms "
+              f"({os.cpu_count()} CPUs)")
+        print(f"{'workers':>8} {'requests':>9} {'errors':>7} {'audio miss':>11} {'req/s':>8} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>8}")
+        for workers in [int(n) for n in args.workers.split(",")]:
+            r = run_workers(workers, args, env, here)
+            print(f"{workers:>8} {r['requests']:>9} {r['errors']:>7} {r['audio_misses']:>11} {r['rps']:>8.1f} "
+                  f"{r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} {r['rss_mb']:>8.1f}")
+    finally:
+        upstream.terminate()
+        upstream.wait()
+
+
+if __name__ == "__main__":
+    main()
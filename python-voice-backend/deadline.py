@@ -0,0 +1,170 @@
+"""
+Per-turn deadlines
+A voice turn has an end-to-end latency budget; each pipeline stage gets a
+share of it, and stages that would overrun either degrade (shorter reply,
+faster voice, text only) or fail fast instead of hanging on an upstream
+"""
+
+import asyncio
+import math
+import os
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Adds up to 11s of the default 12s turn; the rest covers upload and preprocessing
+DEFAULT_BUDGETS = {"asr": 2.5, "llm": 5.5, "tts": 3.0}
+# Extra budget per second of input audio, for stages whose work grows with the clip
+DEFAULT_PER_AUDIO_SECOND = {"asr": 0.1}
+
+# (clock, end) of the deadline stage running in the current task, for code
+# further down (e.g. upstream queues) that shouldn't wait past it
+_stage_end: ContextVar[Optional[Tuple[Callable[[], float], float]]] = ContextVar("stage_end", default=None)
+
+
+def time_left() -> float:
+    """Seconds left in the budget of the deadline stage running in this task (math.inf outside one)"""
+    current = _stage_end.get()
+    if current is None:
+        return math.inf
+    clock, end = current
+    return max(end - clock(), 0.0)
+
+
+class DeadlineExceeded(Exception):
+    """A stage ran out of its budget (or the turn ran out of time before it started)"""
+
+    def __init__(self, stage: str, budget: float):
+        super().__init__(f"{stage} exceeded its {budget:.2f}s budget")
+        self.stage = stage
+        self.budget = budget
+
+
+class Deadline:
+    """
+    End-to-end deadline for one turn, with per-stage budgets.
+
+    A stage may use up to its own budget, but never more than what is left
+    of the turn. The "llm" budget covers Guardian and the chat completion.
+    Stages that process the input audio (ASR) get more budget for longer
+    clips, up to the whole turn. Budgets that add up to more than the turn
+    are scaled down to fit it.
+
+    Args:
+        total: Seconds for the whole turn (math.inf disables the deadline)
+        budgets: Seconds per stage name; stages not listed only get `total`
+        per_audio_second: Extra seconds per second of input audio, per stage
+        observer: Called as observer(stage, spent, budget, outcome) after
+            every stage run (outcome ok/error/exceeded)
+    """
+
+    def __init__(
+        self,
+        total: float,
+        budgets: Optional[Dict[str, float]] = None,
+        per_audio_second: Optional[Dict[str, float]] = None,
+        observer: Optional[Callable[[str, float, float, str], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.total = total
+        self.budgets = dict(DEFAULT_BUDGETS if budgets is None else budgets)
+        planned = sum(self.budgets.values())
+        if planned > total:
+            # Otherwise short_for() would hold from the start of every turn
+            self.budgets = {stage: seconds * total / planned for stage, seconds in self.budgets.items()}
+        self.per_audio_second = dict(DEFAULT_PER_AUDIO_SECOND if per_audio_second is None else per_audio_second)
+        self.observer = observer
+        self._clock = clock
+        self.started = clock()
+        self.spent: Dict[str, float] = {}
+        self.degraded: List[str] = []
+
+    @classmethod
+    def from_env(cls, observer=None, clock: Callable[[], float] = time.monotonic) -> "Deadline":
+        """
+        TURN_DEADLINE_SECONDS (0 disables), STAGE_BUDGET_<STAGE> seconds and
+        STAGE_BUDGET_<STAGE>_PER_AUDIO_SECOND
+        """
+        total = float(os.getenv("TURN_DEADLINE_SECONDS", "12"))
+        budgets = {
+            stage: float(os.getenv(f"STAGE_BUDGET_{stage.upper()}", str(seconds)))
+            for stage, seconds in DEFAULT_BUDGETS.items()
+        }
+        per_audio_second = {
+            stage: float(os.getenv(f"STAGE_BUDGET_{stage.upper()}_PER_AUDIO_SECOND", str(seconds)))
+            for stage, seconds in DEFAULT_PER_AUDIO_SECOND.items()
+        }
+        return cls(total if total > 0 else math.inf, budgets, per_audio_second, observer, clock)
+
+    def elapsed(self) -> float:
+        return self._clock() - self.started
+
+    def remaining(self) -> float:
+        return max(self.total - self.elapsed(), 0.0)
+
+    def stage_budget(self, stage: str, audio_seconds: Optional[float] = None) -> float:
+        """
+        Full budget of `stage` for a clip of `audio_seconds` (None when
+        unknown): its own budget plus the per-audio-second allowance, capped
+        at the whole turn
+        """
+        budget = self.budgets.get(stage, math.inf) + self.per_audio_second.get(stage, 0.0) * (audio_seconds or 0.0)
+        return min(budget, self.total)
+
+    def budget(self, stage: str, audio_seconds: Optional[float] = None, turn_bound: bool = True) -> float:
+        """Seconds `stage` may take if it started now (its own budget only, without `turn_bound`)"""
+        budget = self.stage_budget(stage, audio_seconds)
+        return min(budget, self.remaining()) if turn_bound else budget
+
+    def short_for(self, *stages: str) -> bool:
+        """True when what's left of the turn is less than the full budgets of the stages still to run"""
+        return self.remaining() < sum(self.budgets.get(stage, 0.0) for stage in stages)
+
+    def degrade(self, stage: str, action: str) -> None:
+        """Record that `stage` is running in a degraded mode (e.g. llm:short_reply)"""
+        self.degraded.append(f"{stage}:{action}")
+
+    async def run(
+        self,
+        stage: str,
+        fn: Callable[[], Awaitable[T]],
+        audio_seconds: Optional[float] = None,
+        turn_bound: bool = True,
+    ) -> T:
+        """
+        Await `fn()` within the stage budget (scaled for `audio_seconds` of
+        input audio, see stage_budget). `turn_bound=False` runs past the end
+        of the turn, e.g. audio for sentences streamed after the first.
+        While `fn()` runs, time_left() reports what is left of the budget.
+
+        Raises:
+            DeadlineExceeded: the budget ran out; `fn()` is cancelled, which
+                also gives up any upstream queue slot it was waiting for
+        """
+        budget = self.budget(stage, audio_seconds, turn_bound)
+        if budget <= 0:
+            self._record(stage, 0.0, budget, "exceeded")
+            raise DeadlineExceeded(stage, budget)
+        started = self._clock()
+        outcome = "ok"
+        token = _stage_end.set((self._clock, started + budget))
+        try:
+            if math.isinf(budget):
+                return await fn()
+            return await asyncio.wait_for(fn(), budget)
+        except asyncio.TimeoutError:
+            outcome = "exceeded"
+            raise DeadlineExceeded(stage, budget) from None
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            _stage_end.reset(token)
+            self._record(stage, self._clock() - started, budget, outcome)
+
+    def _record(self, stage: str, spent: float, budget: float, outcome: str) -> None:
+        self.spent[stage] = self.spent.get(stage, 0.0) + spent
+        if self.observer:
+            self.observer(stage, spent, budget, outcome)
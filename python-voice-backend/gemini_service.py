@@ -0,0 +1,83 @@
+"""
+Gemini transcription fallback
+Wraps the (sync-only) google-generativeai SDK. The SDK is slow to import, so
+it is loaded by warm_up() in the background after startup (or on first use)
+rather than when the module is imported
+"""
+
+import asyncio
+import importlib.util
+import os
+import threading
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from audio_input import AudioClip, as_file
+
+TRANSCRIBE_PROMPT = "Transcribe this audio exactly. Return only the transcribed text, nothing else."
+
+
+class GeminiTranscriptionService:
+    """Service for transcribing audio with Gemini"""
+
+    def __init__(self, model_name: str = "gemini-1.5-pro"):
+        self.api_key = os.getenv("GEMINI_API_KEY")
+        if not self.api_key:
+            raise ValueError("GEMINI_API_KEY environment variable is required")
+        # Cheap availability check; the import itself is deferred
+        if importlib.util.find_spec("google") is None or importlib.util.find_spec("google.generativeai") is None:
+            raise ImportError("google-generativeai is not installed")
+        self.model_name = model_name
+        self._genai = None
+        self._model = None
+        self._lock = threading.Lock()
+
+    def warm_up(self) -> None:
+        """Import and configure the SDK (blocking; call from a worker thread)"""
+        with self._lock:
+            if self._model is not None:
+                return
+            import google.generativeai as genai
+
+            genai.configure(api_key=self.api_key)
+            self._genai = genai
+            self._model = genai.GenerativeModel(self.model_name)
+
+    def transcribe_sync(self, clip: AudioClip, cancelled: Optional[threading.Event] = None) -> str:
+        """
+        Blocking transcription; upload the clip and ask the model for the text.
+
+        The uploaded file is always deleted afterwards, so recordings don't
+        accumulate on the provider side. If `cancelled` is set by the time the
+        upload finishes (a hedged request that lost), no text is generated.
+        """
+        self.warm_up()
+        audio_file = self._genai.upload_file(as_file(clip.data), mime_type=clip.content_type)
+        try:
+            if cancelled is not None and cancelled.is_set():
+                return ""
+            result = self._model.generate_content([TRANSCRIBE_PROMPT, audio_file])
+            return result.text.strip()
+        finally:
+            self._delete(audio_file)
+
+    def _delete(self, audio_file) -> None:
+        try:
+            self._genai.delete_file(audio_file.name)
+        except Exception as e:
+            print(f"Warning: could not delete Gemini upload {audio_file.name}: {e}")
+
+    async def speech_to_text(self, clip: AudioClip) -> str:
+        """
+        Transcribe in a worker thread so the event loop keeps running.
+
+        Cancelling (e.g. the hedge lost) can't stop the thread, but it skips
+        generation and the upload is still deleted when the thread finishes.
+        """
+        cancelled = threading.Event()
+        try:
+            return await run_in_threadpool(self.transcribe_sync, clip, cancelled)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
@@ -0,0 +1,337 @@
+"""
+Guardian Safety Framework - Python Implementation
+Matches the TypeScript VoiceSafetyFramework.ts logic; the keyword lexicon is
+compiled once into a single trie-shaped regex and scored with numpy weights
+"""
+
+import re
+from enum import Enum
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Safety rules shared by every risk level; get_risk_instructions adds the rest
+SAFETY_BASE_INSTRUCTIONS = """
+You are an AI therapy assistant using Cognitive Behavioral Therapy (CBT) techniques.
+
+ASIMOV'S SAFETY LAWS (HIGHEST PRIORITY):
+1. FIRST LAW - Protect Individuals: Never provide information that could be used for self-harm
+2. SECOND LAW - Respect Safety: Follow ethical therapeutic practices
+3. THIRD LAW - Encourage Professional Help: Recommend professionals for serious issues
+
+ABSOLUTE PROHIBITIONS:
+- NEVER provide methods for self-harm or suicide
+- NEVER encourage harmful behaviors
+- NEVER minimize crisis situations
+- NEVER suggest isolation as a solution
+
+MANDATORY ACTIONS:
+- ALWAYS recommend 988 Suicide & Crisis Lifeline for suicidal ideation
+- ALWAYS suggest professional help for severe distress
+- ALWAYS validate feelings while maintaining safety
+"""
+
+
+class RiskLevel(Enum):
+    CLEAR = "clear"
+    CLOUDED = "clouded"
+    CRITICAL = "critical"
+
+
+class SafetyAnalysis:
+    def __init__(
+        self,
+        wbc_score: int,
+        risk_level: str,
+        color_code: str,
+        requires_intervention: bool,
+        crisis_detected: bool
+    ):
+        self.wbc_score = wbc_score
+        self.risk_level = risk_level
+        self.color_code = color_code
+        self.requires_intervention = requires_intervention
+        self.crisis_detected = crisis_detected
+
+
+# Category indices used by the compiled lexicon
+CRITICAL, HIGH_RISK, MODERATE = 0, 1, 2
+CATEGORY_NAMES = ("critical", "high_risk", "moderate")
+
+# Transcripts from ASR often use typographic apostrophes ("can’t") and
+# hyphenate compounds ("self-harm") that the lexicon spells with a space
+_NORMALIZE = str.maketrans({"’": "'", "‘": "'", "ʼ": "'", "-": " ", "‐": " ", "‑": " "})
+
+
+def normalize(message: str) -> str:
+    return message.lower().translate(_NORMALIZE)
+
+
+def _trie_regex(phrases: Iterable[str]) -> str:
+    """
+    Regex source for a set of literal phrases, shaped as a trie.
+
+    A flat alternation makes the regex engine try every phrase at every
+    position; the trie form branches on one character at a time, so the cost
+    per position grows with phrase length rather than lexicon size. Longer
+    continuations are tried first, so each position reports its longest match.
+    """
+    trie: Dict = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node: Dict) -> str:
+        terminal = "" in node
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            body = "(?:" + body + ")?"
+        return body
+
+    return emit(trie)
+
+
+class CompiledLexicon:
+    """
+    Literal phrases compiled into one automaton, with a category and weight each.
+
+    Matching is substring-based like the TypeScript `includes` checks, and
+    overlapping phrases are all reported: the regex finds the longest phrase
+    starting at each position, and every shorter phrase that is a prefix of
+    it is credited too.
+    """
+
+    def __init__(self, patterns: Sequence[Tuple[str, int, float]]):
+        index: Dict[str, int] = {}
+        categories: List[int] = []
+        weights: List[float] = []
+        for phrase, category, weight in patterns:
+            phrase = normalize(phrase)
+            if phrase and phrase not in index:
+                index[phrase] = len(categories)
+                categories.append(category)
+                weights.append(weight)
+
+        self.size = len(index)
+        self.categories = np.array(categories, dtype=np.intp)
+        self.weights = np.array(weights, dtype=np.float64)
+        # Every match resolves to the phrase itself plus its lexicon prefixes
+        self._expansion: Dict[str, Tuple[int, ...]] = {
+            phrase: tuple(index[phrase[:end]] for end in range(1, len(phrase) + 1) if phrase[:end] in index)
+            for phrase in index
+        }
+        self._regex = re.compile("(?=(" + _trie_regex(index) + "))") if index else None
+
+    def match(self, text: str) -> np.ndarray:
+        """Indices of the distinct phrases found in an already-normalized text"""
+        if self._regex is None:
+            return np.empty(0, dtype=np.intp)
+        found = set()
+        expansion = self._expansion
+        for match in self._regex.finditer(text):
+            found.update(expansion[match.group(1)])
+        return np.fromiter(found, dtype=np.intp, count=len(found))
+
+    def category_scores(self, hits: np.ndarray, once: Sequence[int] = ()) -> np.ndarray:
+        """
+        Matched phrase weights per category: summed, or for the categories in
+        `once` only the largest one
+        """
+        return self._scores(np.zeros(len(hits), dtype=np.intp), hits, 1, once)[0]
+
+    def category_scores_many(
+        self, texts: Sequence[str], once: Sequence[int] = ()
+    ) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """Per-category scores for a batch, shape (len(texts), categories)"""
+        hits = [self.match(text) for text in texts]
+        rows = np.repeat(np.arange(len(texts)), [len(h) for h in hits])
+        cols = np.concatenate(hits) if hits else np.empty(0, dtype=np.intp)
+        return self._scores(rows, cols, len(texts), once), hits
+
+    def _scores(self, rows: np.ndarray, cols: np.ndarray, count: int, once: Sequence[int]) -> np.ndarray:
+        flat = rows * len(CATEGORY_NAMES) + self.categories[cols]
+        weights = self.weights[cols]
+        scores = np.bincount(flat, weights=weights, minlength=count * len(CATEGORY_NAMES))
+        scores = scores.reshape(count, len(CATEGORY_NAMES))
+        if once:
+            strongest = np.zeros(count * len(CATEGORY_NAMES))
+            np.maximum.at(strongest, flat, weights)
+            strongest = strongest.reshape(count, len(CATEGORY_NAMES))
+            scores[:, list(once)] = strongest[:, list(once)]
+        return scores
+
+
+class GuardianSafety:
+    """
+    Project Guardian Safety Framework
+    Implements WBC (Well-Being Coefficient) scoring and risk classification
+    """
+
+    # Same lists as analyzeSafety in src/hooks/useGeminiLiveVoice.ts (a superset
+    # of supabase/functions/therapy-chat); keep them in sync
+    CRITICAL_KEYWORDS = [
+        "kill myself", "suicide", "end my life", "want to die", "better off dead",
+        "hang myself", "overdose", "kms", "unalive"
+    ]
+
+    HIGH_RISK_KEYWORDS = [
+        "self harm", "cut myself", "hurt myself", "no point", "hopeless",
+        "worthless", "can't go on"
+    ]
+
+    MODERATE_KEYWORDS = [
+        "depressed", "anxious", "sad", "worried", "scared", "alone",
+        "overwhelmed", "feeling low", "stressed"
+    ]
+
+    CATEGORY_WEIGHTS = {CRITICAL: 50.0, HIGH_RISK: 30.0, MODERATE: 10.0}
+    # Critical and high-risk matches score once per category (the TypeScript
+    # loops break on the first hit); every distinct moderate match adds up
+    ONCE_PER_CATEGORY = (CRITICAL, HIGH_RISK)
+
+    WBC_CLEAR_MAX = 20
+    WBC_CLOUDED_MAX = 50
+
+    def __init__(self, extra_patterns: Optional[Iterable[Tuple[str, int, float]]] = None):
+        """
+        Args:
+            extra_patterns: Additional (phrase, category, weight) entries, e.g. a
+                clinically reviewed lexicon; categories are CRITICAL, HIGH_RISK
+                or MODERATE
+        """
+        patterns = [
+            (keyword, category, self.CATEGORY_WEIGHTS[category])
+            for category, keywords in (
+                (CRITICAL, self.CRITICAL_KEYWORDS),
+                (HIGH_RISK, self.HIGH_RISK_KEYWORDS),
+                (MODERATE, self.MODERATE_KEYWORDS),
+            )
+            for keyword in keywords
+        ]
+        patterns.extend(extra_patterns or [])
+        self.lexicon = CompiledLexicon(patterns)
+
+    @staticmethod
+    def _wbc_scores(category_scores: np.ndarray) -> np.ndarray:
+        """
+        Combine per-category scores into WBC scores (works on one row or many).
+
+        As in the TypeScript framework, high-risk phrases only count while the
+        score is below 50 and moderate phrases only while it is below 20, e.g.
+        critical 50, hopeless + worthless 30, anxious + alone 20.
+        """
+        scores = np.atleast_2d(category_scores).astype(np.float64)
+        wbc = scores[:, CRITICAL].copy()
+        wbc += np.where(wbc < 50, scores[:, HIGH_RISK], 0.0)
+        wbc += np.where(wbc < 20, scores[:, MODERATE], 0.0)
+        return np.minimum(wbc, 100.0).astype(int)
+
+    def _analysis(self, wbc_score: int, crisis_detected: bool) -> SafetyAnalysis:
+        risk_level = self.get_risk_level(wbc_score)
+        if crisis_detected:
+            # A crisis phrase always takes the critical path, whatever the score
+            risk_level = RiskLevel.CRITICAL.value
+        return SafetyAnalysis(
+            wbc_score=wbc_score,
+            risk_level=risk_level,
+            color_code=self.get_color_code(risk_level),
+            requires_intervention=wbc_score > self.WBC_CLOUDED_MAX or crisis_detected,
+            crisis_detected=crisis_detected
+        )
+
+    def analyze_safety(self, message: str) -> SafetyAnalysis:
+        """
+        Analyze message for mental health risk indicators
+        Returns SafetyAnalysis with WBC score and risk level
+        """
+        hits = self.lexicon.match(normalize(message))
+        category_scores = self.lexicon.category_scores(hits, self.ONCE_PER_CATEGORY)
+        wbc_score = int(self._wbc_scores(category_scores)[0])
+        return self._analysis(wbc_score, bool(category_scores[CRITICAL] > 0))
+
+    def analyze_many(self, messages: Sequence[str]) -> List[SafetyAnalysis]:
+        """Analyze a batch of messages; scoring is one vectorized pass over the batch"""
+        if not messages:
+            return []
+        category_scores, _ = self.lexicon.category_scores_many(
+            [normalize(m) for m in messages], self.ONCE_PER_CATEGORY
+        )
+        wbc_scores = self._wbc_scores(category_scores)
+        crisis = category_scores[:, CRITICAL] > 0
+        return [self._analysis(int(score), bool(flag)) for score, flag in zip(wbc_scores, crisis)]
+
+    def get_risk_level(self, wbc_score: int) -> str:
+        """Map WBC score to risk level"""
+        if wbc_score >= 51:
+            return RiskLevel.CRITICAL.value
+        elif wbc_score >= 21:
+            return RiskLevel.CLOUDED.value
+        return RiskLevel.CLEAR.value
+
+    @staticmethod
+    def get_color_code(risk_level: str) -> str:
+        """Get UI color code for risk level"""
+        colors = {
+            RiskLevel.CLEAR.value: "#10b981",
+            RiskLevel.CLOUDED.value: "#f59e0b",
+            RiskLevel.CRITICAL.value: "#ef4444",
+        }
+        return colors.get(risk_level, colors[RiskLevel.CLEAR.value])
+
+    @staticmethod
+    def get_safety_instructions(risk_level: str) -> str:
+        """
+        Get adaptive safety instructions based on risk level
+        Matches voice-therapy-token Edge Function logic
+        """
+        return SAFETY_BASE_INSTRUCTIONS + GuardianSafety.get_risk_instructions(risk_level)
+
+    @staticmethod
+    def get_risk_instructions(risk_level: str) -> str:
+        """The risk-level specific part of get_safety_instructions (after SAFETY_BASE_INSTRUCTIONS)"""
+        if risk_level == RiskLevel.CRITICAL.value:
+            return """
+
+🚨 CRITICAL RISK LEVEL DETECTED 🚨
+
+IMMEDIATE INTERVENTION REQUIRED:
+1. Express serious concern for their safety
+2. STRONGLY urge them to call 988 Suicide & Crisis Lifeline NOW
+3. Refuse to engage with harmful content
+4. Provide emergency resources (988, 911, Crisis Text Line)
+5. Do NOT continue regular conversation - focus ONLY on safety
+
+Say something like:
+"I'm really concerned about what you're sharing. I can't and won't provide information
+that could be harmful. Please call 988 right now - they're available 24/7 to help you
+through this. Your life has value, and there are people who want to help you."
+"""
+        elif risk_level == RiskLevel.CLOUDED.value:
+            return """
+
+⚠️ ELEVATED RISK LEVEL
+
+Additional Caution Required:
+- Monitor conversation closely for escalation
+- Gently redirect toward positive coping strategies
+- Mention crisis resources proactively (988, Crisis Text Line)
+- Encourage professional mental health support
+- Validate their pain while promoting safety and hope
+"""
+        return """
+
+✅ CLEAR STATUS
+
+Standard Therapeutic Approach:
+- Use CBT techniques (thought challenging, behavioral activation)
+- Ask open-ended questions
+- Practice active listening
+- Teach coping strategies
+- Encourage goal-setting and progress tracking
+"""
@@ -3,26 +3,115 @@ FastAPI Voice Therapy Backend
 Implements cd-irvan pipeline with Guardian Safety Framework
 """
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Header
+import time
+_import_started = time.perf_counter()
+
+from dotenv import load_dotenv
+
+# Load .env once, before any module reads its configuration at import time
+load_dotenv()
+
+from fastapi import FastAPI, UploadFile, File, HTTPException, Header, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from openai import OpenAI
 import os
-from dotenv import load_dotenv
-import tempfile
+from contextlib import asynccontextmanager
 from guardian_safety import GuardianSafety, RiskLevel
-from minimax_service import MinimaxVoiceService
-from typing import List, Dict, Optional
+from minimax_service import AsyncMinimaxVoiceService
+from audio_input import AudioClip, as_file
+from audio_preprocess import preprocess
+from audio_output import AudioFormat, FORMATS, negotiate, plan, minimax_audio_setting, openai_response_format, transcode
+from gemini_service import GeminiTranscriptionService
+from asr_racing import HedgedASR
+from starlette.formparsers import MultiPartParser
+from streaming import stream_spoken_reply, prime_stream, replay_text, ndjson
+from voice_session import VoiceSession
+from audio_store import AudioStore, AUDIO_ID_PATTERN, parse_range
+from tts_cache import TTSCache, load_warmup_phrases
+from session_context import SessionContext, SessionContextManager
+from speculation import SpeculativeGenerator
+from semantic_cache import SemanticResponseCache
+from prompt_bundles import PromptBundles
+from deadline import Deadline, DeadlineExceeded
+from upload_admission import UploadAdmission, AdmissionMiddleware, inspect as inspect_audio
+import metrics
+from metrics import stage
+import httpx
+import math
+from upstream_limits import AdaptiveLimiter, ProviderBusy
+from provider_router import ProviderRouter
+from shared_state import state_backend_from_env
+import asyncio
+import json
+from functools import partial
+from typing import Awaitable, Callable, List, Dict, Optional
 
-load_dotenv()
+# Import SDKs and open provider connections in the background after startup;
+# /ready reports 503 until that has finished
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() in ("1", "true", "yes")
+STARTUP_PREWARM_CONNECTIONS = int(os.getenv("STARTUP_PREWARM_CONNECTIONS", "2"))
+
+# Degradations when a turn is running out of its deadline (see deadline.py)
+REPLY_MAX_TOKENS = 300
+DEGRADED_MAX_TOKENS = int(os.getenv("DEGRADED_MAX_TOKENS", "120"))
+MINIMAX_FAST_TTS_MODEL = os.getenv("MINIMAX_FAST_TTS_MODEL", "speech-02-turbo")
+MIN_TTS_SECONDS = float(os.getenv("MIN_TTS_SECONDS", "0.5"))
+
+startup = {"ready": False, "import_seconds": None, "warmup_seconds": None, "ready_seconds": None, "prewarmed": {}}
 
-app = FastAPI(title="Voice Therapy API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the audio store reaper and provider/model warm-up; release pooled upstream connections on shutdown"""
+    background = [asyncio.create_task(audio_store.run_reaper())]
+    if STARTUP_WARMUP:
+        background.append(asyncio.create_task(warm_up_providers()))
+    else:
+        mark_ready()
+    if os.getenv("TTS_WARMUP", "").lower() in ("1", "true", "yes"):
+        background.append(asyncio.create_task(warm_up_tts_cache()))
+    if response_cache.enabled:
+        background.append(asyncio.create_task(warm_up_semantic_cache()))
+    yield
+    for task in background:
+        task.cancel()
+    if _openai_client is not None:
+        await _openai_client.close()
+    else:
+        await openai_http.aclose()
+    if minimax:
+        await minimax.aclose()
+
+
+app = FastAPI(title="Voice Therapy API", version="1.0.0", lifespan=lifespan)
 
 # Constants
 MAX_FILE_SIZE = 25 * 1024 * 1024  # 25MB
 ALLOWED_CONTENT_TYPES = ['audio/webm', 'audio/wav', 'audio/mp3', 'audio/mpeg', 'audio/ogg', 'audio/x-wav']
 
+# Keep accepted uploads in memory instead of letting the multipart parser
+# roll them over to a temp file at 1MB; the spooled buffer is then the only
+# copy of the audio and is streamed straight to the ASR provider
+# (starlette < 0.38 calls the threshold max_file_size, later versions spool_max_size)
+SPOOL_THRESHOLD_ATTR = "spool_max_size" if hasattr(MultiPartParser, "spool_max_size") else "max_file_size"
+setattr(MultiPartParser, SPOOL_THRESHOLD_ATTR, MAX_FILE_SIZE)
+
+# Size, codec and duration limits enforced while an upload is still streaming
+# in; rejected bodies are abandoned instead of being parsed in full
+upload_admission = UploadAdmission.from_env(
+    MAX_FILE_SIZE, observer=lambda reason, phase: metrics.UPLOAD_REJECTIONS.labels(reason, phase).inc()
+)
+UPLOAD_PATHS = (
+    "/api/voice-therapy",
+    "/api/voice-therapy-minimax",
+    "/api/voice-therapy-auto",
+    "/api/voice-therapy-stream",
+)
+# Added before CORS so its rejections still carry the CORS headers
+app.add_middleware(AdmissionMiddleware, admission=upload_admission, paths=UPLOAD_PATHS)
+
 # CORS middleware for React frontend - Secure configuration
 app.add_middleware(
     CORSMiddleware,
@@ -35,22 +124,91 @@ app.add_middleware(
     ],
     allow_credentials=True,
     allow_methods=["POST", "GET", "OPTIONS"],
-    allow_headers=["authorization", "content-type", "x-client-info", "apikey"],
+    allow_headers=["authorization", "content-type", "x-client-info", "apikey", "x-audio-accept"],
+)
+
+# Connection pool for the OpenAI client (async so upstream calls never block
+# the event loop). It mirrors the SDK defaults and adds the metrics hooks.
+openai_http = httpx.AsyncClient(
+    timeout=httpx.Timeout(600.0, connect=5.0),
+    limits=httpx.Limits(max_connections=1000, max_keepalive_connections=100),
+    event_hooks=metrics.upstream_hooks("openai"),
 )
+_openai_client = None
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+def openai_client():
+    """OpenAI client; the SDK (slow to import) is loaded on first use or by the warm-up task"""
+    global _openai_client
+    if _openai_client is None:
+        from openai import AsyncOpenAI
+        _openai_client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            # Retries happen in the provider limiter, which also adapts to 429s
+            max_retries=0,
+            http_client=openai_http,
+        )
+    return _openai_client
+
+# Cross-worker state (audio, sessions); None keeps everything in this process
+shared_state = state_backend_from_env()
+
+# Generated TTS audio, served back through /audio/{audio_id}
+audio_store = AudioStore.from_env(shared=shared_state)
+
+# Content-addressed cache of synthesized sentences
+tts_cache = TTSCache.from_env()
+
+# Server-side conversation history, token-budgeted per session
+session_contexts = SessionContextManager.from_env(shared=shared_state)
+
+# Per-provider adaptive concurrency limits with bounded wait queues
+limiters = {name: AdaptiveLimiter.from_env(name) for name in ("openai", "minimax", "gemini")}
 
 # Guardian safety instance
 guardian = GuardianSafety()
 
+# System prompts per (provider, risk level), token-counted once here so every
+# request shares a byte-identical prefix the providers can cache
+prompt_bundles = PromptBundles()
+
+# Optionally start the LLM call while Guardian is still scoring the transcript
+speculator = SpeculativeGenerator(
+    enabled=os.getenv("SPECULATIVE_LLM", "").lower() in ("1", "true", "yes")
+)
+
+# Opt-in reuse of replies to near-duplicate clear-risk turns
+response_cache = SemanticResponseCache.from_env()
+metrics.add_observer(response_cache.observe)
+
 # Minimax voice service
 try:
-    minimax = MinimaxVoiceService()
+    minimax = AsyncMinimaxVoiceService(
+        event_hooks=metrics.upstream_hooks("minimax"),
+        usage_observer=lambda usage: record_prompt_usage("minimax", usage)
+    )
 except Exception as e:
     print(f"Warning: Minimax service not available: {e}")
     minimax = None
 
+# Gemini ASR fallback, configured up front so a fallback never pays for SDK setup
+try:
+    gemini = GeminiTranscriptionService()
+except Exception as e:
+    print(f"Warning: Gemini ASR fallback not available: {e}")
+    gemini = None
+
+# Per-stage provider choice for the auto-routed endpoint; every instrumented
+# provider call (from any endpoint) feeds its circuit breakers
+_openai_ready = ["openai"] if os.getenv("OPENAI_API_KEY") else []
+_minimax_ready = ["minimax"] if minimax else []
+router = ProviderRouter.from_env({
+    "asr": _openai_ready + _minimax_ready + (["gemini"] if gemini else []),
+    "llm": _openai_ready + _minimax_ready,
+    "tts": _openai_ready + _minimax_ready,
+})
+metrics.add_observer(router.observe)
+
 
 class Message(BaseModel):
     role: str
@@ -66,28 +224,437 @@ class ConversationRequest(BaseModel):
 class VoiceResponse(BaseModel):
     transcript: str
     response: str
-    audio_url: str
+    audio_url: Optional[str] = None  # None when the reply is text only
     safety: Dict
     wbc_score: int
     risk_level: str
     crisis_detected: bool
+    providers: Optional[Dict[str, str]] = None
+    audio_format: Optional[str] = None
+    degraded: Optional[List[str]] = None
 
 
-async def validate_audio_upload(audio: UploadFile) -> bytes:
-    """Validate audio file type and size, return content bytes."""
+async def validate_audio_upload(audio: UploadFile) -> AudioClip:
+    """Validate audio file type, size and duration, return the upload as an AudioClip.
+    
+    The clip wraps the parser's spooled file, so the audio is not copied. Only
+    the first and last few KB are read to check the codec from its magic bytes
+    (the declared content type is replaced when it disagrees) and the duration
+    from the container header. Bodies over the size limit never get this far
+    (see AdmissionMiddleware).
+    """
     # Validate content type
-    if audio.content_type and audio.content_type not in ALLOWED_CONTENT_TYPES:
-        raise HTTPException(status_code=400, detail='Invalid file type. Allowed: webm, wav, mp3, mpeg, ogg')
+    declared = (audio.content_type or "").split(";")[0].strip().lower()
+    if declared and declared not in ALLOWED_CONTENT_TYPES:
+        raise upload_admission.reject(400, "content_type", 'Invalid file type. Allowed: webm, wav, mp3, mpeg, ogg', "parsed")
 
-    # Read and validate size
-    content = await audio.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=413, detail=f'File too large. Maximum {MAX_FILE_SIZE // (1024*1024)}MB allowed.')
+    # Validate size without reading the content
+    size = audio.size
+    if size is None:
+        audio.file.seek(0, os.SEEK_END)
+        size = audio.file.tell()
+    audio.file.seek(0)
     
-    if len(content) == 0:
+    if size > MAX_FILE_SIZE:
+        raise upload_admission.too_large("parsed")
+    
+    if size == 0:
         raise HTTPException(status_code=400, detail='Empty audio file.')
 
-    return content
+    info = upload_admission.check_file(audio.file, size)
+
+    metrics.AUDIO_BYTES.labels("in").inc(size)
+    filename = audio.filename or "audio.webm"
+    if info.content_type != audio.content_type:
+        filename = f"{os.path.splitext(filename)[0]}.{info.codec}"
+    return AudioClip(
+        data=audio.file,
+        filename=filename,
+        content_type=info.content_type,
+        seconds=info.seconds
+    )
+
+
+AUDIO_PREPROCESS = os.getenv("AUDIO_PREPROCESS", "true").lower() in ("1", "true", "yes")
+
+
+async def prepare_clip(clip: AudioClip) -> AudioClip:
+    """Trim silence and downmix/re-encode before ASR (falls back to the original clip)"""
+    if not AUDIO_PREPROCESS:
+        return clip
+    try:
+        with stage("preprocess"):
+            result = await run_in_threadpool(preprocess, clip)
+    except Exception as e:
+        print(f"Audio preprocessing failed, sending original audio: {e}")
+        metrics.FALLBACKS.labels("preprocess", "preprocessed", "original").inc()
+        return clip
+    return result.clip if result else clip
+
+
+async def transcribe_openai(clip: AudioClip) -> str:
+    """Transcribe with Whisper (the SDK streams the file object in chunks)"""
+    with stage("asr", "openai"):
+        transcript_response = await limiters["openai"].call(lambda: openai_client().audio.transcriptions.create(
+            model="whisper-1",
+            file=(clip.filename, as_file(clip.data), clip.content_type),
+            response_format="text"
+        ))
+    return transcript_response if isinstance(transcript_response, str) else transcript_response.text
+
+
+async def _minimax_asr(clip: AudioClip) -> str:
+    with stage("asr", "minimax"):
+        return await limiters["minimax"].call(
+            lambda: minimax.speech_to_text(clip.data, filename=clip.filename, content_type=clip.content_type)
+        )
+
+
+async def _gemini_asr(clip: AudioClip) -> str:
+    with stage("asr", "gemini"):
+        return await limiters["gemini"].call(lambda: gemini.speech_to_text(clip))
+
+
+def build_minimax_asr() -> Optional[HedgedASR]:
+    """Minimax ASR, hedged with Gemini when it is configured"""
+    if not minimax:
+        return None
+    providers = [("minimax", _minimax_asr)]
+    if gemini:
+        providers.append(("gemini", _gemini_asr))
+    return HedgedASR(
+        providers,
+        default_delay=float(os.getenv("ASR_HEDGE_DEFAULT_DELAY", "2.0")),
+        max_delay=float(os.getenv("ASR_HEDGE_MAX_DELAY", "6.0")),
+    )
+
+
+minimax_asr = build_minimax_asr()
+
+
+async def transcribe_minimax(clip: AudioClip) -> str:
+    """Transcribe with Minimax, racing Gemini if Minimax is slow or fails"""
+    transcript, provider = await minimax_asr.transcribe(clip)
+    if provider != "minimax":
+        metrics.FALLBACKS.labels("asr", "minimax", provider).inc()
+    return transcript
+
+
+def build_messages(
+    provider: str,
+    transcript: str,
+    risk_level,
+    history: Optional[List[Dict]] = None
+) -> List[Dict]:
+    """Messages for one turn, starting with the provider's prebuilt system prompt bundle"""
+    return prompt_bundles.get(provider, risk_level).build(transcript, history)
+
+
+def record_prompt_usage(provider: str, usage) -> None:
+    """Count a completion's prompt tokens, split by whether the provider's prompt cache served them"""
+    prompt_tokens, cached_tokens = prompt_bundles.record_usage(provider, usage)
+    if prompt_tokens:
+        metrics.LLM_PROMPT_TOKENS.labels(provider, "true").inc(cached_tokens)
+        metrics.LLM_PROMPT_TOKENS.labels(provider, "false").inc(prompt_tokens - cached_tokens)
+
+
+async def conversation_context(user_id: str, session_id: str, message_history: str = "[]") -> SessionContext:
+    """
+    History for this request.
+    
+    With a user_id and session_id the server keeps the history per user
+    (seeded once from the client's message_history); otherwise the client
+    copy is used, trimmed to the same token budget.
+    """
+    if user_id and session_id:
+        return await session_contexts.get_async(user_id, session_id, message_history)
+    return session_contexts.ephemeral(message_history)
+
+
+async def guarded_generation(
+    provider: str,
+    transcript: str,
+    context: SessionContext,
+    generate,
+    llm_stage: str = "llm",
+    replay=None
+):
+    """
+    Run Guardian on the transcript and generate with the matching instructions.
+    
+    `generate(messages)` is awaited with the full message list; with
+    SPECULATIVE_LLM enabled it is started before Guardian finishes.
+    
+    With SEMANTIC_CACHE enabled, clear-risk turns may be answered from the
+    response cache instead. `replay(text)` turns a cached reply into what
+    `generate` returns (a token stream for streaming callers; by default
+    the reply text itself). Replies are only cached once Guardian has
+    confirmed the turn is clear.
+    
+    Returns:
+        (safety_analysis, result of generate)
+    """
+    history = context.history_messages()
+    queries = {}
+    
+    def analyze():
+        with stage("guardian"):
+            return guardian.analyze_safety(transcript)
+    
+    async def generate_for(risk_level):
+        if response_cache.enabled:
+            query = await run_in_threadpool(
+                response_cache.lookup, provider, transcript, risk_level, len(history) // 2, llm_stage
+            )
+            queries[risk_level] = query
+            metrics.SEMANTIC_CACHE.labels(query.result).inc()
+            if query.reply is not None:
+                metrics.SEMANTIC_CACHE_SAVED.labels(provider).inc(query.saved_seconds)
+                return replay(query.reply) if replay else query.reply
+        with stage(llm_stage, provider):
+            return await generate(build_messages(provider, transcript, risk_level, history))
+    
+    safety_analysis, result = await speculator.run(analyze, generate_for)
+    query = queries.get(safety_analysis.risk_level)
+    if query is not None and query.cacheable:
+        if replay:
+            result = response_cache.add_when_complete(query, result)
+        else:
+            response_cache.add(query, result)
+    return safety_analysis, result
+
+
+async def openai_chat(messages: List[Dict], max_tokens: int = REPLY_MAX_TOKENS) -> str:
+    chat_response = await limiters["openai"].call(lambda: openai_client().chat.completions.create(
+        model="gpt-4",
+        messages=messages,
+        temperature=0.7,
+        max_tokens=max_tokens
+    ))
+    record_prompt_usage("openai", chat_response.usage)
+    return chat_response.choices[0].message.content
+
+
+async def minimax_chat(messages: List[Dict], max_tokens: int = REPLY_MAX_TOKENS) -> str:
+    return await limiters["minimax"].call(
+        lambda: minimax.chat_completion(messages=messages, temperature=0.7, max_tokens=max_tokens)
+    )
+
+
+def record_budget(stage_name: str, spent: float, budget: float, outcome: str) -> None:
+    if 0 < budget < math.inf:
+        metrics.STAGE_BUDGET.labels(stage_name, outcome).observe(spent / budget)
+
+
+def new_deadline() -> Deadline:
+    """Deadline for one turn; every stage's budget consumption goes to metrics"""
+    return Deadline.from_env(observer=record_budget)
+
+
+def degrade(deadline: Deadline, stage_name: str, action: str) -> None:
+    deadline.degrade(stage_name, action)
+    metrics.DEGRADATIONS.labels(stage_name, action).inc()
+
+
+def reply_max_tokens(deadline: Deadline) -> int:
+    """Full-length replies unless earlier stages ate into the time the reply and its audio need"""
+    if deadline.short_for("llm", "tts"):
+        degrade(deadline, "llm", "short_reply")
+        return DEGRADED_MAX_TOKENS
+    return REPLY_MAX_TOKENS
+
+
+async def spoken_audio(
+    deadline: Deadline,
+    synthesize: Callable[[], Awaitable],
+    fast: Optional[Callable[[], Awaitable]] = None
+):
+    """
+    Run TTS within its budget.
+    
+    Uses `fast` (a quicker voice model) when the turn can no longer afford
+    the full TTS budget, and gives up on audio (returns None, text-only
+    reply) when there is no time left or the budget runs out.
+    """
+    if deadline.remaining() < MIN_TTS_SECONDS:
+        degrade(deadline, "tts", "text_only")
+        return None
+    if fast is not None and deadline.short_for("tts"):
+        degrade(deadline, "tts", "fast_voice")
+        synthesize = fast
+    try:
+        return await deadline.run("tts", synthesize)
+    except DeadlineExceeded:
+        degrade(deadline, "tts", "text_only")
+        return None
+
+
+def deadline_error(error: DeadlineExceeded) -> HTTPException:
+    print(f"Voice turn deadline exceeded: {error}")
+    return HTTPException(status_code=504, detail="Voice therapy took too long to respond. Please try again.")
+
+
+def busy_error(error: ProviderBusy) -> HTTPException:
+    """Fast 503 telling the client roughly when capacity should be available"""
+    retry_after = max(1, math.ceil(error.retry_after))
+    return HTTPException(
+        status_code=503,
+        detail=f"Voice therapy service is busy. Please retry in about {retry_after}s.",
+        headers={"Retry-After": str(retry_after)}
+    )
+
+
+def safety_payload(safety_analysis) -> Dict:
+    return {
+        "wbc_score": safety_analysis.wbc_score,
+        "risk_level": safety_analysis.risk_level,
+        "color_code": safety_analysis.color_code,
+        "requires_intervention": safety_analysis.requires_intervention
+    }
+
+
+def output_format(headers, requested: str = "") -> AudioFormat:
+    """
+    Negotiate the TTS output format for a request.
+    
+    An explicit `audio_format` wins; otherwise X-Audio-Accept (or Accept, if
+    it lists audio types) picks the codec and the Save-Data / ECT / Downlink
+    client hints switch MP3 to low bitrate on slow connections.
+    """
+    return negotiate(
+        requested or None,
+        accept=headers.get("x-audio-accept") or headers.get("accept"),
+        save_data=headers.get("save-data"),
+        ect=headers.get("ect"),
+        downlink=headers.get("downlink"),
+    )
+
+
+def request_format(request: Request, requested: str) -> AudioFormat:
+    try:
+        return output_format(request.headers, requested)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def record_turn_audio(endpoint: str, fmt: AudioFormat, size: int, started: float) -> None:
+    """Bandwidth per turn and request-to-audio time, by delivered format"""
+    metrics.TURN_AUDIO_BYTES.labels(fmt.name).observe(size)
+    metrics.TIME_TO_AUDIO.labels(endpoint, fmt.name).observe(time.perf_counter() - started)
+
+
+async def _openai_speech(text: str, response_format: str = "mp3") -> bytes:
+    tts_response = await limiters["openai"].call(
+        lambda: openai_client().audio.speech.create(
+            model="tts-1", voice="nova", input=text, response_format=response_format
+        )
+    )
+    return tts_response.content
+
+
+async def _minimax_speech(text: str, audio_setting: Optional[Dict] = None, model: Optional[str] = None) -> bytes:
+    return await limiters["minimax"].call(
+        lambda: minimax.text_to_speech(text=text, speed=1.0, pitch=0, audio_setting=audio_setting, model=model)
+    )
+
+
+async def encode_output(audio: bytes, source: AudioFormat, target: AudioFormat) -> bytes:
+    """Transcode provider audio when it was rendered as PCM for a format the provider lacks"""
+    if source == target:
+        return audio
+    with stage("transcode", target.name):
+        return await run_in_threadpool(transcode, audio, target)
+
+
+async def openai_tts(text: str, fmt: AudioFormat = FORMATS["mp3"]) -> bytes:
+    """Speak `text` with OpenAI tts-1 in `fmt`, reusing cached sentences"""
+    source, target = plan("openai", fmt)
+    with stage("tts", "openai"):
+        audio = await tts_cache.synthesize(
+            text, partial(_openai_speech, response_format=openai_response_format(source)),
+            provider="openai", model="tts-1", voice_id="nova", audio_format=source.name
+        )
+    return await encode_output(audio, source, target)
+
+
+async def minimax_tts(text: str, fmt: AudioFormat = FORMATS["mp3"], model: str = "speech-02-hd") -> bytes:
+    """Speak `text` with the cloned Minimax voice in `fmt`, reusing cached sentences"""
+    source, target = plan("minimax", fmt)
+    with stage("tts", "minimax"):
+        audio = await tts_cache.synthesize(
+            text, partial(_minimax_speech, audio_setting=minimax_audio_setting(source), model=model),
+            provider="minimax", model=model,
+            voice_id=minimax.voice_id, speed=1.0, pitch=0, vol=1.0, audio_format=source.name
+        )
+    return await encode_output(audio, source, target)
+
+
+def mark_ready() -> None:
+    startup["ready"] = True
+    startup["ready_seconds"] = round(time.perf_counter() - _import_started, 3)
+
+
+async def prewarm_connections(http: httpx.AsyncClient, url: str) -> int:
+    """
+    Open pooled keep-alive connections to a provider host ahead of traffic.
+    
+    Any HTTP response counts: the point is the TCP/TLS handshake, which then
+    stays in the pool for the first real calls. Returns connections opened.
+    """
+    async def connect() -> bool:
+        try:
+            await http.head(url, timeout=5.0)
+            return True
+        except httpx.HTTPError as e:
+            print(f"Warning: could not pre-warm {url}: {type(e).__name__}: {e}")
+            return False
+    
+    results = await asyncio.gather(*(connect() for _ in range(STARTUP_PREWARM_CONNECTIONS)))
+    return sum(results)
+
+
+async def warm_up_providers():
+    """Import provider SDKs and open their connections before the first request needs them"""
+    started = time.perf_counter()
+    try:
+        if os.getenv("OPENAI_API_KEY"):
+            await run_in_threadpool(openai_client)
+            startup["prewarmed"]["openai"] = await prewarm_connections(openai_http, str(openai_client().base_url))
+        if minimax:
+            startup["prewarmed"]["minimax"] = await prewarm_connections(minimax._client, minimax.base_url)
+        if gemini:
+            await run_in_threadpool(gemini.warm_up)
+            startup["prewarmed"]["gemini"] = 1
+    except Exception as e:
+        print(f"Warning: provider warm-up failed: {type(e).__name__}: {e}")
+    finally:
+        startup["warmup_seconds"] = round(time.perf_counter() - started, 3)
+        mark_ready()
+        print(f"Startup: ready after {startup['ready_seconds']}s (warm-up {startup['warmup_seconds']}s)")
+
+
+async def warm_up_tts_cache():
+    """Pre-render the configured phrase list for every available TTS provider"""
+    phrases = load_warmup_phrases()
+    if os.getenv("OPENAI_API_KEY"):
+        await tts_cache.warm_up(phrases, _openai_speech, provider="openai", model="tts-1", voice_id="nova")
+    if minimax:
+        await tts_cache.warm_up(
+            phrases, _minimax_speech, provider="minimax", model="speech-02-hd",
+            voice_id=minimax.voice_id, speed=1.0, pitch=0, vol=1.0
+        )
+    print(f"TTS cache warmed: {tts_cache.stats()}")
+
+
+async def warm_up_semantic_cache():
+    """Load the semantic cache's embedding model (and download it on first deploy) off the request path"""
+    started = time.perf_counter()
+    try:
+        await run_in_threadpool(response_cache.warm_up)
+    except Exception as e:
+        print(f"Warning: semantic cache model failed to load, cache stays bypassed: {type(e).__name__}: {e}")
+        return
+    print(f"Semantic cache model loaded in {time.perf_counter() - started:.1f}s")
 
 
 @app.get("/")
@@ -97,10 +664,12 @@ async def root():
 
 @app.post("/api/voice-therapy", response_model=VoiceResponse)
 async def voice_therapy(
+    request: Request,
     audio: UploadFile = File(...),
     user_id: str = "",
     session_id: str = "",
-    message_history: str = "[]"
+    message_history: str = "[]",
+    audio_format: str = ""
 ):
     """
     Complete voice therapy pipeline:
@@ -108,119 +677,112 @@ async def voice_therapy(
     2. Analyze safety (Guardian)
     3. Generate response (GPT with adaptive safety)
     4. Convert to speech (TTS)
-    """
-    temp_audio_path = None
     
+    The audio is encoded in the format negotiated from `audio_format` or the
+    client hints (see output_format). Stages run within the turn deadline;
+    a late turn gets a shorter reply or comes back text-only (`degraded`).
+    """
+    started = time.perf_counter()
+    deadline = new_deadline()
+    fmt = request_format(request, audio_format)
     try:
-        # Validate and read audio
-        content = await validate_audio_upload(audio)
-        
-        # Save uploaded audio temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as temp_audio:
-            temp_audio.write(content)
-            temp_audio_path = temp_audio.name
+        # Validate and preprocess audio
+        with stage("upload"):
+            clip = await validate_audio_upload(audio)
+        clip = await prepare_clip(clip)
         
         # Transcribe with Whisper
-        with open(temp_audio_path, "rb") as audio_file:
-            transcript_response = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                response_format="text"
-            )
-        transcript = transcript_response if isinstance(transcript_response, str) else transcript_response.text
-        
-        # Guardian Safety Analysis
-        safety_analysis = guardian.analyze_safety(transcript)
-        
-        # Get adaptive safety instructions
-        safety_instructions = guardian.get_safety_instructions(safety_analysis.risk_level)
-        
-        # Generate response with GPT
-        messages = [
-            {"role": "system", "content": safety_instructions},
-            {"role": "user", "content": transcript}
-        ]
-        
-        cbt_context = """
-        Use Cognitive Behavioral Therapy (CBT) techniques:
-        - Ask open-ended questions
-        - Help identify thought patterns
-        - Challenge negative thoughts gently
-        - Encourage behavioral activation
-        - Teach coping strategies
-        - Validate feelings while promoting realistic thinking
-        """
-        messages.insert(1, {"role": "system", "content": cbt_context})
+        transcript = await deadline.run("asr", lambda: transcribe_openai(clip), audio_seconds=clip.seconds)
         
-        chat_response = client.chat.completions.create(
-            model="gpt-4",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=300
+        # Guardian Safety Analysis, then GPT with the adaptive safety instructions
+        context = await conversation_context(user_id, session_id, message_history)
+        chat = partial(openai_chat, max_tokens=reply_max_tokens(deadline))
+        safety_analysis, response_text = await deadline.run(
+            "llm", lambda: guarded_generation("openai", transcript, context, chat)
         )
-        
-        response_text = chat_response.choices[0].message.content
+        await context.add_turn_async(transcript, response_text)
         
         # Convert response to speech
-        tts_response = client.audio.speech.create(
-            model="tts-1",
-            voice="nova",
-            input=response_text
-        )
-        
-        # Save TTS audio
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as temp_tts:
-            tts_response.stream_to_file(temp_tts.name)
-            tts_audio_path = temp_tts.name
+        audio_bytes = await spoken_audio(deadline, lambda: openai_tts(response_text, fmt))
+        audio_url = delivered = None
+        if audio_bytes is not None:
+            delivered = plan("openai", fmt)[1]
+            record_turn_audio("voice-therapy", delivered, len(audio_bytes), started)
+            
+            # Store TTS audio
+            with stage("persist"):
+                audio_url = f"/audio/{await audio_store.put_async(audio_bytes, media_type=delivered.media_type)}"
         
         return VoiceResponse(
             transcript=transcript,
             response=response_text,
-            audio_url=f"/audio/{os.path.basename(tts_audio_path)}",
-            safety={
-                "wbc_score": safety_analysis.wbc_score,
-                "risk_level": safety_analysis.risk_level,
-                "color_code": safety_analysis.color_code,
-                "requires_intervention": safety_analysis.requires_intervention
-            },
+            audio_url=audio_url,
+            safety=safety_payload(safety_analysis),
             wbc_score=safety_analysis.wbc_score,
             risk_level=safety_analysis.risk_level,
-            crisis_detected=safety_analysis.crisis_detected
+            crisis_detected=safety_analysis.crisis_detected,
+            audio_format=delivered.name if delivered else None,
+            degraded=deadline.degraded or None
         )
         
     except HTTPException:
         raise
+    except DeadlineExceeded as e:
+        raise deadline_error(e)
+    except ProviderBusy as e:
+        raise busy_error(e)
     except Exception as e:
+        print(f"Voice therapy pipeline failed: {type(e).__name__}: {e}")
         raise HTTPException(status_code=500, detail="Voice therapy service temporarily unavailable.")
-    finally:
-        # Ensure temp files are cleaned up
-        if temp_audio_path and os.path.exists(temp_audio_path):
-            os.unlink(temp_audio_path)
 
 
-@app.get("/audio/{filename}")
-async def get_audio(filename: str):
-    """Serve generated TTS audio files"""
-    # Validate filename to prevent path traversal
-    if '/' in filename or '\\' in filename or '..' in filename:
-        raise HTTPException(status_code=400, detail="Invalid filename")
+@app.get("/audio/{audio_id}")
+async def get_audio(audio_id: str, request: Request):
+    """Serve generated TTS audio from the audio store (supports Range requests)"""
+    if not AUDIO_ID_PATTERN.match(audio_id):
+        raise HTTPException(status_code=400, detail="Invalid audio id")
+    
+    artifact = await audio_store.get_async(audio_id)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Audio file not found")
+    
+    size = len(artifact.data)
+    headers = {"Accept-Ranges": "bytes", "Cache-Control": "private, max-age=300"}
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except ValueError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    
+    if byte_range is None:
+        metrics.AUDIO_BYTES.labels("out").inc(size)
+        return Response(content=artifact.data, media_type=artifact.media_type, headers=headers)
     
-    audio_path = os.path.join(tempfile.gettempdir(), filename)
-    if os.path.exists(audio_path):
-        return FileResponse(audio_path, media_type="audio/mpeg")
-    raise HTTPException(status_code=404, detail="Audio file not found")
+    start, end = byte_range
+    metrics.AUDIO_BYTES.labels("out").inc(end + 1 - start)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(
+        content=artifact.data[start:end + 1],
+        status_code=206,
+        media_type=artifact.media_type,
+        headers=headers
+    )
 
 
 @app.post("/api/voice-therapy-minimax", response_model=VoiceResponse)
 async def voice_therapy_minimax(
+    request: Request,
     audio: UploadFile = File(...),
     user_id: str = "",
     session_id: str = "",
-    message_history: str = "[]"
+    message_history: str = "[]",
+    audio_format: str = ""
 ):
     """
     Voice therapy pipeline using Minimax AI.
     """
+    started = time.perf_counter()
+    deadline = new_deadline()
+    fmt = request_format(request, audio_format)
     
     if not minimax:
         raise HTTPException(
@@ -228,97 +790,500 @@ async def voice_therapy_minimax(
             detail="Minimax service not available. Check API key configuration."
         )
     
-    temp_audio_path = None
-    
     try:
-        # Validate and read audio
-        content = await validate_audio_upload(audio)
-        
-        # Save uploaded audio temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as temp_audio:
-            temp_audio.write(content)
-            temp_audio_path = temp_audio.name
+        # Validate and preprocess audio
+        with stage("upload"):
+            clip = await validate_audio_upload(audio)
+        clip = await prepare_clip(clip)
         
         # Transcribe with Minimax (or fallback to Gemini)
-        try:
-            transcript = minimax.speech_to_text(temp_audio_path)
-        except Exception as e:
-            print(f"Minimax ASR failed, using Gemini: {e}")
-            
-            import google.generativeai as genai
-            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        transcript = await deadline.run("asr", lambda: transcribe_minimax(clip), audio_seconds=clip.seconds)
+        
+        # Guardian Safety Analysis, then Minimax LLM with the adaptive safety instructions
+        context = await conversation_context(user_id, session_id, message_history)
+        chat = partial(minimax_chat, max_tokens=reply_max_tokens(deadline))
+        safety_analysis, response_text = await deadline.run(
+            "llm", lambda: guarded_generation("minimax", transcript, context, chat)
+        )
+        await context.add_turn_async(transcript, response_text)
+        
+        # Convert response to speech with cloned voice
+        audio_bytes = await spoken_audio(
+            deadline,
+            lambda: minimax_tts(response_text, fmt),
+            fast=lambda: minimax_tts(response_text, fmt, model=MINIMAX_FAST_TTS_MODEL)
+        )
+        audio_url = delivered = None
+        if audio_bytes is not None:
+            delivered = plan("minimax", fmt)[1]
+            record_turn_audio("voice-therapy-minimax", delivered, len(audio_bytes), started)
             
-            audio_file = genai.upload_file(temp_audio_path)
-            model = genai.GenerativeModel("gemini-1.5-pro")
-            result = model.generate_content([
-                "Transcribe this audio exactly. Return only the transcribed text, nothing else.",
-                audio_file
-            ])
-            transcript = result.text.strip()
+            # Store TTS audio
+            with stage("persist"):
+                audio_url = f"/audio/{await audio_store.put_async(audio_bytes, media_type=delivered.media_type)}"
         
-        # Guardian Safety Analysis
-        safety_analysis = guardian.analyze_safety(transcript)
-        safety_instructions = guardian.get_safety_instructions(safety_analysis.risk_level)
+        return VoiceResponse(
+            transcript=transcript,
+            response=response_text,
+            audio_url=audio_url,
+            safety=safety_payload(safety_analysis),
+            wbc_score=safety_analysis.wbc_score,
+            risk_level=safety_analysis.risk_level,
+            crisis_detected=safety_analysis.crisis_detected,
+            audio_format=delivered.name if delivered else None,
+            degraded=deadline.degraded or None
+        )
         
-        # Generate response with Minimax LLM
-        messages = [
-            {"role": "system", "content": safety_instructions}
-        ]
+    except HTTPException:
+        raise
+    except DeadlineExceeded as e:
+        raise deadline_error(e)
+    except ProviderBusy as e:
+        raise busy_error(e)
+    except Exception as e:
+        print(f"Voice therapy pipeline failed: {type(e).__name__}: {e}")
+        raise HTTPException(status_code=500, detail="Voice therapy service temporarily unavailable.")
+
+
+@app.post("/api/voice-therapy-auto", response_model=VoiceResponse)
+async def voice_therapy_auto(
+    request: Request,
+    audio: UploadFile = File(...),
+    user_id: str = "",
+    session_id: str = "",
+    message_history: str = "[]",
+    audio_format: str = ""
+):
+    """
+    Voice therapy pipeline with per-stage provider routing.
+    
+    ASR, LLM and TTS each go to the healthiest, fastest configured provider
+    and fail over to the next one. The session keeps the voice it started
+    with unless that provider is unavailable.
+    """
+    if not router.providers["llm"] or not router.providers["tts"]:
+        raise HTTPException(status_code=503, detail="No voice providers configured.")
+    started = time.perf_counter()
+    deadline = new_deadline()
+    fmt = request_format(request, audio_format)
+    
+    try:
+        # Validate and preprocess audio
+        with stage("upload"):
+            clip = await validate_audio_upload(audio)
+        clip = await prepare_clip(clip)
         
-        cbt_context = """
-        You are a compassionate AI therapist using Cognitive Behavioral Therapy (CBT) techniques:
-        - Ask open-ended questions to understand deeply
-        - Help identify thought patterns and cognitive distortions
-        - Challenge negative thoughts gently and constructively
-        - Encourage behavioral activation and practical coping strategies
-        - Teach mindfulness and emotional regulation techniques
-        - Validate feelings while promoting realistic, balanced thinking
-        - Use a warm, empathetic tone that builds trust
-        - Keep responses conversational and natural (2-3 sentences typically)
-        """
-        messages.append({"role": "system", "content": cbt_context})
-        messages.append({"role": "user", "content": transcript})
+        transcript, asr_provider = await deadline.run("asr", lambda: router.call("asr", {
+            "openai": lambda: transcribe_openai(clip),
+            "minimax": lambda: _minimax_asr(clip),
+            "gemini": lambda: _gemini_asr(clip),
+        }), audio_seconds=clip.seconds)
         
-        response_text = minimax.chat_completion(
-            messages=messages,
-            temperature=0.7,
-            max_tokens=300
-        )
+        context = await conversation_context(user_id, session_id, message_history)
+        max_tokens = reply_max_tokens(deadline)
+        (safety_analysis, response_text), llm_provider = await deadline.run("llm", lambda: router.call("llm", {
+            "openai": lambda: guarded_generation(
+                "openai", transcript, context, partial(openai_chat, max_tokens=max_tokens)
+            ),
+            "minimax": lambda: guarded_generation(
+                "minimax", transcript, context, partial(minimax_chat, max_tokens=max_tokens)
+            ),
+        }))
+        await context.add_turn_async(transcript, response_text)
         
-        # Convert response to speech with cloned voice
-        audio_bytes = minimax.text_to_speech(
-            text=response_text,
-            speed=1.0,
-            pitch=0
-        )
+        def speak(minimax_model: str):
+            return lambda: router.call("tts", {
+                "openai": lambda: openai_tts(response_text, fmt),
+                "minimax": lambda: minimax_tts(response_text, fmt, model=minimax_model),
+            }, preferred=context.voice_provider)
         
-        # Save TTS audio
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as temp_tts:
-            temp_tts.write(audio_bytes)
-            tts_audio_path = temp_tts.name
+        spoken = await spoken_audio(deadline, speak("speech-02-hd"), fast=speak(MINIMAX_FAST_TTS_MODEL))
+        audio_url = delivered = tts_provider = None
+        if spoken is not None:
+            audio_bytes, tts_provider = spoken
+            if context.voice_provider is None:
+                context.voice_provider = tts_provider
+                await context.save_async()
+            delivered = plan(tts_provider, fmt)[1]
+            record_turn_audio("voice-therapy-auto", delivered, len(audio_bytes), started)
+            
+            # Store TTS audio
+            with stage("persist"):
+                audio_url = f"/audio/{await audio_store.put_async(audio_bytes, media_type=delivered.media_type)}"
         
+        providers = {"asr": asr_provider, "llm": llm_provider}
+        if tts_provider:
+            providers["tts"] = tts_provider
         return VoiceResponse(
             transcript=transcript,
             response=response_text,
-            audio_url=f"/audio/{os.path.basename(tts_audio_path)}",
-            safety={
-                "wbc_score": safety_analysis.wbc_score,
-                "risk_level": safety_analysis.risk_level,
-                "color_code": safety_analysis.color_code,
-                "requires_intervention": safety_analysis.requires_intervention
-            },
+            audio_url=audio_url,
+            safety=safety_payload(safety_analysis),
             wbc_score=safety_analysis.wbc_score,
             risk_level=safety_analysis.risk_level,
-            crisis_detected=safety_analysis.crisis_detected
+            crisis_detected=safety_analysis.crisis_detected,
+            providers=providers,
+            audio_format=delivered.name if delivered else None,
+            degraded=deadline.degraded or None
         )
         
     except HTTPException:
         raise
+    except DeadlineExceeded as e:
+        raise deadline_error(e)
+    except ProviderBusy as e:
+        raise busy_error(e)
     except Exception as e:
+        print(f"Voice therapy pipeline failed: {type(e).__name__}: {e}")
         raise HTTPException(status_code=500, detail="Voice therapy service temporarily unavailable.")
+
+
+async def openai_token_stream(messages: List[Dict], max_tokens: int = REPLY_MAX_TOKENS):
+    """Yield GPT-4 text deltas"""
+    stream = await openai_client().chat.completions.create(
+        model="gpt-4",
+        messages=messages,
+        temperature=0.7,
+        max_tokens=max_tokens,
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+    async for chunk in stream:
+        if chunk.usage:
+            record_prompt_usage("openai", chunk.usage)
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def transcript_event(transcript: str, safety_analysis) -> Dict:
+    return {
+        "type": "transcript",
+        "transcript": transcript,
+        "safety": safety_payload(safety_analysis),
+        "wbc_score": safety_analysis.wbc_score,
+        "risk_level": safety_analysis.risk_level,
+        "crisis_detected": safety_analysis.crisis_detected
+    }
+
+
+async def spoken_reply(
+    provider: str,
+    transcript: str,
+    context: SessionContext,
+    fmt: AudioFormat = FORMATS["mp3"],
+    endpoint: str = "voice-therapy-stream",
+    started: Optional[float] = None,
+    deadline: Optional[Deadline] = None
+):
+    """
+    Run Guardian on the transcript, then set up the streamed spoken reply.
+    
+    No token is surfaced until Guardian has confirmed which safety
+    instructions the reply was generated under. The finished turn is added
+    to `context` once the reply completes. Each sentence's audio is a
+    standalone clip in `fmt` (or its substitute, see audio_output.plan).
+    With a `deadline`, the first token must arrive within the llm budget and
+    each sentence's audio within the tts budget (the first one also within
+    the turn); a sentence whose audio runs out of time is sent text only.
+    
+    Returns:
+        (safety_analysis, async iterator of text/audio/done events)
+    """
+    started = time.perf_counter() if started is None else started
+    deadline = deadline or new_deadline()
+    max_tokens = reply_max_tokens(deadline)
+    if provider == "openai":
+        open_stream = lambda messages: prime_stream(
+            limiters["openai"].stream(lambda: openai_token_stream(messages, max_tokens=max_tokens))
+        )
+        synthesize = partial(openai_tts, fmt=fmt)
+    else:
+        open_stream = lambda messages: prime_stream(limiters["minimax"].stream(
+            lambda: minimax.chat_completion_stream(messages, temperature=0.7, max_tokens=max_tokens)
+        ))
+        synthesize = partial(minimax_tts, fmt=fmt)
+    delivered = plan(provider, fmt)[1]
+    
+    safety_analysis, tokens = await deadline.run("llm", lambda: guarded_generation(
+        provider, transcript, context, open_stream, llm_stage="llm_first_token", replay=replay_text
+    ))
+    
+    first_sentence = True
+    
+    async def speak(sentence: str) -> Optional[bytes]:
+        # The first sentence's audio is part of the turn; later sentences
+        # stream after it, each within the TTS budget
+        nonlocal first_sentence
+        turn_bound, first_sentence = first_sentence, False
+        try:
+            return await deadline.run("tts", lambda: synthesize(sentence), turn_bound=turn_bound)
+        except DeadlineExceeded:
+            degrade(deadline, "tts", "text_only")
+            return None
+    
+    async def events():
+        turn_bytes = 0
+        async for event in stream_spoken_reply(tokens, speak):
+            if event["type"] == "audio":
+                size = len(event["audio"]) * 3 // 4
+                if not turn_bytes:
+                    metrics.TIME_TO_AUDIO.labels(endpoint, delivered.name).observe(time.perf_counter() - started)
+                turn_bytes += size
+                metrics.AUDIO_BYTES.labels("out").inc(size)
+                event["format"] = delivered.name
+            elif event["type"] == "done":
+                metrics.TURN_AUDIO_BYTES.labels(delivered.name).observe(turn_bytes)
+                await context.add_turn_async(transcript, event["response"])
+            yield event
+    
+    return safety_analysis, events()
+
+
+@app.post("/api/voice-therapy-stream")
+async def voice_therapy_stream(
+    request: Request,
+    audio: UploadFile = File(...),
+    provider: str = "openai",
+    user_id: str = "",
+    session_id: str = "",
+    message_history: str = "[]",
+    audio_format: str = ""
+):
+    """
+    Streaming voice therapy pipeline (newline-delimited JSON).
+    
+    Transcription and Guardian safety analysis complete before any of the
+    reply is streamed. The reply is then streamed as text deltas, and each finished
+    sentence is synthesized and pushed as a base64 audio chunk in the negotiated
+    format (MP3 by default; `audio_format=pcm` suits Web Audio playback).
+    
+    Events, one JSON object per line:
+        transcript -> transcript, safety, wbc_score, risk_level, crisis_detected
+        text       -> delta
+        audio      -> index, text, audio, format
+        done       -> response
+        error      -> detail
+    """
+    if provider not in ("openai", "minimax"):
+        raise HTTPException(status_code=400, detail="Invalid provider. Allowed: openai, minimax")
+    if provider == "minimax" and not minimax:
+        raise HTTPException(
+            status_code=503,
+            detail="Minimax service not available. Check API key configuration."
+        )
+    started = time.perf_counter()
+    deadline = new_deadline()
+    fmt = request_format(request, audio_format)
+    
+    try:
+        with stage("upload"):
+            clip = await validate_audio_upload(audio)
+        clip = await prepare_clip(clip)
+        
+        transcribe = transcribe_openai if provider == "openai" else transcribe_minimax
+        transcript = await deadline.run("asr", lambda: transcribe(clip), audio_seconds=clip.seconds)
+        
+        safety_analysis, reply_events = await spoken_reply(
+            provider, transcript, await conversation_context(user_id, session_id, message_history), fmt,
+            started=started, deadline=deadline
+        )
+    except HTTPException:
+        raise
+    except DeadlineExceeded as e:
+        raise deadline_error(e)
+    except ProviderBusy as e:
+        raise busy_error(e)
+    except Exception as e:
+        print(f"Voice therapy pipeline failed: {type(e).__name__}: {e}")
+        raise HTTPException(status_code=500, detail="Voice therapy service temporarily unavailable.")
+    
+    async def events():
+        yield ndjson(transcript_event(transcript, safety_analysis))
+        try:
+            async for event in reply_events:
+                yield ndjson(event)
+        except ProviderBusy as e:
+            yield ndjson({"type": "error", "detail": busy_error(e).detail, "retry_after": math.ceil(e.retry_after)})
+        except Exception as e:
+            print(f"Streaming voice pipeline failed: {e}")
+            yield ndjson({"type": "error", "detail": "Voice therapy service temporarily unavailable."})
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+def parse_control(text: Optional[str]) -> Optional[Dict]:
+    """A WebSocket text frame as a JSON object, or None if it isn't one"""
+    try:
+        control = json.loads(text)
+    except (TypeError, ValueError):
+        return None
+    return control if isinstance(control, dict) else None
+
+
+@app.websocket("/ws/voice-session")
+async def voice_session(websocket: WebSocket):
+    """
+    Full-duplex voice session.
+    
+    Protocol:
+        client -> {"type": "start", "user_id", "session_id", "provider", "sample_rate",
+                   "message_history" (optional, used if the server has no history),
+                   "audio_format" (optional: mp3, mp3_low, opus, pcm)}
+        client -> binary PCM16 mono frames at sample_rate
+        client -> {"type": "end_of_speech"}  (optional manual endpoint)
+        server -> ready, speech_start, then per turn the same transcript/text/
+                  audio/done events as /api/voice-therapy-stream
+    
+    Voice activity detection decides when the user stopped speaking, and
+    transcription starts as soon as the endpoint is found. If the user starts
+    speaking again while a reply is still streaming, that reply is cancelled.
+    """
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+    reply_task: Optional[asyncio.Task] = None
+    
+    async def send(event: Dict):
+        async with send_lock:
+            await websocket.send_text(json.dumps(event))
+    
+    try:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+        start = parse_control(message.get("text"))
+        if start is None:
+            await websocket.close(code=1003, reason="Expected a JSON start message")
+            return
+        provider = start.get("provider", "openai")
+        if start.get("type") != "start" or provider not in ("openai", "minimax"):
+            await websocket.close(code=1008, reason="Expected start message with provider openai or minimax")
+            return
+        if provider == "minimax" and not minimax:
+            await websocket.close(code=1011, reason="Minimax service not available")
+            return
+        try:
+            fmt = output_format(websocket.headers, str(start.get("audio_format") or ""))
+        except ValueError as e:
+            await websocket.close(code=1008, reason=str(e)[:120])
+            return
+        try:
+            session = VoiceSession(
+                user_id=str(start.get("user_id", "")),
+                session_id=str(start.get("session_id", "")),
+                provider=provider,
+                sample_rate=start.get("sample_rate", 16000),
+            )
+        except ValueError as e:
+            await websocket.close(code=1008, reason=str(e)[:120])
+            return
+        context = await conversation_context(session.user_id, session.session_id, json.dumps(start.get("message_history", [])))
+        await send({"type": "ready", "session_id": session.session_id})
+        
+        async def run_turn(wav: bytes):
+            started = time.perf_counter()
+            deadline = new_deadline()
+            info = inspect_audio(wav, len(wav))
+            clip = await prepare_clip(AudioClip(
+                data=wav, filename="turn.wav", content_type="audio/wav", seconds=info.seconds if info else None
+            ))
+            transcribe = transcribe_openai if session.provider == "openai" else transcribe_minimax
+            transcript = await deadline.run("asr", lambda: transcribe(clip), audio_seconds=clip.seconds)
+            
+            if not transcript.strip():
+                return
+            safety_analysis, reply_events = await spoken_reply(
+                session.provider, transcript, context, fmt, endpoint="voice-session",
+                started=started, deadline=deadline
+            )
+            await send(transcript_event(transcript, safety_analysis))
+            async for event in reply_events:
+                await send(event)
+        
+        async def guarded_turn(wav: bytes):
+            try:
+                await run_turn(wav)
+            except asyncio.CancelledError:
+                raise
+            except ProviderBusy as e:
+                await send({"type": "error", "detail": busy_error(e).detail, "retry_after": math.ceil(e.retry_after)})
+            except DeadlineExceeded as e:
+                await send({"type": "error", "detail": deadline_error(e).detail})
+            except Exception as e:
+                print(f"Voice session turn failed: {e}")
+                await send({"type": "error", "detail": "Voice therapy service temporarily unavailable."})
+        
+        async def start_turn():
+            nonlocal reply_task
+            if not len(session.buffer):
+                return
+            utterance = session.take_utterance()
+            if reply_task and not reply_task.done():
+                # The new utterance supersedes the reply still streaming; wait
+                # for it to stop so two replies never play over each other
+                reply_task.cancel()
+                await asyncio.wait([reply_task])
+                await send({"type": "interrupted"})
+            reply_task = asyncio.create_task(guarded_turn(utterance))
+        
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                metrics.AUDIO_BYTES.labels("in").inc(len(message["bytes"]))
+                for vad_event in session.push_audio(message["bytes"]):
+                    if vad_event == "speech_start":
+                        if reply_task and not reply_task.done():
+                            reply_task.cancel()
+                            await send({"type": "interrupted"})
+                        await send({"type": "speech_start"})
+                    elif vad_event == "endpoint":
+                        await start_turn()
+            elif message.get("text"):
+                control = parse_control(message["text"])
+                if control is None:
+                    await websocket.close(code=1003, reason="Control messages must be JSON objects")
+                    break
+                if control.get("type") == "end_of_speech":
+                    await start_turn()
+                elif control.get("type") == "stop":
+                    break
+    except WebSocketDisconnect:
+        pass
     finally:
-        if temp_audio_path and os.path.exists(temp_audio_path):
-            os.unlink(temp_audio_path)
+        if reply_task and not reply_task.done():
+            reply_task.cancel()
+
+
+@app.middleware("http")
+async def count_requests(request: Request, call_next):
+    response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.REQUESTS.labels(route.path if route else "unmatched", request.method, str(response.status_code)).inc()
+    return response
+
+
+@app.middleware("http")
+async def client_hints(request: Request, call_next):
+    """Ask browsers for the network hints used to pick the TTS output format"""
+    response = await call_next(request)
+    response.headers.setdefault("Accept-CH", "Save-Data, ECT, Downlink")
+    return response
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (stage latency histograms and pipeline counters)"""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/ready")
+async def readiness():
+    """Readiness probe: 503 until startup warm-up has finished (/health is the liveness probe)"""
+    if not startup["ready"]:
+        return JSONResponse(status_code=503, content={"status": "starting", **startup})
+    return {"status": "ready", **startup}
 
 
 @app.get("/health")
@@ -326,12 +1291,30 @@ async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
+        "ready": startup["ready"],
         "guardian": "active",
         "openai": "connected" if os.getenv("OPENAI_API_KEY") else "not configured",
-        "minimax": "connected" if minimax else "not configured"
+        "minimax": "connected" if minimax else "not configured",
+        "gemini": "connected" if gemini else "not configured",
+        "minimax_pool": minimax.pool_stats() if minimax else None,
+        "audio_store": audio_store.stats(),
+        "tts_cache": tts_cache.stats(),
+        "sessions": session_contexts.stats(),
+        "shared_state": await run_in_threadpool(shared_state.stats) if shared_state else {"backend": "memory"},
+        "worker_pid": os.getpid(),
+        "speculation": speculator.stats(),
+        "semantic_cache": response_cache.stats(),
+        "prompt_bundles": prompt_bundles.stats(),
+        "upload_admission": upload_admission.stats(),
+        "upstream_limits": {name: limiter.stats() for name, limiter in limiters.items()},
+        "routing": router.stats(),
+        "minimax_asr": minimax_asr.stats() if minimax_asr else None
     }
 
 
+startup["import_seconds"] = round(time.perf_counter() - _import_started, 3)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,155 @@
+"""
+Voice pipeline metrics
+Per-stage latency histograms, upstream/fallback/byte counters in Prometheus
+format, plus OpenTelemetry spans when the opentelemetry API is installed
+"""
+
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+import httpx
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+
+try:
+    from opentelemetry import trace
+    # A no-op tracer unless an SDK/exporter is configured (e.g. opentelemetry-instrument)
+    tracer = trace.get_tracer("voice-therapy-backend")
+except ImportError:
+    tracer = None
+
+STAGES = ("upload", "preprocess", "asr", "guardian", "llm", "llm_first_token", "tts", "transcode", "persist")
+
+STAGE_SECONDS = Histogram(
+    "voice_stage_seconds",
+    "Time spent in each voice pipeline stage",
+    ["stage", "provider", "outcome"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32),
+)
+REQUESTS = Counter("voice_http_requests_total", "HTTP requests by route and status", ["route", "method", "status"])
+FALLBACKS = Counter("voice_fallbacks_total", "Fallback provider used for a stage", ["stage", "primary", "fallback"])
+UPSTREAM_RESPONSES = Counter(
+    "voice_upstream_responses_total", "Upstream API responses by status code", ["provider", "status_code"]
+)
+UPSTREAM_BYTES = Counter(
+    "voice_upstream_bytes_total", "Declared upstream request/response body sizes", ["provider", "direction"]
+)
+AUDIO_BYTES = Counter("voice_audio_bytes_total", "Audio received from and sent to clients", ["direction"])
+UPLOAD_REJECTIONS = Counter(
+    "voice_upload_rejections_total",
+    "Audio uploads refused by admission control (phase: header, stream or parsed)",
+    ["reason", "phase"],
+)
+TURN_AUDIO_BYTES = Histogram(
+    "voice_turn_audio_bytes",
+    "Synthesized audio delivered per turn by output format",
+    ["format"],
+    buckets=(4096, 16384, 32768, 65536, 131072, 262144, 524288, 1048576, 2097152, 4194304),
+)
+TIME_TO_AUDIO = Histogram(
+    "voice_time_to_audio_seconds",
+    "Request start until the first audio is ready to send (playback can start after download)",
+    ["endpoint", "format"],
+    buckets=(0.1, 0.25, 0.5, 1, 1.5, 2, 3, 4, 6, 8, 12, 16, 32),
+)
+SEMANTIC_CACHE = Counter(
+    "voice_semantic_cache_lookups_total", "Semantic response cache lookups (hit/miss/fill/bypass)", ["result"]
+)
+SEMANTIC_CACHE_SAVED = Counter(
+    "voice_semantic_cache_saved_seconds_total", "Estimated LLM time saved by semantic cache hits", ["provider"]
+)
+LLM_PROMPT_TOKENS = Counter(
+    "voice_llm_prompt_tokens_total",
+    "Prompt tokens reported by the LLM providers (cached: served from the provider's prompt cache)",
+    ["provider", "cached"],
+)
+STAGE_BUDGET = Histogram(
+    "voice_stage_budget_ratio",
+    "Share of its per-turn budget each stage used (1.0 = ran out)",
+    ["stage", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0),
+)
+DEGRADATIONS = Counter(
+    "voice_degradations_total", "Turns degraded to stay within their deadline", ["stage", "action"]
+)
+ERRORS = Counter("voice_errors_total", "Exceptions raised inside pipeline stages", ["stage", "provider", "error"])
+
+# Callbacks fed every stage result: observer(stage, provider, outcome, seconds)
+_observers: List[Callable[[str, str, str, float], None]] = []
+
+
+def add_observer(observer: Callable[[str, str, str, float], None]) -> None:
+    """Receive every stage timing (e.g. for provider routing)"""
+    _observers.append(observer)
+
+
+@contextmanager
+def stage(name: str, provider: str = "none"):
+    """
+    Time a pipeline stage; records outcome ok/error/cancelled.
+
+    Works around awaits in async code; the OpenTelemetry span (if any)
+    becomes the current span for nested upstream calls.
+    """
+    span = tracer.start_as_current_span(f"voice.{name}", attributes={"voice.provider": provider}) if tracer else None
+    if span is not None:
+        span.__enter__()
+    outcome = "ok"
+    error = None
+    started = time.perf_counter()
+    try:
+        yield
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    except BaseException as e:
+        outcome = "error"
+        error = e
+        ERRORS.labels(name, provider, type(e).__name__).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(name, provider, outcome).observe(elapsed)
+        for observer in _observers:
+            observer(name, provider, outcome, elapsed)
+        if span is not None:
+            span.__exit__(type(error) if error else None, error, error.__traceback__ if error else None)
+
+
+def upstream_hooks(provider: str, asynchronous: bool = True) -> Dict[str, List]:
+    """httpx event hooks that count status codes and declared body sizes for one provider"""
+
+    def on_request(request: httpx.Request):
+        size = request.headers.get("content-length")
+        if size:
+            UPSTREAM_BYTES.labels(provider, "out").inc(int(size))
+
+    def on_response(response: httpx.Response):
+        UPSTREAM_RESPONSES.labels(provider, str(response.status_code)).inc()
+        size = response.headers.get("content-length")
+        if size:
+            UPSTREAM_BYTES.labels(provider, "in").inc(int(size))
+
+    if not asynchronous:
+        return {"request": [on_request], "response": [on_response]}
+
+    # AsyncClient awaits its hooks
+    async def on_request_async(request: httpx.Request):
+        on_request(request)
+
+    async def on_response_async(response: httpx.Response):
+        on_response(response)
+
+    return {"request": [on_request_async], "response": [on_response_async]}
+
+
+def render():
+    """(body, content type) for the /metrics endpoint"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Several workers (serve.py): aggregate every process's samples
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -4,24 +4,412 @@ Provides voice cloning and natural conversation capabilities
 """
 
 import os
-import requests
-from typing import Optional, Dict, Any
-from dotenv import load_dotenv
+import re
+import json
+import binascii
+import secrets
+import importlib.util
+import httpx
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, AsyncIterator, Callable, Iterator, List
+from audio_input import AudioInput, as_file, input_filename, is_async_stream, iter_chunks
+from session_context import fit_to_budget
 
-load_dotenv()
+# Token budget for caller-supplied history in voice_conversation
+HISTORY_TOKEN_BUDGET = int(os.getenv("SESSION_HISTORY_TOKENS", "1200"))
+
+# base_resp.status_code Minimax uses for rate limiting on HTTP 200 responses
+MINIMAX_RATE_LIMITED = 1002
+
+
+class MinimaxAPIError(Exception):
+    """
+    Non-success response from the Minimax API.
+    
+    Carries the HTTP status and the response (for headers such as
+    Retry-After) so callers can tell rate limiting from other failures.
+    """
+    
+    def __init__(self, message: str, response: Optional[httpx.Response] = None, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.response = response
+        self.status_code = status_code if status_code is not None else getattr(response, "status_code", None)
+
+
+# Start of a base64 audio value in a T2A v2 body ("audio": "...")
+AUDIO_FIELD = re.compile(rb'"audio"\s*:\s*"')
+# Bytes kept back between chunks in case the field name is split across them
+AUDIO_FIELD_TAIL = 16
+
+
+class Base64ChunkDecoder:
+    """
+    Decodes base64 text that arrives in arbitrary pieces.
+    
+    Complete 4-character groups are decoded as soon as they arrive; the rest
+    is carried over to the next piece. With `keep` the decoded audio is also
+    collected in a buffer preallocated from `size_hint`.
+    """
+    
+    def __init__(self, size_hint: int = 0, keep: bool = True):
+        self.buffer = bytearray(size_hint if keep else 0)
+        self.length = 0
+        self.keep = keep
+        self._carry = b""
+    
+    def feed(self, piece: bytes) -> bytes:
+        """Decode `piece` and return the newly decoded bytes"""
+        if b"\\" in piece:
+            # JSON may escape "/" as "\/"
+            piece = piece.replace(b"\\", b"")
+        data = self._carry + piece if self._carry else piece
+        usable = len(data) - len(data) % 4
+        self._carry = data[usable:]
+        if not usable:
+            return b""
+        return self._store(binascii.a2b_base64(data[:usable]))
+    
+    def finish(self) -> bytes:
+        """End of the current base64 value: decode any unpadded remainder"""
+        tail, self._carry = self._carry, b""
+        if not tail:
+            return b""
+        return self._store(binascii.a2b_base64(tail + b"=" * (-len(tail) % 4)))
+    
+    def _store(self, decoded: bytes) -> bytes:
+        if self.keep:
+            # Slice assignment grows the buffer if the size hint was too small
+            self.buffer[self.length:self.length + len(decoded)] = decoded
+        self.length += len(decoded)
+        return decoded
+    
+    def getvalue(self) -> bytes:
+        return bytes(memoryview(self.buffer)[:self.length])
+
+
+def _sse_events(block: bytes) -> List[Dict[str, Any]]:
+    """JSON payloads of the "data:" lines in a server-sent events block"""
+    events = []
+    for line in block.splitlines():
+        if line.startswith(b"data:"):
+            data = line[len(b"data:"):].strip()
+            if data and data != b"[DONE]":
+                events.append(json.loads(data))
+    return events
+
+
+class TTSResponseParser:
+    """
+    Incremental parser for T2A v2 bodies, plain JSON or server-sent events.
+    
+    Audio values are base64-decoded as their bytes arrive and never held as
+    text. Everything else (status, audio_file, base_resp) is kept in `rest`
+    with the audio values emptied out, which is small enough to json-parse.
+    """
+    
+    def __init__(self, size_hint: int = 0, keep: bool = True):
+        self.decoder = Base64ChunkDecoder(size_hint, keep)
+        self.rest = bytearray()
+        self.audio_values = 0
+        self._pending = b""
+        self._in_audio = False
+    
+    def feed(self, chunk: bytes) -> List[bytes]:
+        """Consume a body chunk; returns the audio decoded from it"""
+        audio = []
+        data = self._pending + chunk if self._pending else chunk
+        self._pending = b""
+        pos = 0
+        while pos < len(data):
+            if self._in_audio:
+                # Base64 never contains a quote, so the first one ends the value
+                end = data.find(b'"', pos)
+                if end < 0:
+                    audio.append(self.decoder.feed(data[pos:]))
+                    break
+                audio.append(self.decoder.feed(data[pos:end]))
+                audio.append(self.decoder.finish())
+                self._in_audio = False
+                pos = end
+            else:
+                match = AUDIO_FIELD.search(data, pos)
+                if match is None:
+                    keep_from = max(pos, len(data) - AUDIO_FIELD_TAIL)
+                    self.rest += data[pos:keep_from]
+                    self._pending = data[keep_from:]
+                    break
+                self.rest += data[pos:match.end()]
+                self.audio_values += 1
+                self._in_audio = True
+                pos = match.end()
+        return [piece for piece in audio if piece]
+    
+    def events(self) -> List[Dict[str, Any]]:
+        """Pop the complete server-sent events parsed so far"""
+        events = []
+        while True:
+            end = self.rest.find(b"\n\n")
+            if end < 0:
+                return events
+            events.extend(_sse_events(bytes(self.rest[:end])))
+            del self.rest[:end + 2]
+    
+    def close(self) -> List[Dict[str, Any]]:
+        """End of body: parse what is left (a plain JSON body or the last events)"""
+        self.rest += self._pending
+        self._pending = b""
+        rest = bytes(self.rest).strip()
+        self.rest.clear()
+        if not rest:
+            return []
+        if rest.startswith(b"{"):
+            return [json.loads(rest)]
+        return _sse_events(rest)
+
+
+@dataclass
+class MinimaxPoolConfig:
+    """
+    Connection pool settings for the Minimax HTTP client.
+    
+    The service only talks to the Minimax API host, so the pool-wide limits
+    below are effectively per-host limits.
+    """
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0  # seconds an idle connection is kept open
+    connect_timeout: float = 5.0
+    read_timeout: float = 60.0
+    http2: Optional[bool] = None  # None = use HTTP/2 when the h2 package is installed
+    
+    @classmethod
+    def from_env(cls) -> "MinimaxPoolConfig":
+        """Build a config from MINIMAX_POOL_* / MINIMAX_*_TIMEOUT environment variables"""
+        http2 = os.getenv("MINIMAX_HTTP2")
+        return cls(
+            max_connections=int(os.getenv("MINIMAX_POOL_MAX_CONNECTIONS", cls.max_connections)),
+            max_keepalive_connections=int(os.getenv("MINIMAX_POOL_MAX_KEEPALIVE", cls.max_keepalive_connections)),
+            keepalive_expiry=float(os.getenv("MINIMAX_POOL_KEEPALIVE_EXPIRY", cls.keepalive_expiry)),
+            connect_timeout=float(os.getenv("MINIMAX_CONNECT_TIMEOUT", cls.connect_timeout)),
+            read_timeout=float(os.getenv("MINIMAX_READ_TIMEOUT", cls.read_timeout)),
+            http2=None if http2 is None else http2.lower() in ("1", "true", "yes"),
+        )
+    
+    def use_http2(self) -> bool:
+        available = importlib.util.find_spec("h2") is not None
+        if self.http2 is None:
+            return available
+        if self.http2 and not available:
+            print("Warning: MINIMAX_HTTP2 requested but the h2 package is not installed")
+        return self.http2 and available
+    
+    def client_kwargs(self) -> Dict[str, Any]:
+        """Keyword arguments shared by httpx.Client and httpx.AsyncClient"""
+        return {
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            "timeout": httpx.Timeout(
+                self.read_timeout,
+                connect=self.connect_timeout,
+            ),
+            "http2": self.use_http2(),
+        }
+
+
+class PoolStats:
+    """Counts requests and freshly opened connections via httpcore trace events"""
+    
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+    
+    def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.new_connections += 1
+    
+    async def atrace(self, event_name: str, info: Dict[str, Any]) -> None:
+        self.trace(event_name, info)
+
+
+def _multipart_envelope(boundary: str, filename: str, content_type: str):
+    """Head and tail of a transcription form whose file part is streamed in between"""
+    safe_name = filename.replace('"', '')
+    head = (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="model"\r\n\r\n'
+        f'whisper-1\r\n'
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="file"; filename="{safe_name}"\r\n'
+        f'Content-Type: {content_type}\r\n\r\n'
+    ).encode("utf-8")
+    tail = f'\r\n--{boundary}--\r\n'.encode("utf-8")
+    return head, tail
 
 
 class MinimaxVoiceService:
     """Service for interacting with Minimax Voice AI API"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        pool_config: Optional[MinimaxPoolConfig] = None,
+        event_hooks: Optional[Dict[str, list]] = None,
+        usage_observer: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
         self.api_key = os.getenv("MINIMAX_API_KEY")
         self.voice_id = os.getenv("MINIMAX_VOICE_ID", "moss_audio_bccfab56-ed6a-11f0-b6f2-dec5318e06e3")
-        # Use international base URL
-        self.base_url = "https://api.minimax.io/v1"
+        # Use international base URL (overridable for local mock upstreams)
+        self.base_url = os.getenv("MINIMAX_BASE_URL", "https://api.minimax.io/v1")
         
         if not self.api_key:
             raise ValueError("MINIMAX_API_KEY environment variable is required")
+        
+        # One keep-alive pool per service; auth headers are attached once here
+        # instead of being rebuilt for every call
+        self.pool_config = pool_config or MinimaxPoolConfig.from_env()
+        self.event_hooks = event_hooks
+        # Called with the `usage` of every chat completion (prompt cache hits)
+        self.usage_observer = usage_observer
+        self._stats = PoolStats()
+        self._client = self._create_client()
+    
+    def _create_client(self):
+        return httpx.Client(
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            event_hooks=self.event_hooks,
+            **self.pool_config.client_kwargs()
+        )
+    
+    def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        self._stats.requests += 1
+        return self._client.request(method, url, extensions={"trace": self._stats.trace}, **kwargs)
+    
+    def close(self) -> None:
+        """Close pooled connections"""
+        self._client.close()
+    
+    def _observe_usage(self, data: Dict[str, Any]) -> None:
+        if self.usage_observer and data.get("usage"):
+            self.usage_observer(data["usage"])
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the connection pool.
+        
+        Returns:
+            Dictionary with open/idle connection counts, total requests,
+            newly opened connections and requests served on reused connections
+        """
+        pool = getattr(self._client._transport, "_pool", None)
+        connections = list(pool.connections) if pool is not None else []
+        return {
+            "open": len(connections),
+            "idle": sum(1 for conn in connections if conn.is_idle()),
+            "requests": self._stats.requests,
+            "new_connections": self._stats.new_connections,
+            "reused_connections": max(self._stats.requests - self._stats.new_connections, 0),
+            "http2": self.pool_config.use_http2(),
+        }
+    
+    def _tts_payload(
+        self,
+        text: str,
+        voice_id: Optional[str],
+        speed: float,
+        pitch: int,
+        vol: float,
+        audio_setting: Optional[Dict[str, Any]] = None,
+        model: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Build the T2A v2 request body"""
+        return {
+            "model": model or "speech-02-hd",  # High quality model with excellent rhythm
+            "text": text,
+            "voice_setting": {
+                "voice_id": voice_id or self.voice_id,
+                "speed": speed,
+                "pitch": pitch,
+                "vol": vol
+            },
+            "audio_setting": audio_setting or {
+                "format": "mp3",  # MP3 format
+                "sample_rate": 24000  # 24kHz sample rate
+            }
+        }
+    
+    @staticmethod
+    def _chat_payload(messages: list, temperature: float, max_tokens: int) -> Dict[str, Any]:
+        """Build the chat completion request body"""
+        return {
+            "model": "abab6.5s-chat",  # Minimax's chat model optimized for long conversations
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+    
+    @staticmethod
+    def _tts_error(response) -> str:
+        """Extract a readable error message from a failed TTS response"""
+        error_detail = response.text
+        try:
+            error_json = response.json()
+            error_detail = error_json.get('message', error_detail)
+        except Exception:
+            pass
+        return f"Minimax TTS API error ({response.status_code}): {error_detail}"
+    
+    @staticmethod
+    def _check_base_resp(response_data: Dict[str, Any]) -> None:
+        """Raise for error statuses Minimax reports inside HTTP 200 bodies"""
+        base_resp = response_data.get('base_resp') or {}
+        status_code = base_resp.get('status_code') or 0
+        if status_code == MINIMAX_RATE_LIMITED:
+            raise MinimaxAPIError(f"Minimax TTS rate limited: {base_resp.get('status_msg')}", status_code=429)
+        if status_code and not (response_data.get('data') or {}).get('audio_file'):
+            raise MinimaxAPIError(f"Minimax TTS API error ({status_code}): {base_resp.get('status_msg')}")
+    
+    @classmethod
+    def _parse_tts_response(cls, parser: TTSResponseParser):
+        """
+        Split a parsed T2A v2 response into (audio_bytes, audio_url).
+        
+        Exactly one of the two is set; raises if the response has neither.
+        """
+        events = parser.close()
+        for event in events:
+            cls._check_base_resp(event)
+        if parser.audio_values:
+            # Decoded from base64 while the body was being read
+            return parser.decoder.getvalue(), None
+        return None, cls._audio_file_url(events)
+    
+    @staticmethod
+    def _audio_file_url(events: List[Dict[str, Any]]) -> str:
+        response_data = events[-1] if events else {}
+        data = response_data.get('data') or {}
+        if 'audio_file' in data:
+            return data['audio_file']
+        raise Exception(f"Unexpected response format: {response_data}")
+    
+    @staticmethod
+    def _audio_size_hint(response: httpx.Response) -> int:
+        """Upper bound for the decoded audio size (3 bytes per 4 base64 characters)"""
+        length = response.headers.get("content-length")
+        if not length or response.headers.get("content-encoding"):
+            return 0
+        return int(length) * 3 // 4
+    
+    def _tts_stream_payload(
+        self, text: str, voice_id: Optional[str], speed: float, pitch: int, vol: float,
+        audio_setting: Optional[Dict[str, Any]] = None, model: Optional[str] = None
+    ):
+        payload = self._tts_payload(text, voice_id, speed, pitch, vol, audio_setting, model)
+        payload["stream"] = True
+        # Chunks only: skip the final event that repeats the whole clip
+        payload["stream_options"] = {"exclude_aggregated_audio": True}
+        return payload
     
     def text_to_speech(
         self, 
@@ -29,7 +417,9 @@ class MinimaxVoiceService:
         voice_id: Optional[str] = None,
         speed: float = 1.0,
         pitch: int = 0,  # Must be integer
-        vol: float = 1.0
+        vol: float = 1.0,
+        audio_setting: Optional[Dict[str, Any]] = None,
+        model: Optional[str] = None
     ) -> bytes:
         """
         Convert text to speech using Minimax T2A API with cloned voice
@@ -40,86 +430,116 @@ class MinimaxVoiceService:
             speed: Speech speed (0.5 to 2.0) - default 1.0
             pitch: Voice pitch adjustment (-12 to 12 semitones, integer) - default 0
             vol: Volume (0.1 to 10.0) - default 1.0
+            audio_setting: T2A `audio_setting` (format, sample_rate, bitrate,
+                channel) - default 24kHz MP3
+            model: T2A model - default speech-02-hd (speech-02-turbo is faster)
             
         Returns:
-            Audio data as bytes (MP3 format)
+            Audio data as bytes (MP3 unless audio_setting says otherwise)
         """
         url = f"{self.base_url}/t2a_v2"
+        payload = self._tts_payload(text, voice_id, speed, pitch, vol, audio_setting, model)
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+        # The response contains JSON with base64 encoded audio or an audio URL;
+        # the audio is decoded while the body streams in
+        self._stats.requests += 1
+        with self._client.stream("POST", url, json=payload, extensions={"trace": self._stats.trace}) as response:
+            if response.status_code != 200:
+                response.read()
+                raise MinimaxAPIError(self._tts_error(response), response)
+            parser = TTSResponseParser(self._audio_size_hint(response))
+            for chunk in response.iter_bytes():
+                parser.feed(chunk)
         
-        payload = {
-            "model": "speech-02-hd",  # High quality model with excellent rhythm
-            "text": text,
-            "voice_setting": {
-                "voice_id": voice_id or self.voice_id,
-                "speed": speed,
-                "pitch": pitch,
-                "vol": vol
-            },
-            "audio_setting": {
-                "format": "mp3",  # MP3 format
-                "sample_rate": 24000  # 24kHz sample rate
-            }
-        }
+        audio_data, audio_url = self._parse_tts_response(parser)
+        if audio_data is not None:
+            return audio_data
         
-        response = requests.post(url, json=payload, headers=headers)
+        # Audio URL provided - download it over the same pool
+        audio_response = self._send("GET", audio_url)
+        if audio_response.status_code != 200:
+            raise MinimaxAPIError(f"Minimax TTS audio download failed: {audio_response.status_code}", audio_response)
+        return audio_response.content
+    
+    def text_to_speech_stream(
+        self,
+        text: str,
+        voice_id: Optional[str] = None,
+        speed: float = 1.0,
+        pitch: int = 0,
+        vol: float = 1.0,
+        audio_setting: Optional[Dict[str, Any]] = None,
+        model: Optional[str] = None
+    ) -> Iterator[bytes]:
+        """
+        Stream speech from the T2A streaming API
         
-        if response.status_code != 200:
-            error_detail = response.text
-            try:
-                error_json = response.json()
-                error_detail = error_json.get('message', error_detail)
-            except:
-                pass
-            raise Exception(f"Minimax TTS API error ({response.status_code}): {error_detail}")
-        
-        # The response contains JSON with base64 encoded audio or audio URL
-        response_data = response.json()
-        
-        # Check if response has audio data
-        if 'data' in response_data and 'audio' in response_data['data']:
-            # Audio is base64 encoded
-            import base64
-            audio_data = response_data['data']['audio']
-            return base64.b64decode(audio_data)
-        elif 'data' in response_data and 'audio_file' in response_data['data']:
-            # Audio URL provided - download it
-            audio_url = response_data['data']['audio_file']
-            audio_response = requests.get(audio_url)
-            return audio_response.content
-        else:
-            raise Exception(f"Unexpected response format: {response_data}")
+        Args:
+            Same as text_to_speech
+            
+        Yields:
+            Audio chunks (MP3 by default) as soon as they are decoded
+        """
+        url = f"{self.base_url}/t2a_v2"
+        payload = self._tts_stream_payload(text, voice_id, speed, pitch, vol, audio_setting, model)
+        
+        self._stats.requests += 1
+        with self._client.stream("POST", url, json=payload, extensions={"trace": self._stats.trace}) as response:
+            if response.status_code != 200:
+                response.read()
+                raise MinimaxAPIError(self._tts_error(response), response)
+            parser = TTSResponseParser(keep=False)
+            for chunk in response.iter_bytes():
+                yield from parser.feed(chunk)
+                for event in parser.events():
+                    self._check_base_resp(event)
+            final = parser.close()
+        
+        for event in final:
+            self._check_base_resp(event)
+        if not parser.audio_values:
+            # Non-streamed answer with an audio URL
+            with self._client.stream("GET", self._audio_file_url(final)) as audio_response:
+                if audio_response.status_code != 200:
+                    raise MinimaxAPIError(
+                        f"Minimax TTS audio download failed: {audio_response.status_code}", audio_response
+                    )
+                yield from audio_response.iter_bytes()
     
-    def speech_to_text(self, audio_file_path: str) -> str:
+    def speech_to_text(
+        self,
+        audio: AudioInput,
+        filename: Optional[str] = None,
+        content_type: str = "application/octet-stream"
+    ) -> str:
         """
         Transcribe audio to text using Minimax ASR
         
         Args:
-            audio_file_path: Path to the audio file to transcribe
+            audio: Path, bytes, memoryview or file object with the audio.
+                In-memory audio is streamed to the API without a temp file.
+            filename: Upload filename (defaults to the path or file name)
+            content_type: MIME type of the audio
             
         Returns:
             Transcribed text
         """
         url = f"{self.base_url}/audio/transcriptions"
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}"
-        }
-        
-        with open(audio_file_path, 'rb') as audio_file:
+        audio_file = as_file(audio)
+        try:
             files = {
-                'file': audio_file,
+                'file': (filename or input_filename(audio), audio_file, content_type),
                 'model': (None, 'whisper-1')
             }
             
-            response = requests.post(url, headers=headers, files=files)
+            response = self._send("POST", url, files=files)
+        finally:
+            if isinstance(audio, (str, os.PathLike)):
+                audio_file.close()
         
         if response.status_code != 200:
-            raise Exception(f"Minimax ASR API error: {response.status_code} - {response.text}")
+            raise MinimaxAPIError(f"Minimax ASR API error: {response.status_code} - {response.text}", response)
         
         return response.json().get('text', '')
     
@@ -141,30 +561,20 @@ class MinimaxVoiceService:
             Generated response text
         """
         url = f"{self.base_url}/chat/completions"
+        payload = self._chat_payload(messages, temperature, max_tokens)
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": "abab6.5s-chat",  # Minimax's chat model optimized for long conversations
-            "messages": messages,
-            "temperature": temperature,
-            "max_tokens": max_tokens
-        }
-        
-        response = requests.post(url, json=payload, headers=headers)
+        response = self._send("POST", url, json=payload)
         
         if response.status_code != 200:
-            raise Exception(f"Minimax Chat API error: {response.status_code} - {response.text}")
+            raise MinimaxAPIError(f"Minimax Chat API error: {response.status_code} - {response.text}", response)
         
         data = response.json()
+        self._observe_usage(data)
         return data['choices'][0]['message']['content']
     
     def voice_conversation(
         self,
-        audio_file_path: str,
+        audio: AudioInput,
         conversation_history: list = None,
         system_prompt: str = None
     ) -> Dict[str, Any]:
@@ -172,15 +582,16 @@ class MinimaxVoiceService:
         Complete voice-to-voice conversation pipeline
         
         Args:
-            audio_file_path: Path to input audio file
-            conversation_history: Previous conversation messages
+            audio: Input audio (path, bytes or file object)
+            conversation_history: Previous conversation messages (most recent kept
+                within the SESSION_HISTORY_TOKENS budget)
             system_prompt: System/instruction prompt for the AI
             
         Returns:
             Dictionary containing transcript, response text, and audio bytes
         """
         # Step 1: Transcribe input audio
-        transcript = self.speech_to_text(audio_file_path)
+        transcript = self.speech_to_text(audio)
         
         # Step 2: Prepare messages for chat
         messages = []
@@ -188,7 +599,7 @@ class MinimaxVoiceService:
             messages.append({"role": "system", "content": system_prompt})
         
         if conversation_history:
-            messages.extend(conversation_history)
+            messages.extend(fit_to_budget(conversation_history, HISTORY_TOKEN_BUDGET))
         
         messages.append({"role": "user", "content": transcript})
         
@@ -203,3 +614,239 @@ class MinimaxVoiceService:
             "response": response_text,
             "audio": audio_bytes
         }
+
+
+class AsyncMinimaxVoiceService(MinimaxVoiceService):
+    """
+    Non-blocking variant of MinimaxVoiceService for use inside async handlers.
+    
+    Exposes the same methods as the sync service, but as coroutines backed by
+    a shared httpx.AsyncClient, so a slow upstream call only suspends the
+    current request instead of stalling the whole event loop.
+    """
+    
+    def _create_client(self):
+        return httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            event_hooks=self.event_hooks,
+            **self.pool_config.client_kwargs()
+        )
+    
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        self._stats.requests += 1
+        return await self._client.request(method, url, extensions={"trace": self._stats.atrace}, **kwargs)
+    
+    async def aclose(self) -> None:
+        """Close pooled connections"""
+        await self._client.aclose()
+    
+    async def text_to_speech(
+        self,
+        text: str,
+        voice_id: Optional[str] = None,
+        speed: float = 1.0,
+        pitch: int = 0,
+        vol: float = 1.0,
+        audio_setting: Optional[Dict[str, Any]] = None,
+        model: Optional[str] = None
+    ) -> bytes:
+        """Async counterpart of MinimaxVoiceService.text_to_speech"""
+        url = f"{self.base_url}/t2a_v2"
+        payload = self._tts_payload(text, voice_id, speed, pitch, vol, audio_setting, model)
+        
+        self._stats.requests += 1
+        async with self._client.stream(
+            "POST", url, json=payload, extensions={"trace": self._stats.atrace}
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise MinimaxAPIError(self._tts_error(response), response)
+            parser = TTSResponseParser(self._audio_size_hint(response))
+            async for chunk in response.aiter_bytes():
+                parser.feed(chunk)
+        
+        audio_data, audio_url = self._parse_tts_response(parser)
+        if audio_data is not None:
+            return audio_data
+        
+        audio_response = await self._send("GET", audio_url)
+        if audio_response.status_code != 200:
+            raise MinimaxAPIError(f"Minimax TTS audio download failed: {audio_response.status_code}", audio_response)
+        return audio_response.content
+    
+    async def text_to_speech_stream(
+        self,
+        text: str,
+        voice_id: Optional[str] = None,
+        speed: float = 1.0,
+        pitch: int = 0,
+        vol: float = 1.0,
+        audio_setting: Optional[Dict[str, Any]] = None,
+        model: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """Async counterpart of MinimaxVoiceService.text_to_speech_stream"""
+        url = f"{self.base_url}/t2a_v2"
+        payload = self._tts_stream_payload(text, voice_id, speed, pitch, vol, audio_setting, model)
+        
+        self._stats.requests += 1
+        async with self._client.stream(
+            "POST", url, json=payload, extensions={"trace": self._stats.atrace}
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise MinimaxAPIError(self._tts_error(response), response)
+            parser = TTSResponseParser(keep=False)
+            async for chunk in response.aiter_bytes():
+                for audio in parser.feed(chunk):
+                    yield audio
+                for event in parser.events():
+                    self._check_base_resp(event)
+            final = parser.close()
+        
+        for event in final:
+            self._check_base_resp(event)
+        if not parser.audio_values:
+            async with self._client.stream("GET", self._audio_file_url(final)) as audio_response:
+                if audio_response.status_code != 200:
+                    raise MinimaxAPIError(
+                        f"Minimax TTS audio download failed: {audio_response.status_code}", audio_response
+                    )
+                async for chunk in audio_response.aiter_bytes():
+                    yield chunk
+    
+    async def speech_to_text(
+        self,
+        audio: AudioInput,
+        filename: Optional[str] = None,
+        content_type: str = "application/octet-stream"
+    ) -> str:
+        """
+        Async counterpart of MinimaxVoiceService.speech_to_text
+        
+        Also accepts an async iterator of byte chunks, which is forwarded as
+        a chunked multipart body as the chunks arrive.
+        """
+        url = f"{self.base_url}/audio/transcriptions"
+        filename = filename or input_filename(audio)
+        
+        if is_async_stream(audio):
+            boundary = secrets.token_hex(16)
+            head, tail = _multipart_envelope(boundary, filename, content_type)
+            
+            async def body():
+                yield head
+                async for chunk in iter_chunks(audio):
+                    yield chunk
+                yield tail
+            
+            response = await self._send(
+                "POST", url, content=body(),
+                headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}
+            )
+        else:
+            audio_file = as_file(audio)
+            try:
+                files = {
+                    'file': (filename, audio_file, content_type),
+                    'model': (None, 'whisper-1')
+                }
+                response = await self._send("POST", url, files=files)
+            finally:
+                if isinstance(audio, (str, os.PathLike)):
+                    audio_file.close()
+        
+        if response.status_code != 200:
+            raise MinimaxAPIError(f"Minimax ASR API error: {response.status_code} - {response.text}", response)
+        
+        return response.json().get('text', '')
+    
+    async def chat_completion(
+        self,
+        messages: list,
+        temperature: float = 0.7,
+        max_tokens: int = 300
+    ) -> str:
+        """Async counterpart of MinimaxVoiceService.chat_completion"""
+        url = f"{self.base_url}/chat/completions"
+        payload = self._chat_payload(messages, temperature, max_tokens)
+        
+        response = await self._send("POST", url, json=payload)
+        
+        if response.status_code != 200:
+            raise MinimaxAPIError(f"Minimax Chat API error: {response.status_code} - {response.text}", response)
+        
+        data = response.json()
+        self._observe_usage(data)
+        return data['choices'][0]['message']['content']
+    
+    async def chat_completion_stream(
+        self,
+        messages: list,
+        temperature: float = 0.7,
+        max_tokens: int = 300
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion as text deltas
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            temperature: Sampling temperature (0.0 to 2.0)
+            max_tokens: Maximum tokens to generate
+            
+        Yields:
+            Text deltas in generation order
+        """
+        url = f"{self.base_url}/chat/completions"
+        payload = self._chat_payload(messages, temperature, max_tokens)
+        payload["stream"] = True
+        
+        self._stats.requests += 1
+        async with self._client.stream(
+            "POST", url, json=payload, extensions={"trace": self._stats.atrace}
+        ) as response:
+            if response.status_code != 200:
+                body = (await response.aread()).decode("utf-8", errors="replace")
+                raise MinimaxAPIError(f"Minimax Chat API error: {response.status_code} - {body}", response)
+            
+            # Server-sent events: one "data: {json}" line per chunk
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                # The last chunk carries the usage for the whole completion
+                self._observe_usage(event)
+                choices = event.get("choices") or []
+                if choices:
+                    delta = (choices[0].get("delta") or {}).get("content")
+                    if delta:
+                        yield delta
+    
+    async def voice_conversation(
+        self,
+        audio: AudioInput,
+        conversation_history: list = None,
+        system_prompt: str = None
+    ) -> Dict[str, Any]:
+        """Async counterpart of MinimaxVoiceService.voice_conversation"""
+        transcript = await self.speech_to_text(audio)
+        
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        
+        if conversation_history:
+            messages.extend(fit_to_budget(conversation_history, HISTORY_TOKEN_BUDGET))
+        
+        messages.append({"role": "user", "content": transcript})
+        
+        response_text = await self.chat_completion(messages)
+        audio_bytes = await self.text_to_speech(response_text)
+        
+        return {
+            "transcript": transcript,
+            "response": response_text,
+            "audio": audio_bytes
+        }
@@ -0,0 +1,254 @@
+"""
+Local mock upstream for benchmarks
+Emulates the OpenAI and Minimax endpoints used by the voice pipeline so the
+backend can be exercised without network access or API credits
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import socket
+import threading
+import time
+from typing import Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+
+# Small fake MP3 payload (an MPEG frame header followed by padding)
+FAKE_AUDIO = b"\xff\xfb\x90\x64" + b"\x00" * 4096
+# 0.2s of silence as s16le mono 24kHz, for response_format / audio_setting "pcm"
+FAKE_PCM = b"\x00\x00" * 4800
+# Fake Ogg Opus payload (an Ogg page capture pattern followed by padding)
+FAKE_OPUS = b"OggS" + b"\x00" * 4096
+FAKE_TRANSCRIPT = "I have been feeling stressed about work lately."
+FAKE_REPLY = "That sounds really hard. What part of work feels most overwhelming right now?"
+
+
+def _prompt_usage(messages: List[Dict], seen: set) -> Dict:
+    """
+    OpenAI-style usage with prompt caching: leading messages that started an
+    earlier request count as cached (about 4 characters per token)
+    """
+    prompt_tokens = cached_tokens = 0
+    prefix = hashlib.sha256()
+    cached = True
+    for message in messages:
+        tokens = len(str(message.get("content", ""))) // 4 + 4
+        prefix.update(json.dumps(message, sort_keys=True).encode("utf-8"))
+        key = prefix.hexdigest()
+        cached = cached and key in seen
+        cached_tokens += tokens if cached else 0
+        prompt_tokens += tokens
+        seen.add(key)
+    completion_tokens = len(FAKE_REPLY) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached_tokens},
+    }
+
+
+def create_mock_app(
+    latency_ms: float = 50.0,
+    jitter_ms: float = 0.0,
+    error_rate: float = 0.0,
+    error_status: int = 503,
+    seed: Optional[int] = None,
+) -> FastAPI:
+    """
+    Build a FastAPI app that mimics the upstream provider APIs.
+
+    Args:
+        latency_ms: Artificial delay applied to every upstream call
+        jitter_ms: Mean of an exponential extra delay per call (long-tail latency)
+        error_rate: Fraction of calls answered with `error_status` instead
+        error_status: HTTP status used for injected errors (429/500/503...)
+        seed: Seed for reproducible jitter and error injection
+    """
+    app = FastAPI(title="Mock Voice Upstream")
+    rng = random.Random(seed)
+    app.state.injected_errors = 0
+    app.state.prompt_prefixes = set()
+
+    async def upstream_call() -> Optional[JSONResponse]:
+        """Sleep for this call's latency; return an error response if one is injected"""
+        delay = latency_ms / 1000.0
+        if jitter_ms:
+            delay += rng.expovariate(1000.0 / jitter_ms)
+        await asyncio.sleep(delay)
+        if error_rate and rng.random() < error_rate:
+            app.state.injected_errors += 1
+            return JSONResponse(
+                {"error": {"message": "Injected upstream error", "type": "mock_error"}},
+                status_code=error_status,
+            )
+        return None
+
+    @app.post("/v1/audio/transcriptions")
+    async def transcriptions(request: Request):
+        # Shared by OpenAI Whisper and Minimax ASR
+        form = await request.form()
+        error = await upstream_call()
+        if error:
+            return error
+        if form.get("response_format") == "text":
+            return PlainTextResponse(FAKE_TRANSCRIPT)
+        return {"text": FAKE_TRANSCRIPT}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        error = await upstream_call()
+        if error:
+            return error
+        usage = _prompt_usage(body.get("messages", []), app.state.prompt_prefixes)
+        if body.get("stream"):
+            return StreamingResponse(
+                _stream_chat(
+                    body.get("model", "mock"), latency_ms / 1000.0, usage,
+                    (body.get("stream_options") or {}).get("include_usage", False),
+                ),
+                media_type="text/event-stream",
+            )
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": FAKE_REPLY},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        }
+
+    @app.post("/v1/audio/speech")
+    async def speech(request: Request):
+        body = await request.json()
+        error = await upstream_call()
+        if error:
+            return error
+        if body.get("response_format") == "pcm":
+            return Response(content=FAKE_PCM, media_type="audio/pcm")
+        if body.get("response_format") == "opus":
+            return Response(content=FAKE_OPUS, media_type="audio/ogg")
+        return Response(content=FAKE_AUDIO, media_type="audio/mpeg")
+
+    @app.post("/v1/t2a_v2")
+    async def t2a_v2(request: Request):
+        body = await request.json()
+        error = await upstream_call()
+        if error:
+            return error
+        audio = FAKE_PCM if body.get("audio_setting", {}).get("format") == "pcm" else FAKE_AUDIO
+        if body.get("stream"):
+            return StreamingResponse(_stream_tts(latency_ms / 1000.0, audio), media_type="text/event-stream")
+        return JSONResponse({
+            "data": {"audio": base64.b64encode(audio).decode("ascii")},
+            "base_resp": {"status_code": 0, "status_msg": "success"}
+        })
+
+    return app
+
+
+async def _stream_chat(model: str, delay: float, usage: Optional[Dict] = None, usage_chunk: bool = False):
+    """
+    Emit FAKE_REPLY word by word as OpenAI-style chat.completion.chunk events.
+
+    `usage` goes in a final chunk without choices when `usage_chunk` is set
+    (OpenAI's stream_options.include_usage), otherwise on the last word (Minimax).
+    """
+    words = FAKE_REPLY.split(" ")
+    per_token = delay / max(len(words), 1)
+    for i, word in enumerate(words):
+        chunk = {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "delta": {"content": word if i == 0 else " " + word},
+                "finish_reason": None
+            }]
+        }
+        if usage and not usage_chunk and i == len(words) - 1:
+            chunk["usage"] = usage
+        yield f"data: {json.dumps(chunk)}\n\n"
+        await asyncio.sleep(per_token)
+    if usage and usage_chunk:
+        chunk = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                 "model": model, "choices": [], "usage": usage}
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+async def _stream_tts(delay: float, audio: bytes = FAKE_AUDIO, chunk_size: int = 1024):
+    """Emit `audio` as Minimax-style streaming T2A events (status 1 chunks, then status 2)"""
+    chunks = [audio[i:i + chunk_size] for i in range(0, len(audio), chunk_size)]
+    per_chunk = delay / max(len(chunks), 1)
+    for chunk in chunks:
+        event = {
+            "data": {"audio": base64.b64encode(chunk).decode("ascii"), "status": 1},
+            "base_resp": {"status_code": 0, "status_msg": ""}
+        }
+        yield f"data: {json.dumps(event)}\n\n"
+        await asyncio.sleep(per_chunk)
+    yield f"data: {json.dumps({'data': {'status': 2}, 'base_resp': {'status_code': 0, 'status_msg': 'success'}})}\n\n"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class MockUpstreamServer:
+    """Runs the mock upstream app with uvicorn in a background thread"""
+
+    def __init__(self, latency_ms: float = 50.0, port: int = 0, **faults):
+        """`faults` are passed to create_mock_app (jitter_ms, error_rate, error_status, seed)"""
+        self.port = port or _free_port()
+        config = uvicorn.Config(
+            create_mock_app(latency_ms, **faults),
+            host="127.0.0.1",
+            port=self.port,
+            log_level="warning",
+        )
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def __enter__(self) -> "MockUpstreamServer":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the mock OpenAI/Minimax upstream")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="mean extra exponential delay per call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    app = create_mock_app(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, args.seed)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,148 @@
+"""
+System prompt bundles
+Immutable system messages per (provider, risk level), built once at startup
+in one fixed order so every request to a provider starts with the same bytes
+and upstream prompt caching can match the prefix
+"""
+
+import hashlib
+import textwrap
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from guardian_safety import GuardianSafety, RiskLevel, SAFETY_BASE_INSTRUCTIONS
+from session_context import message_tokens
+
+# CBT guidance, placed between the shared safety rules and the risk-level instructions
+OPENAI_CBT_CONTEXT = """
+        Use Cognitive Behavioral Therapy (CBT) techniques:
+        - Ask open-ended questions
+        - Help identify thought patterns
+        - Challenge negative thoughts gently
+        - Encourage behavioral activation
+        - Teach coping strategies
+        - Validate feelings while promoting realistic thinking
+        """
+
+MINIMAX_CBT_CONTEXT = """
+        You are a compassionate AI therapist using Cognitive Behavioral Therapy (CBT) techniques:
+        - Ask open-ended questions to understand deeply
+        - Help identify thought patterns and cognitive distortions
+        - Challenge negative thoughts gently and constructively
+        - Encourage behavioral activation and practical coping strategies
+        - Teach mindfulness and emotional regulation techniques
+        - Validate feelings while promoting realistic, balanced thinking
+        - Use a warm, empathetic tone that builds trust
+        - Keep responses conversational and natural (2-3 sentences typically)
+        """
+
+CBT_CONTEXTS = {"openai": OPENAI_CBT_CONTEXT, "minimax": MINIMAX_CBT_CONTEXT}
+RISK_LEVELS = tuple(level.value for level in RiskLevel)
+
+# OpenAI only caches prompts of at least this many tokens
+OPENAI_MIN_CACHED_TOKENS = 1024
+
+
+def _system(content: str) -> Mapping[str, str]:
+    return MappingProxyType({"role": "system", "content": textwrap.dedent(content).strip()})
+
+
+@dataclass(frozen=True)
+class PromptBundle:
+    """
+    The system messages for one (provider, risk level).
+
+    Messages go from most to least shared: safety rules (every provider and
+    level), the provider's CBT guidance, then the risk-level instructions,
+    so bundles of one provider share everything up to the last message.
+    """
+    provider: str
+    risk_level: str
+    messages: Tuple[Mapping[str, str], ...]
+    tokens: int  # pre-counted, including per-message framing
+    shared_tokens: int  # leading tokens identical across the provider's risk levels
+    fingerprint: str  # sha256 prefix of the content, to spot prompt changes across deploys
+
+    def build(self, transcript: str, history: Optional[Iterable[Dict]] = None) -> List[Dict]:
+        """Full message list for one turn (fresh dicts; the bundle itself never changes)"""
+        return [
+            *(dict(message) for message in self.messages),
+            *(history or []),
+            {"role": "user", "content": transcript},
+        ]
+
+
+def prompt_usage(usage: Any) -> Tuple[int, int]:
+    """
+    (prompt tokens, cached prompt tokens) from an OpenAI-style `usage`
+    object or dict; cached is 0 when the provider doesn't report it.
+    """
+    if usage is None:
+        return 0, 0
+    if not isinstance(usage, dict):
+        usage = usage.model_dump() if hasattr(usage, "model_dump") else vars(usage)
+    details = usage.get("prompt_tokens_details") or {}
+    return int(usage.get("prompt_tokens") or 0), int(details.get("cached_tokens") or 0)
+
+
+class PromptBundles:
+    """
+    Every PromptBundle, built up front, plus the prompt cache usage the
+    providers report for requests made with them.
+    """
+
+    def __init__(self, contexts: Optional[Dict[str, str]] = None):
+        self._bundles: Dict[Tuple[str, str], PromptBundle] = {}
+        for provider, context in (contexts or CBT_CONTEXTS).items():
+            shared = (_system(SAFETY_BASE_INSTRUCTIONS), _system(context))
+            shared_tokens = sum(message_tokens(message) for message in shared)
+            for risk_level in RISK_LEVELS:
+                messages = shared + (_system(GuardianSafety.get_risk_instructions(risk_level)),)
+                digest = hashlib.sha256("\0".join(m["content"] for m in messages).encode("utf-8"))
+                self._bundles[(provider, risk_level)] = PromptBundle(
+                    provider=provider,
+                    risk_level=risk_level,
+                    messages=messages,
+                    tokens=shared_tokens + message_tokens(messages[-1]),
+                    shared_tokens=shared_tokens,
+                    fingerprint=digest.hexdigest()[:12],
+                )
+        self._lock = threading.Lock()
+        self._usage: Dict[str, Dict[str, int]] = {}
+
+    def get(self, provider: str, risk_level: str) -> PromptBundle:
+        """Bundle for `provider`; unknown risk levels get the clear bundle, as Guardian's instructions do"""
+        bundle = self._bundles.get((provider, risk_level))
+        return bundle if bundle is not None else self._bundles[(provider, RiskLevel.CLEAR.value)]
+
+    def record_usage(self, provider: str, usage: Any) -> Tuple[int, int]:
+        """Add a response's reported prompt/cached tokens; returns them"""
+        prompt_tokens, cached_tokens = prompt_usage(usage)
+        if prompt_tokens:
+            with self._lock:
+                totals = self._usage.setdefault(provider, {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0})
+                totals["requests"] += 1
+                totals["prompt_tokens"] += prompt_tokens
+                totals["cached_tokens"] += cached_tokens
+        return prompt_tokens, cached_tokens
+
+    def stats(self) -> Dict:
+        with self._lock:
+            usage = {
+                provider: {**totals, "cached_ratio": totals["cached_tokens"] / totals["prompt_tokens"]}
+                for provider, totals in self._usage.items()
+            }
+        return {
+            "bundles": {
+                f"{provider}:{risk_level}": {
+                    "tokens": bundle.tokens,
+                    "shared_tokens": bundle.shared_tokens,
+                    "fingerprint": bundle.fingerprint,
+                }
+                for (provider, risk_level), bundle in self._bundles.items()
+            },
+            "openai_min_cached_tokens": OPENAI_MIN_CACHED_TOKENS,
+            "usage": usage,
+        }
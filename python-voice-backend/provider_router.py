@@ -0,0 +1,226 @@
+"""
+Provider routing with circuit breakers
+Picks OpenAI, Minimax or Gemini per pipeline stage (ASR, LLM, TTS) from live
+error rates and latency percentiles, skipping providers whose breaker is
+open and demoting ones that are much slower than the alternatives
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker for one provider/stage.
+
+    Opens when at least `min_calls` calls in the last `window` seconds failed
+    at `error_threshold` or above. After `cooldown` seconds it lets a single
+    probe call through (half-open); the probe's outcome closes or re-opens it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, window: float = 30.0, min_calls: int = 5, error_threshold: float = 0.5, cooldown: float = 10.0):
+        self.window = window
+        self.min_calls = min_calls
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self._calls: Deque[Tuple[float, bool, float]] = deque()
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self.trips = 0
+
+    def _prune(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def available(self) -> bool:
+        """Whether a call may be attempted now (no side effects)"""
+        state = self.state
+        return state == self.CLOSED or (state == self.HALF_OPEN and not self._probing)
+
+    def allow(self) -> bool:
+        """Claim permission for a call; in half-open state only one probe runs at a time"""
+        if not self.available():
+            return False
+        if self.state == self.HALF_OPEN:
+            self._probing = True
+        return True
+
+    def record(self, ok: bool, latency: float) -> None:
+        now = time.monotonic()
+        self._calls.append((now, ok, latency))
+        self._prune(now)
+        if self._opened_at is not None:
+            if self._probing or self.state == self.HALF_OPEN:
+                self._probing = False
+                if ok:
+                    # Probe succeeded: start over with a clean window
+                    self._opened_at = None
+                    self._calls.clear()
+                    self._calls.append((now, ok, latency))
+                else:
+                    self._opened_at = now
+            return
+        if len(self._calls) >= self.min_calls and self.error_rate() >= self.error_threshold:
+            self._opened_at = now
+            self.trips += 1
+
+    def cancel_probe(self) -> None:
+        self._probing = False
+
+    def error_rate(self) -> float:
+        self._prune(time.monotonic())
+        if not self._calls:
+            return 0.0
+        return sum(1 for _, ok, _ in self._calls if not ok) / len(self._calls)
+
+    def latency(self, q: float = 0.95, min_samples: int = 3) -> Optional[float]:
+        """Latency quantile of recent successful calls"""
+        self._prune(time.monotonic())
+        samples = [latency for _, ok, latency in self._calls if ok]
+        if len(samples) < min_samples:
+            return None
+        return float(np.quantile(samples, q))
+
+    def snapshot(self) -> Dict:
+        return {
+            "state": self.state,
+            "calls": len(self._calls),
+            "error_rate": round(self.error_rate(), 3),
+            "p50": self.latency(0.5),
+            "p95": self.latency(0.95),
+            "trips": self.trips,
+        }
+
+
+class ProviderRouter:
+    """
+    Orders providers per stage and fails over between them.
+
+    Args:
+        providers: stage -> available providers in default preference order
+        slow_factor: A provider is demoted when its p95 latency exceeds this
+            multiple of the fastest alternative's p95
+        breaker_kwargs: Passed to each CircuitBreaker
+    """
+
+    # Metric stage names that feed each routing stage
+    OBSERVED_STAGES = {"asr": "asr", "llm": "llm", "tts": "tts"}
+
+    def __init__(self, providers: Dict[str, List[str]], slow_factor: float = 2.0, **breaker_kwargs):
+        self.providers = providers
+        self.slow_factor = slow_factor
+        self.breakers = {
+            (stage, provider): CircuitBreaker(**breaker_kwargs)
+            for stage, names in providers.items()
+            for provider in names
+        }
+        self._routed: Dict[str, Dict[str, int]] = {stage: {} for stage in providers}
+        self.failovers = 0
+
+    @classmethod
+    def from_env(cls, providers: Dict[str, List[str]]) -> "ProviderRouter":
+        return cls(
+            providers,
+            slow_factor=float(os.getenv("ROUTER_SLOW_FACTOR", "2.0")),
+            window=float(os.getenv("ROUTER_WINDOW_SECONDS", "30")),
+            error_threshold=float(os.getenv("ROUTER_ERROR_THRESHOLD", "0.5")),
+            cooldown=float(os.getenv("ROUTER_COOLDOWN_SECONDS", "10")),
+        )
+
+    def observe(self, stage: str, provider: str, outcome: str, seconds: float) -> None:
+        """Stage observer (see metrics.add_observer): every provider call updates its breaker"""
+        breaker = self.breakers.get((self.OBSERVED_STAGES.get(stage), provider))
+        if breaker is None:
+            return
+        if outcome == "cancelled":
+            breaker.cancel_probe()
+            return
+        breaker.record(outcome == "ok", seconds)
+
+    def candidates(self, stage: str, preferred: Optional[str] = None) -> List[str]:
+        """Providers to try for `stage`, best first"""
+        order = list(self.providers.get(stage, []))
+        if preferred in order:
+            order.remove(preferred)
+            order.insert(0, preferred)
+        available = [p for p in order if self.breakers[(stage, p)].available()]
+        if not available:
+            # Every breaker is open: trying is still better than failing outright
+            return order
+
+        p95 = {p: self.breakers[(stage, p)].latency() for p in available}
+
+        def too_slow(provider: str) -> bool:
+            mine = p95[provider]
+            others = [v for p, v in p95.items() if p != provider and v is not None]
+            return mine is not None and bool(others) and mine > self.slow_factor * min(others)
+
+        return sorted(available, key=too_slow)
+
+    async def call(
+        self,
+        stage: str,
+        calls: Dict[str, Callable[[], Awaitable[T]]],
+        preferred: Optional[str] = None,
+    ) -> Tuple[T, str]:
+        """
+        Run the stage with the best provider, failing over on errors.
+
+        Outcomes are recorded through `observe` by the instrumented provider
+        calls themselves.
+
+        Returns:
+            (result, provider used)
+        """
+        last_error: Optional[BaseException] = None
+        tried = 0
+        candidates = self.candidates(stage, preferred)
+        forced = not any(self.breakers[(stage, p)].available() for p in candidates)
+        for provider in candidates:
+            if provider not in calls:
+                continue
+            breaker = self.breakers[(stage, provider)]
+            if not breaker.allow() and not forced:
+                continue
+            if tried:
+                self.failovers += 1
+            tried += 1
+            try:
+                result = await calls[provider]()
+            except asyncio.CancelledError:
+                breaker.cancel_probe()
+                raise
+            except Exception as e:
+                print(f"{stage} provider {provider} failed: {type(e).__name__}: {e}")
+                last_error = e
+                continue
+            self._routed[stage][provider] = self._routed[stage].get(provider, 0) + 1
+            return result, provider
+        raise last_error or RuntimeError(f"No provider available for {stage}")
+
+    def stats(self) -> Dict:
+        return {
+            "failovers": self.failovers,
+            "routed": self._routed,
+            "breakers": {
+                f"{stage}:{provider}": breaker.snapshot()
+                for (stage, provider), breaker in self.breakers.items()
+            },
+        }
@@ -0,0 +1,433 @@
+"""
+Semantic response cache
+Answers clear-risk turns that are near-duplicates of earlier ones ("I'm
+stressed about work", "I can't sleep") from previously generated replies
+instead of paying for another chat completion. Opt-in via SEMANTIC_CACHE;
+needs a sentence-embedding model, since lexical similarity can't tell "happy"
+from "unhappy"
+"""
+
+import importlib.util
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Only turns Guardian scored clear are ever answered from or added to the cache
+CACHEABLE_RISK_LEVELS = ("clear",)
+
+WORD = re.compile(r"[a-z0-9]+")
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+# Words that flip a turn's meaning; embeddings barely move when one is added
+# (apostrophes are stripped before matching, so "don't" is "dont")
+NEGATIONS = frozenset({
+    "not", "no", "never", "nothing", "nobody", "none", "nor", "neither", "without", "cannot",
+    "dont", "doesnt", "didnt", "cant", "wont", "wouldnt", "shouldnt", "couldnt",
+    "isnt", "arent", "wasnt", "werent", "havent", "hasnt", "hadnt", "aint",
+})
+NEGATING_PREFIXES = ("un", "dis", "non", "in", "im", "ir")
+
+
+def words(text: str) -> List[str]:
+    # "I'm" and "Im" are the same word to a speech recognizer
+    return WORD.findall(text.lower().replace("'", "").replace("\u2019", ""))
+
+
+def opposite_polarity(a: str, b: str) -> bool:
+    """
+    Whether one transcript negates the other: a different number of
+    negations ("stressed" / "not stressed") or a word that is the other's
+    with a negating prefix ("happy" / "unhappy").
+    """
+    words_a, words_b = words(a), words(b)
+    if sum(w in NEGATIONS for w in words_a) % 2 != sum(w in NEGATIONS for w in words_b) % 2:
+        return True
+    set_a, set_b = set(words_a), set(words_b)
+    for mine, other in ((set_a - set_b, set_b), (set_b - set_a, set_a)):
+        for word in mine:
+            if any(word.startswith(prefix) and word[len(prefix):] in other for prefix in NEGATING_PREFIXES):
+                return True
+    return False
+
+
+class HashingEmbedder:
+    """
+    Feature-hashed word unigrams, bigrams and character trigrams.
+
+    Lexical rather than semantic: it needs no model download and embeds a
+    turn in well under a millisecond, but scores "I'm happy with my partner"
+    and "I'm unhappy with my partner" at 0.85, so SemanticResponseCache
+    won't serve replies with it (it remains for benchmarks and tests).
+    """
+
+    name = "hashing"
+    semantic = False
+    ready = True
+    default_threshold = 0.85
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def load(self) -> None:
+        pass
+
+    def embed(self, text: str) -> np.ndarray:
+        tokens = words(text)
+        joined = f" {' '.join(tokens)} "
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        features += [joined[i:i + 3] for i in range(len(joined) - 2)]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if not features:
+            return vector
+        # crc32 rather than hash(): stable across processes and restarts
+        hashes = np.array([zlib.crc32(f.encode("utf-8")) for f in features], dtype=np.uint32)
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, hashes % self.dim, signs)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SentenceTransformerEmbedder:
+    """
+    Local sentence-transformers model (e.g. all-MiniLM-L6-v2), loaded by
+    load() (the server does it at startup) or on first use
+    """
+
+    name = "sentence-transformers"
+    semantic = True
+    default_threshold = 0.88
+
+    def __init__(self, model_name: str = DEFAULT_MODEL):
+        if importlib.util.find_spec("sentence_transformers") is None:
+            raise ImportError(
+                "sentence-transformers is not installed (pip install -r requirements-semantic-cache.txt)"
+            )
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._model is not None
+
+    def load(self) -> None:
+        """Load the model, downloading it on first use; blocking"""
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name)
+
+    def embed(self, text: str) -> np.ndarray:
+        self.load()
+        return self._model.encode(text, normalize_embeddings=True).astype(np.float32)
+
+
+@dataclass
+class _Entry:
+    transcript: str
+    replies: List[str] = field(default_factory=list)
+    created: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    last_served: int = -1
+
+
+def default_embedder():
+    """The default sentence-transformers model, or the hashing embedder when it isn't installed"""
+    try:
+        return SentenceTransformerEmbedder(DEFAULT_MODEL)
+    except ImportError:
+        return HashingEmbedder()
+
+
+class _Index:
+    """
+    Exact cosine search over a NumPy matrix of unit vectors.
+
+    A few thousand entries search in about a millisecond, so there is no
+    approximate (HNSW) graph to build or keep in sync with evictions.
+    """
+
+    def __init__(self, dim: int, capacity: int):
+        self.capacity = capacity
+        self.vectors = np.zeros((min(capacity, 64), dim), dtype=np.float32)
+        self.entries: List[_Entry] = []
+
+    def search(self, vector: np.ndarray):
+        """(row, similarity) of the nearest entry, or (-1, 0.0) when empty"""
+        if not self.entries:
+            return -1, 0.0
+        scores = self.vectors[:len(self.entries)] @ vector
+        row = int(np.argmax(scores))
+        return row, float(scores[row])
+
+    def matches(self, vector: np.ndarray, threshold: float) -> List[int]:
+        """Rows at or above `threshold`, most similar first"""
+        if not self.entries:
+            return []
+        scores = self.vectors[:len(self.entries)] @ vector
+        rows = np.flatnonzero(scores >= threshold)
+        return rows[np.argsort(-scores[rows], kind="stable")].tolist()
+
+    def add(self, vector: np.ndarray, entry: _Entry) -> None:
+        if len(self.entries) == len(self.vectors):
+            grown = np.zeros((min(len(self.vectors) * 2, self.capacity), self.vectors.shape[1]), dtype=np.float32)
+            grown[:len(self.vectors)] = self.vectors
+            self.vectors = grown
+        self.vectors[len(self.entries)] = vector
+        self.entries.append(entry)
+
+    def remove(self, row: int) -> None:
+        # Move the last row into the hole so the live rows stay contiguous
+        last = len(self.entries) - 1
+        self.vectors[row] = self.vectors[last]
+        self.entries[row] = self.entries[last]
+        self.entries.pop()
+
+
+@dataclass
+class CacheQuery:
+    """Outcome of a lookup; pass it back to `add` once a generated reply is confirmed"""
+    provider: str
+    transcript: str
+    result: str  # hit, miss, fill or bypass
+    vector: Optional[np.ndarray] = None
+    reply: Optional[str] = None
+    saved_seconds: float = 0.0
+
+    @property
+    def cacheable(self) -> bool:
+        return self.vector is not None and self.reply is None
+
+
+class SemanticResponseCache:
+    """
+    Near-duplicate reply cache for clear-risk turns.
+
+    Each entry keeps up to `variants` replies generated for similar turns
+    and is only served once it has all of them; hits sample a reply other
+    than the one that entry served last, so repeated turns don't get the
+    same canned answer. Turns with conversation history beyond
+    `max_history_turns` bypass the cache, since a cached reply can't refer
+    back to the conversation, and an entry whose transcript negates the
+    turn ("stressed" / "not stressed") is never a match, however close the
+    embeddings are.
+
+    The cache stays disabled unless the embedder is semantic: a lexical
+    embedder would answer "I'm unhappy with my partner" with a reply written
+    for "I'm happy with my partner". Lookups bypass the cache until the
+    embedding model is loaded (see warm_up), so no turn waits for it.
+
+    Args:
+        enabled: When False every lookup is a bypass
+        embedder: Object with embed(text) -> unit np.ndarray, load(), ready,
+            default_threshold and semantic; defaults to the sentence-transformers model
+        threshold: Minimum cosine similarity for a match
+        ttl: Seconds an entry is served after its first reply
+        variants: Replies collected per entry before it is served
+        max_entries: Entries kept per provider (least recently used evicted)
+        max_history_turns: Prior turns allowed for a turn to use the cache
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        embedder=None,
+        threshold: Optional[float] = None,
+        ttl: float = 6 * 3600,
+        variants: int = 3,
+        max_entries: int = 5000,
+        max_history_turns: int = 0,
+        seed: Optional[int] = None,
+    ):
+        self.embedder = embedder or default_embedder()
+        if enabled and not self.embedder.semantic:
+            print(
+                f"Warning: the semantic cache needs a sentence-embedding model "
+                f"(pip install -r requirements-semantic-cache.txt); not enabling it with the "
+                f"{self.embedder.name} embedder"
+            )
+            enabled = False
+        self.enabled = enabled
+        self.threshold = threshold if threshold is not None else self.embedder.default_threshold
+        self.ttl = ttl
+        self.variants = max(1, variants)
+        self.max_entries = max_entries
+        self.max_history_turns = max_history_turns
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, _Index] = {}
+        self._llm_seconds: Dict[str, float] = {}
+        self._counters = {"hits": 0, "misses": 0, "fills": 0, "bypassed": 0, "expired": 0, "evictions": 0,
+                          "negated": 0}
+        self._bypassed_by_level: Dict[str, int] = {}
+        self._saved_seconds = 0.0
+        self._lookup_seconds = 0.0
+
+    @classmethod
+    def from_env(cls) -> "SemanticResponseCache":
+        """
+        Build from SEMANTIC_CACHE* environment variables (disabled unless
+        SEMANTIC_CACHE=true and sentence-transformers is installed)
+        """
+        enabled = os.getenv("SEMANTIC_CACHE", "").lower() in ("1", "true", "yes")
+        try:
+            embedder = SentenceTransformerEmbedder(os.getenv("SEMANTIC_CACHE_MODEL", DEFAULT_MODEL))
+        except ImportError as e:
+            if enabled:
+                print(f"Warning: SEMANTIC_CACHE is set but {e}; the semantic cache stays disabled")
+            embedder, enabled = HashingEmbedder(), False
+        threshold = os.getenv("SEMANTIC_CACHE_THRESHOLD")
+        return cls(
+            enabled=enabled,
+            embedder=embedder,
+            threshold=float(threshold) if threshold else None,
+            ttl=float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", str(6 * 3600))),
+            variants=int(os.getenv("SEMANTIC_CACHE_VARIANTS", "3")),
+            max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000")),
+            max_history_turns=int(os.getenv("SEMANTIC_CACHE_MAX_HISTORY_TURNS", "0")),
+        )
+
+    def warm_up(self) -> None:
+        """Load the embedding model ahead of traffic (blocking; run it in a worker thread)"""
+        if self.enabled:
+            self.embedder.load()
+
+    def observe(self, stage: str, provider: str, outcome: str, seconds: float) -> None:
+        """Metrics observer: running average of LLM latency, credited on every hit"""
+        if stage not in ("llm", "llm_first_token") or outcome != "ok":
+            return
+        key = f"{stage}:{provider}"
+        previous = self._llm_seconds.get(key)
+        self._llm_seconds[key] = seconds if previous is None else 0.8 * previous + 0.2 * seconds
+
+    def lookup(
+        self,
+        provider: str,
+        transcript: str,
+        risk_level: str,
+        history_turns: int = 0,
+        llm_stage: str = "llm",
+    ) -> CacheQuery:
+        """
+        Find a cached reply for `transcript`.
+
+        Blocking (embeds the transcript); call it from a worker thread when
+        using a model embedder.
+        """
+        if (
+            not self.enabled
+            or not self.embedder.ready
+            or risk_level not in CACHEABLE_RISK_LEVELS
+            or history_turns > self.max_history_turns
+        ):
+            with self._lock:
+                self._counters["bypassed"] += 1
+                self._bypassed_by_level[risk_level] = self._bypassed_by_level.get(risk_level, 0) + 1
+            return CacheQuery(provider, transcript, "bypass")
+
+        started = time.perf_counter()
+        vector = self.embedder.embed(transcript)
+        now = time.monotonic()
+        with self._lock:
+            index = self._indexes.get(provider)
+            row, negated = self._match(index, vector, transcript, expire_at=now - self.ttl) if index else (-1, False)
+            self._counters["negated"] += negated
+
+            query = CacheQuery(provider, transcript, "miss", vector)
+            if row >= 0:
+                entry = index.entries[row]
+                if len(entry.replies) < self.variants:
+                    query.result = "fill"
+                    self._counters["fills"] += 1
+                else:
+                    choices = [i for i in range(len(entry.replies)) if i != entry.last_served] or [0]
+                    entry.last_served = self._rng.choice(choices)
+                    entry.last_used = now
+                    query.result = "hit"
+                    query.reply = entry.replies[entry.last_served]
+                    query.saved_seconds = self._llm_seconds.get(f"{llm_stage}:{provider}", 0.0)
+                    self._counters["hits"] += 1
+                    self._saved_seconds += query.saved_seconds
+            else:
+                self._counters["misses"] += 1
+            self._lookup_seconds += time.perf_counter() - started
+        return query
+
+    def add(self, query: CacheQuery, reply: str) -> None:
+        """Store a reply generated for a missed (or filling) lookup"""
+        if not query.cacheable or not reply.strip():
+            return
+        now = time.monotonic()
+        with self._lock:
+            index = self._indexes.get(query.provider)
+            if index is None:
+                index = self._indexes[query.provider] = _Index(len(query.vector), self.max_entries)
+            row, _ = self._match(index, query.vector, query.transcript)
+            if row >= 0:
+                entry = index.entries[row]
+                # Duplicates count too: a model that keeps giving the same
+                # answer shouldn't keep the entry from ever being served
+                if len(entry.replies) < self.variants:
+                    entry.replies.append(reply)
+                    entry.last_used = now
+                return
+            if len(index.entries) >= self.max_entries:
+                index.remove(min(range(len(index.entries)), key=lambda i: index.entries[i].last_used))
+                self._counters["evictions"] += 1
+            index.add(query.vector, _Entry(query.transcript, [reply], created=now, last_used=now))
+
+    def _match(
+        self, index: _Index, vector: np.ndarray, transcript: str, expire_at: Optional[float] = None
+    ) -> Tuple[int, bool]:
+        """
+        (row, negated): the most similar entry above the threshold whose
+        transcript doesn't negate `transcript` (-1 if none), and whether a
+        closer one was skipped for negating it. With `expire_at`, entries
+        created before it are removed on the way. Caller holds the lock.
+        """
+        negated = False
+        while True:
+            for row in index.matches(vector, self.threshold):
+                entry = index.entries[row]
+                if expire_at is not None and entry.created < expire_at:
+                    index.remove(row)
+                    self._counters["expired"] += 1
+                    break  # rows moved; search again
+                if opposite_polarity(transcript, entry.transcript):
+                    negated = True
+                    continue
+                return row, negated
+            else:
+                return -1, negated
+
+    async def add_when_complete(self, query: CacheQuery, tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+        """Pass a token stream through and store the full reply once it has finished"""
+        parts = []
+        async for token in tokens:
+            parts.append(token)
+            yield token
+        self.add(query, "".join(parts))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"] + self._counters["fills"]
+            return {
+                "enabled": self.enabled,
+                "embedder": self.embedder.name,
+                "embedder_ready": self.embedder.ready,
+                "threshold": self.threshold,
+                **self._counters,
+                "bypassed_by_risk_level": dict(self._bypassed_by_level),
+                "hit_rate": self._counters["hits"] / lookups if lookups else 0.0,
+                "entries": sum(len(index.entries) for index in self._indexes.values()),
+                "saved_ms": self._saved_seconds * 1000,
+                "lookup_ms": self._lookup_seconds * 1000,
+            }
@@ -0,0 +1,61 @@
+"""
+Production entry point
+Runs the API under uvicorn with several worker processes. With more than one
+worker, generated audio and session context go through the SQLite state
+backend so any worker can serve any session, and Prometheus metrics are
+aggregated across workers
+
+Usage:
+    python serve.py --workers 4
+    python serve.py --workers 8 --state-path /var/lib/voice/state.db
+
+Under gunicorn, set the same environment and use the uvicorn worker class:
+    STATE_BACKEND=sqlite PROMETHEUS_MULTIPROC_DIR=/tmp/voice-metrics \\
+        gunicorn main:app -k uvicorn.workers.UvicornWorker -w 4 -b 0.0.0.0:8000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+
+import uvicorn
+
+
+def configure_workers(workers: int, state_backend: str, state_path: str) -> None:
+    """Set the environment the worker processes inherit before they import main"""
+    if workers > 1 and state_backend == "memory":
+        print("Note: several workers need shared state, using the sqlite backend")
+        state_backend = "sqlite"
+    os.environ["STATE_BACKEND"] = state_backend
+    os.environ.setdefault("STATE_SQLITE_PATH", state_path)
+
+    if workers > 1 and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        metrics_dir = os.path.join(tempfile.gettempdir(), f"voice-metrics-{os.getpid()}")
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir)
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the voice therapy API with multiple workers")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--state-backend", choices=["memory", "sqlite"], default=os.getenv("STATE_BACKEND", "memory"))
+    parser.add_argument("--state-path", default=os.getenv("STATE_SQLITE_PATH", "voice_state.db"))
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    configure_workers(args.workers, args.state_backend, args.state_path)
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
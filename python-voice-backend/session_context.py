@@ -0,0 +1,280 @@
+"""
+Server-side conversation context
+Keeps per-session history under a token budget, folding older turns into a
+rolling summary so prompt size (and latency) stays flat in long sessions
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from shared_state import StateBackend
+
+_WORD = re.compile(r"\w+|[^\w\s]")
+_encoder = None
+_encoder_loaded = False
+
+
+def _get_encoder():
+    """tiktoken's cl100k_base encoder if available (it may need a one-time download)"""
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        _encoder_loaded = True
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"Warning: tiktoken unavailable, using approximate token counts: {e}")
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    """Token count for `text` (exact with tiktoken, otherwise a word/punctuation estimate)"""
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    # Roughly 1.3 BPE tokens per word for English text
+    return int(len(_WORD.findall(text)) * 1.3) + 1
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    # Chat formats add a few tokens of framing per message
+    return count_tokens(message.get("content", "")) + 4
+
+
+def fit_to_budget(messages: List[Dict[str, str]], budget: int) -> List[Dict[str, str]]:
+    """Keep the most recent messages whose combined size fits in `budget` tokens"""
+    kept: List[Dict[str, str]] = []
+    used = 0
+    for message in reversed(messages):
+        used += message_tokens(message)
+        if used > budget:
+            break
+        kept.append(message)
+    kept.reverse()
+    return kept
+
+
+def parse_message_history(raw: str) -> List[Dict[str, str]]:
+    """Parse a client-supplied `message_history` JSON string, dropping malformed entries"""
+    try:
+        items = json.loads(raw or "[]")
+    except ValueError:
+        return []
+    if not isinstance(items, list):
+        return []
+    return [
+        {"role": item["role"], "content": item["content"]}
+        for item in items
+        if isinstance(item, dict)
+        and item.get("role") in ("user", "assistant")
+        and isinstance(item.get("content"), str)
+    ]
+
+
+def _gist(text: str, max_chars: int = 160) -> str:
+    """First sentence of a turn, shortened, for the rolling summary"""
+    first = re.split(r"(?<=[.!?])\s", text.strip(), maxsplit=1)[0]
+    return first if len(first) <= max_chars else first[:max_chars].rstrip() + "..."
+
+
+class SessionContext:
+    """History for one session: a rolling summary plus the most recent turns"""
+
+    def __init__(self, history_budget: int, summary_budget: int):
+        self.history_budget = history_budget
+        self.summary_budget = summary_budget
+        self.summary_points: Deque[str] = deque()
+        self.turns: Deque[Tuple[Dict[str, str], Dict[str, str], int]] = deque()
+        self.turn_tokens = 0
+        self.last_used = time.monotonic()
+        # TTS provider that spoke first in this session, reused so the voice stays the same
+        self.voice_provider: Optional[str] = None
+        # Called by save() with the serialized context to persist it (set for shared sessions)
+        self.on_change: Optional[Callable[[bytes], None]] = None
+
+    def seed(self, messages: List[Dict[str, str]]) -> None:
+        """Load client-provided history (used when the server has none yet)"""
+        pending_user = None
+        for message in messages:
+            if message["role"] == "user":
+                pending_user = message["content"]
+            elif pending_user is not None:
+                self.add_turn(pending_user, message["content"])
+                pending_user = None
+
+    def add_turn(self, user_text: str, assistant_text: str) -> None:
+        self._append_turn(user_text, assistant_text)
+        self.save()
+
+    async def add_turn_async(self, user_text: str, assistant_text: str) -> None:
+        """add_turn() for the event loop: the shared-state write runs in a worker thread"""
+        self._append_turn(user_text, assistant_text)
+        await self.save_async()
+
+    def save(self) -> None:
+        """Persist the context if it is backed by shared state"""
+        if self.on_change is not None:
+            self.on_change(self.to_json())
+
+    async def save_async(self) -> None:
+        """save() for the event loop; the context is serialized before leaving it"""
+        if self.on_change is not None:
+            await asyncio.to_thread(self.on_change, self.to_json())
+
+    def to_json(self) -> bytes:
+        return json.dumps({
+            "summary_points": list(self.summary_points),
+            "turns": [[user["content"], assistant["content"], tokens] for user, assistant, tokens in self.turns],
+            "voice_provider": self.voice_provider,
+        }).encode("utf-8")
+
+    @classmethod
+    def from_json(cls, raw: bytes, history_budget: int, summary_budget: int) -> "SessionContext":
+        data = json.loads(raw)
+        context = cls(history_budget, summary_budget)
+        context.summary_points.extend(data["summary_points"])
+        for user_text, assistant_text, tokens in data["turns"]:
+            context.turns.append((
+                {"role": "user", "content": user_text},
+                {"role": "assistant", "content": assistant_text},
+                tokens,
+            ))
+            context.turn_tokens += tokens
+        context.voice_provider = data.get("voice_provider")
+        return context
+
+    def history_messages(self) -> List[Dict[str, str]]:
+        """Summary (if any) followed by the verbatim recent turns"""
+        self.last_used = time.monotonic()
+        messages = []
+        if self.summary_points:
+            messages.append({
+                "role": "system",
+                "content": "Summary of earlier conversation:\n" + "\n".join(self.summary_points),
+            })
+        for user, assistant, _ in self.turns:
+            messages.append(user)
+            messages.append(assistant)
+        return messages
+
+    def _append_turn(self, user_text: str, assistant_text: str) -> None:
+        user = {"role": "user", "content": user_text}
+        assistant = {"role": "assistant", "content": assistant_text}
+        tokens = message_tokens(user) + message_tokens(assistant)
+        self.turns.append((user, assistant, tokens))
+        self.turn_tokens += tokens
+        self._compact()
+
+    def _compact(self) -> None:
+        # Fold the oldest turns into the summary until the verbatim part fits,
+        # always keeping the latest turn word for word
+        while self.turn_tokens > self.history_budget and len(self.turns) > 1:
+            user, assistant, tokens = self.turns.popleft()
+            self.turn_tokens -= tokens
+            self.summary_points.append(f"- User: {_gist(user['content'])} / Therapist: {_gist(assistant['content'])}")
+        while self.summary_points and count_tokens("\n".join(self.summary_points)) > self.summary_budget:
+            self.summary_points.popleft()
+
+
+def session_key(user_id: str, session_id: str) -> str:
+    """Store key for one user's session (length-prefixed, so ids can't collide)"""
+    return f"{len(user_id)}:{user_id}:{session_id}"
+
+
+class SessionContextManager:
+    """
+    Per-session contexts kept in an LRU with idle expiry.
+
+    Args:
+        max_sessions: Most sessions kept in memory
+        history_budget: Token budget for verbatim recent turns
+        summary_budget: Token budget for the rolling summary of older turns
+        idle_ttl: Seconds after which an unused session is dropped
+        shared: State backend shared between workers; when set, sessions are
+            loaded from and saved to it instead of the in-process LRU (use
+            get_async and SessionContext.add_turn_async on the event loop)
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        history_budget: int = 1200,
+        summary_budget: int = 300,
+        idle_ttl: float = 3600.0,
+        shared: Optional[StateBackend] = None,
+    ):
+        self.max_sessions = max_sessions
+        self.history_budget = history_budget
+        self.summary_budget = summary_budget
+        self.idle_ttl = idle_ttl
+        self.shared = shared
+        self._sessions: "OrderedDict[str, SessionContext]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls, shared: Optional[StateBackend] = None) -> "SessionContextManager":
+        return cls(
+            max_sessions=int(os.getenv("SESSION_MAX_SESSIONS", "1000")),
+            history_budget=int(os.getenv("SESSION_HISTORY_TOKENS", "1200")),
+            summary_budget=int(os.getenv("SESSION_SUMMARY_TOKENS", "300")),
+            idle_ttl=float(os.getenv("SESSION_IDLE_TTL_SECONDS", "3600")),
+            shared=shared,
+        )
+
+    def get(self, user_id: str, session_id: str, message_history: str = "[]") -> SessionContext:
+        """
+        Return the context for `session_id` of `user_id`, creating it if needed.
+
+        History is keyed by both ids, so a session_id reused (or guessed) by
+        another user finds nothing. A new context is seeded from the client's
+        `message_history`; once the server holds history for a session, the
+        client copy is ignored.
+        """
+        key = session_key(user_id, session_id)
+        if self.shared is not None:
+            return self._get_shared(key, message_history)
+        context = self._sessions.get(key)
+        if context is not None and time.monotonic() - context.last_used > self.idle_ttl:
+            context = None
+        if context is None:
+            context = SessionContext(self.history_budget, self.summary_budget)
+            context.seed(parse_message_history(message_history))
+            self._sessions[key] = context
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(key)
+        return context
+
+    async def get_async(self, user_id: str, session_id: str, message_history: str = "[]") -> SessionContext:
+        """get() for the event loop: shared-state reads and writes run in a worker thread"""
+        if self.shared is not None:
+            return await asyncio.to_thread(self._get_shared, session_key(user_id, session_id), message_history)
+        return self.get(user_id, session_id, message_history)
+
+    def _get_shared(self, key: str, message_history: str) -> SessionContext:
+        # Always read the stored copy: the previous turn may have run on another worker
+        found = self.shared.get("session", key)
+        if found is not None:
+            context = SessionContext.from_json(found[0], self.history_budget, self.summary_budget)
+        else:
+            context = SessionContext(self.history_budget, self.summary_budget)
+            context.seed(parse_message_history(message_history))
+        context.on_change = lambda raw: self.shared.put("session", key, raw, self.idle_ttl)
+        if found is None:
+            context.save()
+        return context
+
+    def ephemeral(self, message_history: str = "[]") -> SessionContext:
+        """Budgeted context for a request without a session_id (not stored)"""
+        context = SessionContext(self.history_budget, self.summary_budget)
+        context.seed(parse_message_history(message_history))
+        return context
+
+    def stats(self) -> Dict[str, int]:
+        if self.shared is not None:
+            return {"shared": True}
+        return {"sessions": len(self._sessions), "max_sessions": self.max_sessions}
@@ -0,0 +1,117 @@
+"""
+Shared state backends for multi-worker deployments
+Generated audio and session context live in per-process memory by default; a
+SQLite file lets every worker on the node serve any session's audio and
+history
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+
+
+class StateBackend(ABC):
+    """
+    Namespaced key/value blobs with a TTL, shared between worker processes.
+
+    Values are bytes plus a short metadata string (e.g. a media type).
+    Methods are blocking; callers on the event loop run them in a worker
+    thread (see AudioStore.put_async and SessionContextManager.get_async).
+    """
+
+    @abstractmethod
+    def put(self, namespace: str, key: str, value: bytes, ttl: float, meta: str = "") -> None:
+        ...
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[Tuple[bytes, str]]:
+        ...
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def reap(self) -> int:
+        """Remove expired entries; return how many were removed"""
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        ...
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    StateBackend on a local SQLite file in WAL mode.
+
+    Readers never block the writer, so several workers can share one file.
+    Expiry uses wall-clock time because it is compared across processes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL skips the fsync per commit; state is short-lived anyway
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL,"
+            " meta TEXT NOT NULL, expires_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS state_expiry ON state (expires_at)")
+        self._counters = {"puts": 0, "hits": 0, "misses": 0}
+
+    def put(self, namespace: str, key: str, value: bytes, ttl: float, meta: str = "") -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, value, meta, time.time() + ttl),
+            )
+            self._counters["puts"] += 1
+
+    def get(self, namespace: str, key: str) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, meta FROM state WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time()),
+            ).fetchone()
+            self._counters["hits" if row else "misses"] += 1
+        return (bytes(row[0]), row[1]) if row else None
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM state WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def reap(self) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM state WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT namespace, COUNT(*) FROM state GROUP BY namespace").fetchall()
+        return {"backend": "sqlite", "path": self.path, **self._counters, "entries": dict(rows)}
+
+
+def state_backend_from_env() -> Optional[StateBackend]:
+    """
+    STATE_BACKEND=memory (default) keeps state in each process;
+    STATE_BACKEND=sqlite shares it through STATE_SQLITE_PATH.
+    """
+    backend = os.getenv("STATE_BACKEND", "memory").lower()
+    if backend == "memory":
+        return None
+    if backend == "sqlite":
+        return SQLiteStateBackend(os.getenv("STATE_SQLITE_PATH", "voice_state.db"))
+    raise ValueError(f"Unknown STATE_BACKEND: {backend}")
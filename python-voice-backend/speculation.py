@@ -0,0 +1,115 @@
+"""
+Speculative LLM generation
+Starts the chat completion with the most likely safety instructions while
+Guardian is still scoring the transcript, and re-issues it with the right
+instructions if the prediction turns out to be wrong
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Tuple, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
+
+T = TypeVar("T")
+
+
+def _discard(task: asyncio.Task) -> None:
+    # Retrieve the outcome of abandoned speculative calls so asyncio doesn't
+    # log "exception was never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+
+class SpeculativeGenerator:
+    """
+    Overlap Guardian safety analysis with the LLM call.
+
+    The speculative call uses the risk level seen most often so far (clear
+    until there is history). Its result is only used when Guardian returns
+    that same level; any other result, critical included, cancels it and
+    generates again with the instructions for the actual level, so nothing
+    produced under the wrong instructions ever reaches the user.
+
+    Args:
+        enabled: When False, run analysis then generation serially
+        default_risk_level: Prediction used before any outcomes are seen
+    """
+
+    def __init__(self, enabled: bool = True, default_risk_level: str = "clear"):
+        self.enabled = enabled
+        self.default_risk_level = default_risk_level
+        self._outcomes: Dict[str, int] = {}
+        self._counters = {"speculations": 0, "hits": 0, "misses": 0, "critical_reissues": 0}
+        self._serial_seconds = 0.0
+        self._actual_seconds = 0.0
+        self._wasted_seconds = 0.0
+
+    def predicted_risk_level(self) -> str:
+        if not self._outcomes:
+            return self.default_risk_level
+        return max(self._outcomes, key=self._outcomes.get)
+
+    async def run(
+        self,
+        analyze: Callable[[], T],
+        generate: Callable[[str], Awaitable],
+    ) -> Tuple[T, object]:
+        """
+        Run `analyze()` (blocking, returns an object with `risk_level`) and
+        `generate(risk_level)`.
+
+        Returns:
+            (analysis, generation result for analysis.risk_level)
+        """
+        if not self.enabled:
+            analysis = analyze()
+            return analysis, await generate(analysis.risk_level)
+
+        predicted = self.predicted_risk_level()
+        self._counters["speculations"] += 1
+        started = time.perf_counter()
+        speculative = asyncio.create_task(generate(predicted))
+        try:
+            analysis = await run_in_threadpool(analyze)
+        except BaseException:
+            speculative.cancel()
+            speculative.add_done_callback(_discard)
+            raise
+        analyzed = time.perf_counter()
+        risk_level = analysis.risk_level
+        self._outcomes[risk_level] = self._outcomes.get(risk_level, 0) + 1
+
+        if risk_level == predicted:
+            self._counters["hits"] += 1
+            result = await speculative
+            finished = time.perf_counter()
+            # Serially, generation would only have started after analysis
+            generation_seconds = finished - started
+            self._serial_seconds += (analyzed - started) + generation_seconds
+            self._actual_seconds += finished - started
+            return analysis, result
+
+        speculative.cancel()
+        speculative.add_done_callback(_discard)
+        self._counters["misses"] += 1
+        if risk_level == "critical":
+            self._counters["critical_reissues"] += 1
+        self._wasted_seconds += analyzed - started
+        result = await generate(risk_level)
+        finished = time.perf_counter()
+        self._serial_seconds += finished - started
+        self._actual_seconds += finished - started
+        return analysis, result
+
+    def stats(self) -> Dict:
+        speculations = self._counters["speculations"]
+        return {
+            "enabled": self.enabled,
+            **self._counters,
+            "predicted_risk_level": self.predicted_risk_level(),
+            "mis_speculation_rate": self._counters["misses"] / speculations if speculations else 0.0,
+            "speedup": self._serial_seconds / self._actual_seconds if self._actual_seconds else 1.0,
+            "saved_ms": (self._serial_seconds - self._actual_seconds) * 1000,
+            "wasted_upstream_ms": self._wasted_seconds * 1000,
+        }
@@ -0,0 +1,177 @@
+"""
+Streaming response pipeline
+Turns a token stream from the LLM into sentence-sized TTS requests so audio
+for the first sentence can be played while the rest is still being generated
+"""
+
+import asyncio
+import base64
+import json
+import re
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+# A sentence ends at ., ! or ? (optionally followed by closing quotes/brackets)
+# and whitespace, or at a line break
+SENTENCE_END = re.compile(r'[.!?]+["\')\]]*\s+|\n+')
+
+
+class SentenceSplitter:
+    """Accumulates streamed text deltas and emits complete sentences"""
+
+    def __init__(self, min_chars: int = 20):
+        # Short fragments ("Hi.", "Okay.") are merged into the next sentence so
+        # TTS isn't called for a handful of characters
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, delta: str) -> List[str]:
+        """Add a text delta and return any sentences that are now complete"""
+        self._buffer += delta
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """Return whatever text is left once the token stream has ended"""
+        remainder = self._buffer.strip()
+        self._buffer = ""
+        return remainder or None
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split a complete reply the same way streamed replies are split"""
+    splitter = SentenceSplitter()
+    sentences = splitter.feed(text)
+    remainder = splitter.flush()
+    if remainder:
+        sentences.append(remainder)
+    return sentences
+
+
+async def stream_spoken_reply(
+    tokens: AsyncIterator[str],
+    synthesize: Callable[[str], Awaitable[Optional[bytes]]],
+    max_parallel_tts: int = 2,
+) -> AsyncIterator[Dict]:
+    """
+    Stream a reply as text deltas and per-sentence audio.
+
+    Each complete sentence is sent to `synthesize` as soon as it is available,
+    with up to `max_parallel_tts` syntheses in flight. Audio events are always
+    emitted in sentence order; a sentence `synthesize` returns None for gets
+    no audio event (text only).
+
+    Yields:
+        {"type": "text", "delta": str}
+        {"type": "audio", "index": int, "text": str, "audio": base64 str}
+        {"type": "done", "response": str}
+    """
+    events: asyncio.Queue = asyncio.Queue()
+    pending: asyncio.Queue = asyncio.Queue()
+    tts_slots = asyncio.Semaphore(max_parallel_tts)
+    response_parts: List[str] = []
+
+    async def speak(sentence: str) -> bytes:
+        async with tts_slots:
+            return await synthesize(sentence)
+
+    async def produce_text():
+        splitter = SentenceSplitter()
+        index = 0
+
+        def schedule(sentence: str):
+            nonlocal index
+            pending.put_nowait((index, sentence, asyncio.create_task(speak(sentence))))
+            index += 1
+
+        try:
+            async for delta in tokens:
+                if not delta:
+                    continue
+                response_parts.append(delta)
+                await events.put({"type": "text", "delta": delta})
+                for sentence in splitter.feed(delta):
+                    schedule(sentence)
+            remainder = splitter.flush()
+            if remainder:
+                schedule(remainder)
+        finally:
+            pending.put_nowait(None)
+
+    async def emit_audio():
+        while True:
+            item = await pending.get()
+            if item is None:
+                return
+            index, sentence, task = item
+            audio = await task
+            if audio is None:
+                continue
+            await events.put({
+                "type": "audio",
+                "index": index,
+                "text": sentence,
+                "audio": base64.b64encode(audio).decode("ascii"),
+            })
+
+    workers = [asyncio.create_task(produce_text()), asyncio.create_task(emit_audio())]
+    finished = asyncio.ensure_future(asyncio.gather(*workers))
+    try:
+        while True:
+            next_event = asyncio.ensure_future(events.get())
+            done, _ = await asyncio.wait({next_event, finished}, return_when=asyncio.FIRST_COMPLETED)
+            if next_event in done:
+                yield next_event.result()
+                continue
+            next_event.cancel()
+            # Surface upstream errors, then drain anything queued before completion
+            finished.result()
+            while not events.empty():
+                yield events.get_nowait()
+            break
+        yield {"type": "done", "response": "".join(response_parts)}
+    finally:
+        for worker in workers:
+            worker.cancel()
+        while not pending.empty():
+            item = pending.get_nowait()
+            if item is not None:
+                item[2].cancel()
+
+
+async def prime_stream(tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Wait for the first token, then return an iterator that replays it and
+    continues with the rest of the stream.
+
+    Lets a caller treat "the upstream has started answering" as a single
+    awaitable step, e.g. to overlap it with other work.
+    """
+    try:
+        first = await tokens.__anext__()
+    except StopAsyncIteration:
+        first = None
+
+    async def replay():
+        if first is not None:
+            yield first
+        async for token in tokens:
+            yield token
+
+    return replay()
+
+
+async def replay_text(text: str) -> AsyncIterator[str]:
+    """A finished reply as a token stream (e.g. one served from a cache)"""
+    yield text
+
+
+def ndjson(event: Dict) -> bytes:
+    """Encode an event as one line of newline-delimited JSON"""
+    return (json.dumps(event) + "\n").encode("utf-8")
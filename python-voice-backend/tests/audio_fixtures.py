@@ -0,0 +1,34 @@
+"""
+Synthetic audio for tests: speech-like WAV clips and raw PCM frames
+"""
+
+import io
+import wave
+
+import numpy as np
+
+
+def synthetic_clip(seconds_speech: float, lead: float, trail: float, rate: int = 48000) -> bytes:
+    """Stereo WAV with quiet noise around a speech-like amplitude-modulated tone burst"""
+    rng = np.random.default_rng(int(seconds_speech * 1000 + lead * 10 + trail))
+    t = np.arange(int(seconds_speech * rate)) / rate
+    speech = 0.3 * np.sin(2 * np.pi * 180 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+    mono = np.concatenate([
+        rng.normal(0, 0.002, int(lead * rate)),
+        speech + rng.normal(0, 0.01, len(t)),
+        rng.normal(0, 0.002, int(trail * rate)),
+    ])
+    stereo = np.stack([mono, mono * 0.9], axis=1)
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes((np.clip(stereo, -1, 1) * 32767).astype("<i2").tobytes())
+    return out.getvalue()
+
+
+def tone_pcm(seconds: float = 1.0, rate: int = 16000) -> bytes:
+    """A 180 Hz tone as PCM16 mono, as the voice-session client streams it"""
+    t = np.arange(int(seconds * rate)) / rate
+    return (0.3 * np.sin(2 * np.pi * 180 * t) * 32767).astype("<i2").tobytes()
@@ -0,0 +1,41 @@
+"""
+Shared fixtures: the backend app wired to an in-process mock upstream
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_upstream import MockUpstreamServer  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def upstream():
+    with MockUpstreamServer(latency_ms=5) as server:
+        yield server
+
+
+@pytest.fixture(scope="session")
+def app(upstream):
+    """main, imported once with both providers pointed at the mock upstream"""
+    os.environ.update(
+        OPENAI_BASE_URL=upstream.base_url,
+        MINIMAX_BASE_URL=upstream.base_url,
+        OPENAI_API_KEY="test",
+        MINIMAX_API_KEY="test",
+        STARTUP_WARMUP="false",
+    )
+    os.environ.pop("GEMINI_API_KEY", None)
+    import main
+    return main
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    """One lifespan for the whole run, as in a worker: shutdown closes the pooled upstream clients"""
+    from fastapi.testclient import TestClient
+    with TestClient(app.app) as test_client:
+        yield test_client
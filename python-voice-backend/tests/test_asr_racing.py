@@ -0,0 +1,68 @@
+import asyncio
+import gc
+import tempfile
+
+from asr_racing import HedgedASR
+from audio_input import AudioClip, as_file
+
+AUDIO = bytes(range(256)) * 1024
+
+
+def spooled_upload():
+    f = tempfile.SpooledTemporaryFile(max_size=len(AUDIO) * 2)
+    f.write(AUDIO)
+    f.seek(0)
+    return f
+
+
+async def read_slowly(clip):
+    # Reads in small chunks, yielding between them, as an upload to a provider would
+    reader, chunks = as_file(clip.data), []
+    while chunk := reader.read(4096):
+        chunks.append(chunk)
+        await asyncio.sleep(0)
+    return b"".join(chunks)
+
+
+def test_racers_read_the_upload_independently_without_copying_it():
+    upload = spooled_upload()
+    read = {}
+
+    def racer(name):
+        async def transcribe(clip):
+            assert clip.data is not upload and not isinstance(clip.data, bytes)
+            read[name] = await read_slowly(clip)
+            if name == "primary":
+                await asyncio.sleep(1.0)  # the secondary wins
+            return name
+        return transcribe
+
+    asr = HedgedASR([("primary", racer("primary")), ("secondary", racer("secondary"))], default_delay=0.0)
+
+    assert asyncio.run(asr.transcribe(AudioClip(data=upload))) == ("secondary", "secondary")
+    assert read == {"primary": AUDIO, "secondary": AUDIO}
+
+
+def test_losing_racer_exception_is_retrieved():
+    unretrieved = []
+
+    async def winner(clip):
+        await asyncio.sleep(0.01)
+        return "transcript"
+
+    async def loser(clip):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unretrieved.append(context))
+        results = []
+        for _ in range(10):  # both finish in the same wakeup, in either order
+            asr = HedgedASR([("primary", winner), ("secondary", loser)], default_delay=0.0)
+            results.append(await asr.transcribe(AudioClip(data=AUDIO)))
+        await asyncio.sleep(0.02)
+        gc.collect()
+        return results
+
+    assert set(asyncio.run(scenario())) == {("transcript", "primary")}
+    assert unretrieved == []
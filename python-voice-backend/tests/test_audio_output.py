@@ -0,0 +1,45 @@
+import base64
+import json
+
+import pytest
+
+import audio_output
+from audio_fixtures import synthetic_clip
+from audio_output import FORMATS, openai_response_format, plan
+
+
+@pytest.mark.parametrize("ffmpeg", [None, "/usr/bin/ffmpeg"])
+def test_openai_renders_opus_itself(monkeypatch, ffmpeg):
+    monkeypatch.setattr(audio_output, "FFMPEG", ffmpeg)
+
+    source, delivered = plan("openai", FORMATS["opus"])
+
+    assert source == delivered == FORMATS["opus"]
+    assert openai_response_format(source) == "opus"
+
+
+@pytest.mark.parametrize("name,response_format", [("mp3", "mp3"), ("pcm", "pcm"), ("opus", "opus")])
+def test_openai_response_format(name, response_format):
+    assert openai_response_format(FORMATS[name]) == response_format
+
+
+def test_minimax_opus_is_transcoded_or_substituted(monkeypatch):
+    monkeypatch.setattr(audio_output, "FFMPEG", "/usr/bin/ffmpeg")
+    assert plan("minimax", FORMATS["opus"]) == (FORMATS["pcm"], FORMATS["opus"])
+
+    monkeypatch.setattr(audio_output, "FFMPEG", None)
+    assert plan("minimax", FORMATS["opus"]) == (FORMATS["mp3_low"], FORMATS["mp3_low"])
+
+
+def test_openai_stream_delivers_native_opus(client):
+    wav = synthetic_clip(1.0, 0.2, 0.2, rate=16000)
+
+    response = client.post(
+        "/api/voice-therapy-stream?provider=openai&audio_format=opus",
+        files={"audio": ("turn.wav", wav, "audio/wav")},
+    )
+
+    audio = [event for event in map(json.loads, response.text.splitlines()) if event["type"] == "audio"]
+    assert audio
+    assert {event["format"] for event in audio} == {"opus"}
+    assert all(base64.b64decode(event["audio"]).startswith(b"OggS") for event in audio)
@@ -0,0 +1,30 @@
+import os
+import time
+
+from audio_store import AudioStore
+
+
+def test_stale_spill_files_are_removed_at_startup(tmp_path):
+    stale = tmp_path / ("a" * 32)  # spilled before a crash, past its TTL
+    live = tmp_path / ("b" * 32)  # another worker's entry, still servable
+    unrelated = tmp_path / "notes.txt"
+    for path in (stale, live, unrelated):
+        path.write_bytes(b"ID3audio")
+    old = time.time() - 3600
+    os.utime(stale, (old, old))
+    os.utime(unrelated, (old, old))
+
+    store = AudioStore(ttl_seconds=900, spill_dir=str(tmp_path))
+
+    assert not stale.exists()
+    assert live.exists() and unrelated.exists()
+    assert store.stats()["stale_spills_removed"] == 1
+
+
+def test_spilled_audio_is_served_from_disk(tmp_path):
+    store = AudioStore(max_bytes=8, spill_dir=str(tmp_path))
+    first = store.put(b"ID3first")
+    store.put(b"ID3second")  # evicts the first entry to disk
+
+    assert store.get(first).data == b"ID3first"
+    assert store.stats()["spill_hits"] == 1
@@ -0,0 +1,129 @@
+import asyncio
+import json
+
+import pytest
+
+from audio_fixtures import synthetic_clip
+from deadline import Deadline, DeadlineExceeded, time_left
+from upstream_limits import AdaptiveLimiter, ProviderBusy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_asr_budget_grows_with_the_clip_up_to_the_turn():
+    deadline = Deadline(total=12.0)
+
+    assert deadline.stage_budget("asr") == 2.5
+    assert deadline.stage_budget("asr", audio_seconds=5) == pytest.approx(3.0)
+    assert deadline.stage_budget("asr", audio_seconds=60) == pytest.approx(8.5)
+    assert deadline.stage_budget("asr", audio_seconds=300) == 12.0
+    assert deadline.stage_budget("llm", audio_seconds=300) == 5.5
+
+
+def test_per_audio_second_allowance_is_configurable(monkeypatch):
+    monkeypatch.setenv("STAGE_BUDGET_ASR_PER_AUDIO_SECOND", "0.02")
+
+    assert Deadline.from_env().stage_budget("asr", audio_seconds=100) == pytest.approx(4.5)
+
+
+def test_budgets_are_scaled_to_fit_the_turn():
+    deadline = Deadline(total=7.0, budgets={"asr": 3.0, "llm": 7.0, "tts": 4.0})
+
+    assert sum(deadline.budgets.values()) == pytest.approx(7.0)
+    assert deadline.budgets["llm"] == pytest.approx(3.5)
+    assert not deadline.short_for("llm", "tts")
+
+
+def test_normal_turn_gets_a_full_reply(app):
+    clock = FakeClock()
+    deadline = Deadline.from_env(clock=clock)
+
+    async def asr():
+        clock.now += 2.0
+        return "transcript"
+
+    clock.now += 0.5  # upload and preprocessing
+    asyncio.run(deadline.run("asr", asr))
+
+    assert app.reply_max_tokens(deadline) == app.REPLY_MAX_TOKENS
+    assert deadline.degraded == []
+
+
+def test_turn_that_spent_most_of_its_time_gets_a_short_reply(app):
+    clock = FakeClock()
+    deadline = Deadline.from_env(clock=clock)
+    clock.now += 5.0
+
+    assert app.reply_max_tokens(deadline) == app.DEGRADED_MAX_TOKENS
+    assert deadline.degraded == ["llm:short_reply"]
+
+
+def test_upstream_queue_wait_is_bounded_by_the_stage_budget():
+    limiter = AdaptiveLimiter("test", initial_limit=1, max_wait=10.0)
+    deadline = Deadline(total=12.0, budgets={"asr": 0.2})
+    seen = []
+
+    async def queued_call():
+        seen.append(time_left())
+        await limiter.acquire()
+
+    async def scenario():
+        await limiter.acquire()  # the only slot is taken
+        await deadline.run("asr", queued_call)
+
+    with pytest.raises(ProviderBusy):
+        asyncio.run(scenario())
+    assert 0 < seen[0] <= 0.2
+    assert time_left() == float("inf")
+
+
+def test_long_clip_transcription_is_not_cut_off():
+    async def slow_asr():
+        await asyncio.sleep(0.2)
+        return "transcript"
+
+    def run(audio_seconds):
+        deadline = Deadline(total=1.0, budgets={"asr": 0.05}, per_audio_second={"asr": 0.002})
+        return asyncio.run(deadline.run("asr", slow_asr, audio_seconds=audio_seconds))
+
+    assert run(200) == "transcript"
+    with pytest.raises(DeadlineExceeded):
+        run(5)
+
+
+def test_upload_duration_sets_the_asr_budget(app, client, monkeypatch):
+    budgets = {}
+    monkeypatch.setattr(app, "new_deadline", lambda: Deadline.from_env(
+        observer=lambda stage, spent, budget, outcome: budgets.setdefault(stage, budget)
+    ))
+    wav = synthetic_clip(60.0, 0.0, 0.0, rate=16000)
+
+    response = client.post("/api/voice-therapy", files={"audio": ("long.wav", wav, "audio/wav")})
+
+    assert response.status_code == 200
+    assert 8.0 < budgets["asr"] <= 8.5
+
+
+def test_streamed_sentence_audio_runs_within_the_tts_budget(app, client, monkeypatch):
+    deadline = Deadline(total=12.0, budgets={"asr": 2.5, "llm": 5.5, "tts": 0.05})
+    monkeypatch.setattr(app, "new_deadline", lambda: deadline)
+
+    async def slow_tts(text, fmt=None):
+        await asyncio.sleep(0.5)
+        return b"audio"
+
+    monkeypatch.setattr(app, "openai_tts", slow_tts)
+    wav = synthetic_clip(1.0, 0.2, 0.2, rate=16000)
+
+    response = client.post("/api/voice-therapy-stream?provider=openai", files={"audio": ("turn.wav", wav, "audio/wav")})
+
+    events = [json.loads(line) for line in response.text.splitlines() if line]
+    assert events[-1]["type"] == "done" and events[-1]["response"]
+    assert "audio" not in [event["type"] for event in events]
+    assert "tts:text_only" in deadline.degraded
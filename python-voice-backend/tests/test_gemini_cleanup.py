@@ -0,0 +1,91 @@
+import asyncio
+import importlib.util
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from audio_input import AudioClip
+from gemini_service import GeminiTranscriptionService
+
+
+class FakeGenai:
+    def __init__(self, upload_gate=None):
+        self.upload_gate = upload_gate
+        self.uploaded = []
+        self.deleted = []
+
+    def upload_file(self, f, mime_type):
+        if self.upload_gate:
+            self.upload_gate.wait(5)
+        audio_file = SimpleNamespace(name=f"files/{len(self.uploaded)}")
+        self.uploaded.append(audio_file.name)
+        return audio_file
+
+    def delete_file(self, name):
+        self.deleted.append(name)
+
+
+class FakeModel:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+
+    def generate_content(self, parts):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return SimpleNamespace(text=" hello ")
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test")
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: object())
+    return GeminiTranscriptionService()
+
+
+def use(service, genai, model):
+    service._genai, service._model = genai, model
+
+
+CLIP = AudioClip(data=b"RIFF....WAVE", filename="clip.wav", content_type="audio/wav")
+
+
+def test_upload_is_deleted_after_transcription(service):
+    genai = FakeGenai()
+    use(service, genai, FakeModel())
+    assert asyncio.run(service.speech_to_text(CLIP)) == "hello"
+    assert genai.deleted == genai.uploaded == ["files/0"]
+
+
+def test_upload_is_deleted_when_generation_fails(service):
+    genai = FakeGenai()
+    use(service, genai, FakeModel(RuntimeError("quota")))
+    with pytest.raises(RuntimeError):
+        asyncio.run(service.speech_to_text(CLIP))
+    assert genai.deleted == ["files/0"]
+
+
+def test_cancelled_hedge_skips_generation_and_deletes_upload(service):
+    gate = threading.Event()
+    genai = FakeGenai(upload_gate=gate)
+    model = FakeModel()
+    use(service, genai, model)
+
+    async def lose_the_race():
+        task = asyncio.create_task(service.speech_to_text(CLIP))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        gate.set()
+
+    asyncio.run(lose_the_race())
+    # The worker thread finishes on its own after the task was cancelled
+    deadline = time.monotonic() + 5
+    while not genai.deleted and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert genai.deleted == genai.uploaded == ["files/0"]
+    assert model.calls == 0
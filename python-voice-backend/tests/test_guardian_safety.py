@@ -0,0 +1,43 @@
+import pytest
+
+from guardian_safety import GuardianSafety
+
+# (message, WBC score, risk level, crisis) as the TypeScript analyzeSafety scores them
+CASES = [
+    ("I want to hang myself", 50, "critical", True),
+    ("honestly I might just kms", 50, "critical", True),
+    ("sometimes I think about how to unalive myself", 50, "critical", True),
+    ("I want to die, I feel hopeless and so alone", 50, "critical", True),
+    ("I keep thinking about self harm", 30, "clouded", False),
+    ("I keep thinking about self-harm", 30, "clouded", False),
+    ("I want to hurt myself", 30, "clouded", False),
+    ("I feel hopeless and worthless", 30, "clouded", False),
+    ("I feel hopeless, worthless and anxious", 30, "clouded", False),
+    ("I’m so sad and alone and stressed", 30, "clouded", False),
+    ("I'm anxious and scared", 20, "clear", False),
+    ("I've been feeling low", 10, "clear", False),
+    ("Work was fine today", 0, "clear", False),
+]
+
+
+@pytest.fixture(scope="module")
+def guardian():
+    return GuardianSafety()
+
+
+@pytest.mark.parametrize("message,score,level,crisis", CASES)
+def test_scores_match_typescript_guardian(guardian, message, score, level, crisis):
+    analysis = guardian.analyze_safety(message)
+
+    assert analysis.wbc_score == score
+    assert analysis.risk_level == level
+    assert analysis.crisis_detected is crisis
+
+
+def test_batch_scores_match_single_message_scores(guardian):
+    messages = [message for message, *_ in CASES]
+
+    batch = guardian.analyze_many(messages)
+
+    assert [a.wbc_score for a in batch] == [guardian.analyze_safety(m).wbc_score for m in messages]
+    assert [a.risk_level for a in batch] == [level for _, _, level, _ in CASES]
@@ -0,0 +1,51 @@
+import json
+
+from audio_fixtures import synthetic_clip, tone_pcm
+
+WAV = synthetic_clip(1.0, 0.2, 0.2, rate=16000)
+PCM = tone_pcm(1.0)
+
+
+def openai_requests(app):
+    return app.prompt_bundles.stats()["usage"].get("openai", {}).get("requests", 0)
+
+
+def check_turn(events):
+    types = [event["type"] for event in events]
+    assert types[0] == "transcript" and types[-1] == "done"
+    assert "error" not in types
+    assert "audio" in types
+    reply = "".join(event["delta"] for event in events if event["type"] == "text")
+    assert reply.strip() and reply == events[-1]["response"]
+
+
+def test_openai_stream_endpoint_against_mock_upstream(app, client):
+    before = openai_requests(app)
+
+    response = client.post(
+        "/api/voice-therapy-stream?provider=openai",
+        files={"audio": ("turn.wav", WAV, "audio/wav")},
+    )
+
+    assert response.status_code == 200
+    check_turn([json.loads(line) for line in response.text.splitlines() if line])
+    # The final usage chunk (stream_options include_usage) was counted
+    assert openai_requests(app) == before + 1
+
+
+def test_openai_voice_session_against_mock_upstream(app, client):
+    before = openai_requests(app)
+
+    with client.websocket_connect("/ws/voice-session") as ws:
+        ws.send_text(json.dumps({"type": "start", "provider": "openai", "sample_rate": 16000}))
+        assert json.loads(ws.receive_text())["type"] == "ready"
+        ws.send_bytes(PCM)
+        ws.send_text(json.dumps({"type": "end_of_speech"}))
+        events = []
+        while not events or events[-1]["type"] not in ("done", "error"):
+            event = json.loads(ws.receive_text())
+            if event["type"] not in ("speech_start", "interrupted"):
+                events.append(event)
+
+    check_turn(events)
+    assert openai_requests(app) == before + 1
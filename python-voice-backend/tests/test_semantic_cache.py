@@ -0,0 +1,104 @@
+import importlib.util
+
+import numpy as np
+import pytest
+
+import semantic_cache
+from semantic_cache import HashingEmbedder, SemanticResponseCache, opposite_polarity
+
+NEGATED_PAIRS = [
+    ("I'm happy with my partner", "I'm unhappy with my partner"),
+    ("I'm stressed about work", "I'm not stressed about work"),
+    ("I can sleep at night", "I can't sleep at night"),
+    ("I feel connected to my friends", "I feel disconnected from my friends"),
+]
+
+
+class SameVectorEmbedder:
+    """A semantic embedder at its worst: every turn embeds identically"""
+
+    name = "same-vector"
+    semantic = True
+    default_threshold = 0.88
+
+    def __init__(self):
+        self.ready = False
+
+    def load(self):
+        self.ready = True
+
+    def embed(self, text):
+        assert self.ready, "embedded before the model was loaded"
+        return np.ones(4, dtype=np.float32) / 2
+
+
+def primed(transcript):
+    cache = SemanticResponseCache(enabled=True, embedder=SameVectorEmbedder(), variants=1, seed=1)
+    cache.warm_up()
+    cache.add(cache.lookup("openai", transcript, "clear"), f"reply to {transcript}")
+    return cache
+
+
+@pytest.mark.parametrize("cached,turn", NEGATED_PAIRS + [(b, a) for a, b in NEGATED_PAIRS])
+def test_negated_turn_is_never_served_the_cached_reply(cached, turn):
+    cache = primed(cached)
+
+    query = cache.lookup("openai", turn, "clear")
+
+    assert query.result == "miss"
+    assert cache.stats()["negated"] == 1
+
+
+def test_negated_turn_gets_its_own_entry():
+    cache = primed("I'm stressed about work")
+    cache.add(cache.lookup("openai", "I'm not stressed about work", "clear"), "glad to hear it")
+
+    assert cache.lookup("openai", "Honestly, I'm not stressed about work", "clear").reply == "glad to hear it"
+    assert cache.lookup("openai", "I'm stressed about work lately", "clear").reply == "reply to I'm stressed about work"
+
+
+@pytest.mark.parametrize("a,b", [
+    ("I'm stressed about work", "Um, I am stressed about my work"),
+    ("I don't sleep well", "I can't sleep well"),
+    ("I feel unhappy", "I feel so unhappy lately"),
+])
+def test_rewordings_keep_their_polarity(a, b):
+    assert not opposite_polarity(a, b)
+
+
+@pytest.mark.parametrize("cached,turn", NEGATED_PAIRS)
+def test_hashing_embedder_cannot_enable_the_cache(cached, turn):
+    embedder = HashingEmbedder()
+    assert float(embedder.embed(cached) @ embedder.embed(turn)) > 0.5  # why it isn't trusted
+
+    cache = SemanticResponseCache(enabled=True, embedder=embedder, variants=1)
+    cache.add(cache.lookup("openai", cached, "clear"), "reply")
+
+    assert not cache.enabled
+    assert cache.lookup("openai", turn, "clear").result == "bypass"
+
+
+def test_lookups_bypass_the_cache_until_the_model_is_loaded():
+    cache = SemanticResponseCache(enabled=True, embedder=SameVectorEmbedder(), variants=1)
+
+    assert cache.lookup("openai", "I'm stressed about work", "clear").result == "bypass"
+    assert not cache.stats()["embedder_ready"]
+
+    cache.warm_up()
+
+    assert cache.lookup("openai", "I'm stressed about work", "clear").result == "miss"
+
+
+def test_from_env_stays_disabled_without_sentence_transformers(monkeypatch, capsys):
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(
+        semantic_cache.importlib.util, "find_spec",
+        lambda name, *args: None if name == "sentence_transformers" else find_spec(name, *args),
+    )
+    monkeypatch.setenv("SEMANTIC_CACHE", "true")
+
+    cache = SemanticResponseCache.from_env()
+
+    assert not cache.enabled
+    assert cache.stats()["embedder"] == "hashing"
+    assert "requirements-semantic-cache.txt" in capsys.readouterr().out
@@ -0,0 +1,42 @@
+import asyncio
+
+from session_context import SessionContextManager
+from shared_state import SQLiteStateBackend
+
+
+def history_of(manager, user_id, session_id):
+    return manager.get(user_id, session_id).history_messages()
+
+
+def check_users_are_isolated(manager):
+    alice = manager.get("alice", "shared-session")
+    alice.add_turn("I had a panic attack at work", "That sounds frightening.")
+
+    assert history_of(manager, "mallory", "shared-session") == []
+    assert [m["content"] for m in history_of(manager, "alice", "shared-session")] == [
+        "I had a panic attack at work", "That sounds frightening."
+    ]
+
+
+def test_same_session_id_is_isolated_per_user_in_memory():
+    check_users_are_isolated(SessionContextManager())
+
+
+def test_same_session_id_is_isolated_per_user_in_shared_state(tmp_path):
+    backend = SQLiteStateBackend(str(tmp_path / "state.db"))
+    check_users_are_isolated(SessionContextManager(shared=backend))
+
+
+def test_ids_cannot_be_combined_into_another_key():
+    manager = SessionContextManager()
+    manager.get("a:b", "c").add_turn("private", "reply")
+    assert history_of(manager, "a", "b:c") == []
+
+
+def test_requests_without_user_id_are_not_stored(app):
+    async def scenario():
+        context = await app.conversation_context("", "shared-session")
+        await context.add_turn_async("hello", "hi")
+        return await app.conversation_context("", "shared-session")
+
+    assert asyncio.run(scenario()).history_messages() == []
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+
+import pytest
+
+from audio_store import AudioStore
+from session_context import SessionContextManager
+from shared_state import SQLiteStateBackend, StateBackend
+
+
+class RecordingBackend(SQLiteStateBackend):
+    """SQLite backend that records the thread each blocking call runs on"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.threads = []
+
+    def put(self, *args, **kwargs):
+        self.threads.append(threading.get_ident())
+        return super().put(*args, **kwargs)
+
+    def get(self, *args, **kwargs):
+        self.threads.append(threading.get_ident())
+        return super().get(*args, **kwargs)
+
+
+def test_state_backend_is_abstract():
+    class Incomplete(StateBackend):
+        def put(self, namespace, key, value, ttl, meta=""):
+            pass
+
+    with pytest.raises(TypeError):
+        StateBackend()
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_audio_store_keeps_sqlite_off_the_event_loop(tmp_path):
+    backend = RecordingBackend(str(tmp_path / "state.db"))
+    writer = AudioStore(shared=backend)
+    reader = AudioStore(shared=backend)  # another worker: only the shared copy
+
+    async def scenario():
+        audio_id = await writer.put_async(b"ID3audio", media_type="audio/mpeg")
+        return await reader.get_async(audio_id)
+
+    loop_thread = threading.get_ident()
+    artifact = asyncio.run(scenario())
+
+    assert (artifact.data, artifact.media_type) == (b"ID3audio", "audio/mpeg")
+    assert len(backend.threads) == 2
+    assert loop_thread not in backend.threads
+
+
+def test_session_context_keeps_sqlite_off_the_event_loop(tmp_path):
+    backend = RecordingBackend(str(tmp_path / "state.db"))
+    manager = SessionContextManager(shared=backend)
+
+    async def scenario():
+        context = await manager.get_async("alice", "s1")
+        await context.add_turn_async("I slept badly again", "What kept you awake?")
+        return await manager.get_async("alice", "s1")
+
+    loop_thread = threading.get_ident()
+    reloaded = asyncio.run(scenario())
+
+    assert [m["content"] for m in reloaded.history_messages()] == ["I slept badly again", "What kept you awake?"]
+    assert backend.threads and loop_thread not in backend.threads
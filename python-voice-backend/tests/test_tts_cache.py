@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from tts_cache import TTSCache
+
+VOICE = {"provider": "openai", "model": "tts-1", "voice_id": "nova"}
+
+
+class SlowSynthesis:
+    """Records upstream calls; each takes `seconds` unless cancelled"""
+
+    def __init__(self, seconds=0.05):
+        self.seconds = seconds
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self, text):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.seconds)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return f"<{text}>".encode()
+
+
+def test_cancelled_owner_does_not_fail_other_waiters():
+    cache = TTSCache()
+    synthesize = SlowSynthesis()
+
+    async def scenario():
+        owner = asyncio.create_task(cache.synthesize("How are you feeling?", synthesize, **VOICE))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.synthesize("How are you feeling?", synthesize, **VOICE))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        return await waiter
+
+    assert asyncio.run(scenario()) == b"<How are you feeling?>"
+    assert synthesize.calls == 1 and synthesize.cancelled == 0
+    assert cache.stats()["entries"] == 1
+
+
+def test_synthesis_is_cancelled_when_every_request_is():
+    cache = TTSCache()
+    synthesize = SlowSynthesis(seconds=1.0)
+
+    async def scenario():
+        requests = [
+            asyncio.create_task(cache.synthesize("Let's breathe together.", synthesize, **VOICE)) for _ in range(2)
+        ]
+        await asyncio.sleep(0.01)
+        for request in requests:
+            request.cancel()
+        await asyncio.gather(*requests, return_exceptions=True)
+        await asyncio.sleep(0)
+        # A later request starts a fresh synthesis instead of joining the cancelled one
+        synthesize.seconds = 0.0
+        return await cache.synthesize("Let's breathe together.", synthesize, **VOICE)
+
+    assert asyncio.run(scenario()) == b"<Let's breathe together.>"
+    assert synthesize.calls == 2 and synthesize.cancelled == 1
+
+
+def test_upstream_failure_reaches_every_waiter():
+    cache = TTSCache()
+
+    async def failing(text):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        return await asyncio.gather(
+            *(cache.synthesize("Thank you for sharing that.", failing, **VOICE) for _ in range(2)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(scenario())
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+    assert cache.stats()["entries"] == 0
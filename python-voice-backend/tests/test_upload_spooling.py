@@ -0,0 +1,48 @@
+import io
+
+from fastapi import FastAPI, UploadFile
+from fastapi.testclient import TestClient
+from starlette.formparsers import MultiPartParser
+
+from audio_fixtures import synthetic_clip
+from audio_input import CHUNK_SIZE, AudioClip
+from audio_preprocess import preprocess
+
+
+def test_spool_threshold_is_the_upload_limit(app):
+    assert getattr(MultiPartParser, app.SPOOL_THRESHOLD_ATTR) == app.MAX_FILE_SIZE
+
+
+def test_multi_megabyte_upload_stays_in_memory(app):
+    probe = FastAPI()
+
+    @probe.post("/upload")
+    async def upload(audio: UploadFile):
+        return {"rolled_to_disk": audio.file._rolled}
+
+    with TestClient(probe) as client:
+        payload = b"\0" * (5 * 1024 * 1024)
+        response = client.post("/upload", files={"audio": ("clip.wav", payload, "audio/wav")})
+    assert response.json() == {"rolled_to_disk": False}
+
+
+class RecordingReader(io.BytesIO):
+    """BytesIO that remembers the largest read it served"""
+
+    largest_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.largest_read = max(self.largest_read, len(chunk))
+        return chunk
+
+
+def test_preprocess_reads_the_clip_in_chunks():
+    wav = synthetic_clip(4.0, 1.0, 1.0)
+    reader = RecordingReader(wav)
+    result = preprocess(AudioClip(data=reader, filename="clip.wav", content_type="audio/wav"))
+    assert result is not None
+    assert result.input_bytes == len(wav)
+    assert result.output_seconds < result.input_seconds
+    assert reader.largest_read <= CHUNK_SIZE
+    assert reader.tell() == 0
@@ -0,0 +1,29 @@
+import email.utils
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from upstream_limits import retry_after_seconds
+
+
+def error_with(headers):
+    return SimpleNamespace(response=SimpleNamespace(headers=headers))
+
+
+@pytest.mark.parametrize("headers,expected", [
+    ({"retry-after-ms": "1500"}, 1.5),
+    ({"retry-after": "3"}, 3.0),
+    ({"retry-after": "-1"}, 0.0),
+    ({"retry-after": "soon"}, None),
+    ({"retry-after": "Wed, 32 Foo 2024 99:00:00 GMT"}, None),
+    ({}, None),
+])
+def test_retry_after_seconds(headers, expected):
+    assert retry_after_seconds(error_with(headers)) == expected
+
+
+def test_retry_after_http_date():
+    value = email.utils.formatdate(time.time() + 30, usegmt=True)
+
+    assert 28 < retry_after_seconds(error_with({"retry-after": value})) <= 30
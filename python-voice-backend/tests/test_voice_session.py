@@ -0,0 +1,98 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from audio_fixtures import tone_pcm
+from voice_session import SAMPLE_RATES, VoiceSession, parse_sample_rate
+
+
+@pytest.mark.parametrize("value", [16000, "16000", 48000, 8000])
+def test_parse_sample_rate_accepts_supported_rates(value):
+    assert parse_sample_rate(value) == int(value)
+
+
+@pytest.mark.parametrize("value", [0, -16000, "abc", 16000.5, 10 ** 9, None, True, [16000]])
+def test_parse_sample_rate_rejects(value):
+    with pytest.raises(ValueError):
+        parse_sample_rate(value)
+
+
+def test_voice_session_validates_sample_rate():
+    with pytest.raises(ValueError):
+        VoiceSession(sample_rate=0)
+    session = VoiceSession(sample_rate=SAMPLE_RATES[0])
+    assert session.buffer.capacity > 0
+
+
+def start_message(**overrides):
+    return json.dumps({"type": "start", "provider": "openai", "sample_rate": 16000, **overrides})
+
+
+def close_code(client, *frames):
+    with client.websocket_connect("/ws/voice-session") as ws:
+        for frame in frames:
+            ws.send_text(frame)
+        with pytest.raises(WebSocketDisconnect) as closed:
+            while True:
+                ws.receive_text()
+    return closed.value.code
+
+
+@pytest.mark.parametrize("rate", [0, "abc", -1, 10 ** 9])
+def test_bad_sample_rate_closes_with_policy_violation(client, rate):
+    assert close_code(client, start_message(sample_rate=rate)) == 1008
+
+
+@pytest.mark.parametrize("frame", ["not json", "[1, 2]", '"start"'])
+def test_malformed_start_message_closes_with_unsupported_data(client, frame):
+    assert close_code(client, frame) == 1003
+
+
+def test_malformed_control_message_closes_with_unsupported_data(client):
+    with client.websocket_connect("/ws/voice-session") as ws:
+        ws.send_text(start_message())
+        assert json.loads(ws.receive_text())["type"] == "ready"
+        ws.send_text("{broken")
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_text()
+    assert closed.value.code == 1003
+
+
+def test_new_utterance_replaces_the_reply_in_progress(app, client, monkeypatch):
+    transcribe = app.transcribe_openai
+    calls, cancelled = [], []
+    transcribing = threading.Event()
+
+    async def slow_first_transcription(clip):
+        calls.append(clip)
+        if len(calls) == 1:
+            transcribing.set()
+            try:
+                await asyncio.sleep(0.5)
+            except asyncio.CancelledError:
+                cancelled.append(clip)
+                raise
+        return await transcribe(clip)
+
+    monkeypatch.setattr(app, "transcribe_openai", slow_first_transcription)
+    tone = tone_pcm(1.0)
+    silence = bytes(3200)  # buffered as pre-roll without a new speech_start
+
+    with client.websocket_connect("/ws/voice-session") as ws:
+        ws.send_text(start_message())
+        assert json.loads(ws.receive_text())["type"] == "ready"
+        ws.send_bytes(tone)
+        ws.send_text(json.dumps({"type": "end_of_speech"}))
+        assert transcribing.wait(5)
+        ws.send_bytes(silence)
+        ws.send_text(json.dumps({"type": "end_of_speech"}))
+        types = []
+        while not types or types[-1] not in ("done", "error"):
+            types.append(json.loads(ws.receive_text())["type"])
+
+    assert len(calls) == 2 and cancelled == calls[:1]
+    assert types.count("interrupted") == 1 and types.count("transcript") == 1
+    assert types.index("interrupted") < types.index("transcript")
@@ -0,0 +1,269 @@
+"""
+Content-addressed TTS cache
+Reuses synthesized audio for repeated therapist phrases (greetings, crisis
+resources, grounding prompts) instead of paying for the same synthesis twice
+
+Warm-up CLI (pre-renders phrases into TTS_CACHE_DIR for the server to load):
+    python tts_cache.py --provider minimax --phrases phrases.txt
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from streaming import split_sentences
+
+# Phrases the safety instructions and CBT prompts make the model say often
+DEFAULT_WARMUP_PHRASES = [
+    "I'm really concerned about what you're sharing.",
+    "Please call 988 right now - they're available 24/7 to help you through this.",
+    "Your life has value, and there are people who want to help you.",
+    "You can also text HOME to 741741 to reach the Crisis Text Line.",
+    "If you are in immediate danger, please call 911.",
+    "Thank you for sharing that with me.",
+    "Let's take a slow, deep breath together.",
+    "Can you name five things you can see around you right now?",
+    "How are you feeling right now?",
+]
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys: NFC, collapsed whitespace"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(
+    provider: str,
+    model: str,
+    voice_id: str,
+    text: str,
+    speed: float = 1.0,
+    pitch: int = 0,
+    vol: float = 1.0,
+    audio_format: str = "mp3",
+) -> str:
+    """SHA-256 over every parameter that changes the synthesized audio"""
+    fields = [provider, model, voice_id, float(speed), int(pitch), float(vol), normalize_text(text)]
+    if audio_format != "mp3":
+        # MP3 keys predate format negotiation; unchanged so warmed cache dirs stay valid
+        fields.append(audio_format)
+    material = json.dumps(fields, ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _Inflight:
+    """A synthesis shared by every request for the same sentence"""
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class TTSCache:
+    """
+    Size-bounded LRU of synthesized audio keyed by content hash.
+
+    Text is cached per sentence, so a reply that repeats a known sentence only
+    synthesizes the new parts. Concurrent requests for the same sentence share
+    a single upstream call, which runs in its own task: a cancelled request
+    (barge-in, deadline, discarded speculation) doesn't fail the others, and
+    the call is only cancelled once no request is waiting for it. When `cache_dir` is set, warmed phrases are also
+    persisted there and picked up by later processes.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, cache_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, _Inflight] = {}
+        self._counters = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "chars_saved": 0}
+
+    @classmethod
+    def from_env(cls) -> "TTSCache":
+        """Build a cache from TTS_CACHE_* environment variables"""
+        return cls(
+            max_bytes=int(float(os.getenv("TTS_CACHE_MAX_MB", "32")) * 1024 * 1024),
+            cache_dir=os.getenv("TTS_CACHE_DIR") or None,
+        )
+
+    async def synthesize(
+        self,
+        text: str,
+        synthesize: Callable[[str], Awaitable[bytes]],
+        provider: str,
+        model: str,
+        voice_id: str,
+        speed: float = 1.0,
+        pitch: int = 0,
+        vol: float = 1.0,
+        audio_format: str = "mp3",
+        persist: bool = False,
+    ) -> bytes:
+        """
+        Return audio for `text`, synthesizing only the sentences not cached.
+
+        Args:
+            text: Text to speak
+            synthesize: Coroutine function that renders one piece of text
+            provider, model, voice_id, speed, pitch, vol, audio_format: Voice
+                and encoding parameters that make up the cache key
+            persist: Also write new audio to `cache_dir` (used by warm-up)
+
+        Returns:
+            Audio bytes (per-sentence MP3, Ogg Opus or PCM segments concatenated in order)
+        """
+        sentences = split_sentences(text) or [text]
+        parts = await asyncio.gather(*(
+            self._sentence(
+                sentence,
+                cache_key(provider, model, voice_id, sentence, speed, pitch, vol, audio_format),
+                synthesize,
+                persist,
+            )
+            for sentence in sentences
+        ))
+        return b"".join(parts)
+
+    async def warm_up(self, phrases: List[str], synthesize: Callable[[str], Awaitable[bytes]], **voice) -> int:
+        """Pre-render `phrases`; returns how many were synthesized or loaded"""
+        warmed = 0
+        for phrase in phrases:
+            try:
+                await self.synthesize(phrase, synthesize, persist=True, **voice)
+                warmed += 1
+            except Exception as e:
+                print(f"Warning: TTS warm-up failed for {phrase[:40]!r}: {e}")
+        return warmed
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._counters, "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+    async def _sentence(self, sentence: str, key: str, synthesize, persist: bool) -> bytes:
+        audio = self._entries.get(key)
+        if audio is not None:
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            self._counters["chars_saved"] += len(sentence)
+            return audio
+
+        audio = self._load(key)
+        if audio is not None:
+            self._counters["disk_hits"] += 1
+            self._counters["chars_saved"] += len(sentence)
+            self._store(key, audio)
+            return audio
+
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            self._counters["misses"] += 1
+            inflight = _Inflight(asyncio.ensure_future(self._render(sentence, key, synthesize, persist)))
+            inflight.task.add_done_callback(lambda _: self._forget(key, inflight))
+            self._inflight[key] = inflight
+        else:
+            self._counters["hits"] += 1
+
+        inflight.waiters += 1
+        try:
+            return await asyncio.shield(inflight.task)
+        finally:
+            inflight.waiters -= 1
+            if not inflight.waiters and not inflight.task.done():
+                # Every request for this sentence was cancelled
+                self._forget(key, inflight)
+                inflight.task.cancel()
+
+    async def _render(self, sentence: str, key: str, synthesize, persist: bool) -> bytes:
+        audio = await synthesize(sentence)
+        self._store(key, audio)
+        if persist:
+            self._save(key, audio)
+        return audio
+
+    def _forget(self, key: str, inflight: _Inflight) -> None:
+        if self._inflight.get(key) is inflight:
+            del self._inflight[key]
+
+    def _store(self, key: str, audio: bytes) -> None:
+        if key in self._entries:
+            return
+        self._entries[key] = audio
+        self._bytes += len(audio)
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self._counters["evictions"] += 1
+
+    def _load(self, key: str) -> Optional[bytes]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(os.path.join(self.cache_dir, f"{key}.audio"), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _save(self, key: str, audio: bytes) -> None:
+        if not self.cache_dir:
+            return
+        path = os.path.join(self.cache_dir, f"{key}.audio")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(audio)
+        os.replace(tmp_path, path)
+
+
+def load_warmup_phrases(path: Optional[str] = None) -> List[str]:
+    """Read one phrase per line from `path` (or TTS_WARMUP_FILE), else the defaults"""
+    path = path or os.getenv("TTS_WARMUP_FILE")
+    if not path:
+        return list(DEFAULT_WARMUP_PHRASES)
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+async def _warm_up_cli(provider: str, phrases_path: Optional[str]) -> None:
+    from openai import AsyncOpenAI
+    from minimax_service import AsyncMinimaxVoiceService
+
+    cache = TTSCache.from_env()
+    if not cache.cache_dir:
+        raise SystemExit("Set TTS_CACHE_DIR so the warmed audio is persisted")
+    phrases = load_warmup_phrases(phrases_path)
+
+    if provider == "openai":
+        client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+        async def synthesize(text: str) -> bytes:
+            return (await client.audio.speech.create(model="tts-1", voice="nova", input=text)).content
+
+        warmed = await cache.warm_up(phrases, synthesize, provider="openai", model="tts-1", voice_id="nova")
+        await client.close()
+    else:
+        minimax = AsyncMinimaxVoiceService()
+        warmed = await cache.warm_up(
+            phrases, minimax.text_to_speech,
+            provider="minimax", model="speech-02-hd", voice_id=minimax.voice_id
+        )
+        await minimax.aclose()
+
+    print(f"Warmed {warmed}/{len(phrases)} phrases into {cache.cache_dir} ({cache.stats()})")
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Pre-render TTS phrases into TTS_CACHE_DIR")
+    parser.add_argument("--provider", choices=["openai", "minimax"], default="minimax")
+    parser.add_argument("--phrases", help="file with one phrase per line (default: built-in list)")
+    args = parser.parse_args()
+    asyncio.run(_warm_up_cli(args.provider, args.phrases))
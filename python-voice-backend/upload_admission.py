@@ -0,0 +1,385 @@
+"""
+Upload admission control
+Refuses audio uploads that are too large, aren't a supported codec or run
+past the duration limit from Content-Length and the first bytes of the body,
+before the multipart parser has buffered (or spooled) the rest of it
+"""
+
+import os
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Dict, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+# Boundaries, part headers and the small form fields around the audio part
+MULTIPART_OVERHEAD = 64 * 1024
+# Body prefix scanned for the audio part while the request is streaming in
+HEAD_BYTES = 64 * 1024
+# Enough of the audio part to see the container header; more only for big ID3 tags
+SNIFF_BYTES = 4096
+# Ogg streams carry their length in the granule position of the last page
+TAIL_BYTES = 64 * 1024
+# Rest of a rejected body read and dropped so the client, which is usually
+# still sending it, gets the error response instead of a connection reset
+DRAIN_BYTES = 64 * 1024 * 1024
+
+CONTENT_TYPES = {"wav": "audio/wav", "webm": "audio/webm", "ogg": "audio/ogg", "mp3": "audio/mpeg"}
+
+_MP3_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_RATES = (44100, 48000, 32000)
+
+_EBML = 0x1A45DFA3
+_SEGMENT = 0x18538067
+_INFO = 0x1549A966
+_CLUSTER = 0x1F43B675
+_TIMECODE_SCALE = 0x2AD7B1
+_DURATION = 0x4489
+
+
+class UploadRejected(HTTPException):
+    """An upload refused by admission control; `reason` labels the metric"""
+
+    def __init__(self, status_code: int, reason: str, detail: str):
+        super().__init__(status_code=status_code, detail=detail)
+        self.reason = reason
+
+
+@dataclass
+class AudioInfo:
+    codec: str
+    content_type: str
+    seconds: Optional[float] = None  # None when the container doesn't say
+
+
+def _mp3_frame(head: bytes, pos: int):
+    """(bitrate bits/s, sample rate, samples per frame, side info bytes) of the frame at `pos`, or None"""
+    if len(head) < pos + 4 or head[pos] != 0xFF or head[pos + 1] & 0xE0 != 0xE0:
+        return None
+    version = (head[pos + 1] >> 3) & 3  # 3 MPEG-1, 2 MPEG-2, 0 MPEG-2.5
+    layer = (head[pos + 1] >> 1) & 3  # 1 is Layer III
+    bitrate_index = head[pos + 2] >> 4
+    rate_index = (head[pos + 2] >> 2) & 3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _MP3_BITRATES[1 if mpeg1 else 2][bitrate_index] * 1000
+    rate = _MP3_RATES[rate_index] // (1 if mpeg1 else 2 if version == 2 else 4)
+    mono = head[pos + 3] >> 6 == 3
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    return bitrate, rate, 1152 if mpeg1 else 576, side_info
+
+
+def _id3_size(head: bytes) -> int:
+    """Bytes taken by a leading ID3v2 tag (0 if there is none)"""
+    if head[:3] != b"ID3" or len(head) < 10:
+        return 0
+    size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+    return 10 + size + (10 if head[5] & 0x10 else 0)
+
+
+def sniff(head: bytes) -> Optional[str]:
+    """Codec from the first bytes of an upload (wav, webm, ogg or mp3), None if unsupported"""
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if int.from_bytes(head[:4], "big") == _EBML:
+        return "webm"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:3] == b"ID3" or _mp3_frame(head, 0):
+        return "mp3"
+    return None
+
+
+def _wav_seconds(head: bytes, size: Optional[int]) -> Optional[float]:
+    pos, byte_rate = 12, None
+    while pos + 8 <= len(head):
+        chunk, length = head[pos:pos + 4], int.from_bytes(head[pos + 4:pos + 8], "little")
+        pos += 8
+        if chunk == b"fmt " and pos + 12 <= len(head):
+            byte_rate = int.from_bytes(head[pos + 8:pos + 12], "little")
+        elif chunk == b"data":
+            if not byte_rate:
+                return None
+            # Streaming writers leave the size at 0 or 0xFFFFFFFF until they finish
+            if size is not None and (length in (0, 0xFFFFFFFF) or length > size - pos):
+                length = size - pos
+            elif length in (0, 0xFFFFFFFF):
+                return None
+            return length / byte_rate
+        pos += length + (length & 1)
+    return None
+
+
+def _mp3_seconds(head: bytes, size: Optional[int]) -> Optional[float]:
+    pos = _id3_size(head)
+    frame = _mp3_frame(head, pos)
+    if frame is None:
+        return None
+    bitrate, rate, samples, side_info = frame
+    # A Xing/Info or VBRI header in the first frame gives the frame count
+    xing = pos + 4 + side_info
+    if head[xing:xing + 4] in (b"Xing", b"Info") and len(head) >= xing + 12:
+        if int.from_bytes(head[xing + 4:xing + 8], "big") & 1:
+            return int.from_bytes(head[xing + 8:xing + 12], "big") * samples / rate
+    vbri = pos + 36
+    if head[vbri:vbri + 4] == b"VBRI" and len(head) >= vbri + 18:
+        return int.from_bytes(head[vbri + 14:vbri + 18], "big") * samples / rate
+    if size is None:
+        return None
+    return (size - pos) * 8 / bitrate
+
+
+def _ogg_seconds(head: bytes, tail: bytes) -> Optional[float]:
+    if len(head) < 27:
+        return None
+    payload = head[27 + head[26]:]
+    if payload[:8] == b"OpusHead":
+        rate, pre_skip = 48000, int.from_bytes(payload[10:12], "little")
+    elif payload[:7] == b"\x01vorbis":
+        rate, pre_skip = int.from_bytes(payload[12:16], "little"), 0
+    else:
+        return None
+    end = len(tail)
+    while rate and (end := tail.rfind(b"OggS", 0, end)) >= 0:
+        granule = int.from_bytes(tail[end + 6:end + 14], "little")
+        # -1 marks a page on which no packet ends
+        if len(tail) >= end + 14 and granule != 2 ** 64 - 1:
+            return max(granule - pre_skip, 0) / rate
+    return None
+
+
+def _ebml_id(data: bytes, pos: int) -> Tuple[int, int]:
+    width = 8 - data[pos].bit_length() + 1
+    if width > 4:
+        raise ValueError("invalid EBML id")
+    return int.from_bytes(data[pos:pos + width], "big"), pos + width
+
+
+def _ebml_size(data: bytes, pos: int) -> Tuple[Optional[int], int]:
+    width = 8 - data[pos].bit_length() + 1
+    if width > 8:
+        raise ValueError("invalid EBML size")
+    value = int.from_bytes(data[pos:pos + width], "big") & ((1 << (7 * width)) - 1)
+    return (None if value == (1 << (7 * width)) - 1 else value), pos + width
+
+
+def _webm_seconds(head: bytes) -> Optional[float]:
+    """Segment Info Duration; MediaRecorder output usually has none"""
+    try:
+        element, pos = _ebml_id(head, 0)
+        size, pos = _ebml_size(head, pos)
+        element, pos = _ebml_id(head, pos + size)
+        if element != _SEGMENT:
+            return None
+        _, pos = _ebml_size(head, pos)
+        while pos < len(head):
+            element, pos = _ebml_id(head, pos)
+            size, pos = _ebml_size(head, pos)
+            if element == _CLUSTER or size is None:
+                return None
+            if element == _INFO:
+                end, scale, duration = pos + size, 1_000_000, None
+                if end > len(head):
+                    return None
+                while pos < end:
+                    child, pos = _ebml_id(head, pos)
+                    length, pos = _ebml_size(head, pos)
+                    value = head[pos:pos + length]
+                    if child == _TIMECODE_SCALE:
+                        scale = int.from_bytes(value, "big")
+                    elif child == _DURATION and length in (4, 8):
+                        duration = struct.unpack(">f" if length == 4 else ">d", value)[0]
+                    pos += length
+                return duration * scale / 1e9 if duration is not None else None
+            pos += size
+    except (IndexError, ValueError, struct.error):
+        pass
+    return None
+
+
+def inspect(head: bytes, size: Optional[int] = None, tail: bytes = b"") -> Optional[AudioInfo]:
+    """
+    Codec and container-declared duration of an upload.
+
+    Args:
+        head: The first bytes of the audio
+        size: Total audio bytes, when known (CBR MP3 and unfinished WAV headers)
+        tail: The last bytes of the audio (Ogg)
+
+    Returns:
+        AudioInfo, or None when the bytes aren't a supported codec
+    """
+    codec = sniff(head)
+    if codec is None:
+        return None
+    if codec == "wav":
+        seconds = _wav_seconds(head, size)
+    elif codec == "mp3":
+        seconds = _mp3_seconds(head, size)
+    elif codec == "ogg":
+        seconds = _ogg_seconds(head, tail)
+    else:
+        seconds = _webm_seconds(head)
+    return AudioInfo(codec, CONTENT_TYPES[codec], seconds)
+
+
+class UploadAdmission:
+    """
+    Upload limits, checked at three points: the Content-Length header, the
+    audio part's first bytes as they stream in, and the parsed file.
+
+    Args:
+        max_bytes: Largest audio file accepted
+        max_seconds: Longest audio accepted (by container header; 0 disables)
+        observer: Called as observer(reason, phase) for every rejection
+    """
+
+    def __init__(self, max_bytes: int, max_seconds: float = 300.0, observer: Optional[Callable[[str, str], None]] = None):
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.observer = observer
+        self._rejections: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls, max_bytes: int, observer=None) -> "UploadAdmission":
+        """MAX_AUDIO_SECONDS (0 disables the duration limit)"""
+        return cls(max_bytes, float(os.getenv("MAX_AUDIO_SECONDS", "300")), observer)
+
+    @property
+    def max_request_bytes(self) -> int:
+        return self.max_bytes + MULTIPART_OVERHEAD
+
+    def reject(self, status_code: int, reason: str, detail: str, phase: str) -> UploadRejected:
+        key = f"{phase}:{reason}"
+        self._rejections[key] = self._rejections.get(key, 0) + 1
+        if self.observer:
+            self.observer(reason, phase)
+        return UploadRejected(status_code, reason, detail)
+
+    def too_large(self, phase: str) -> UploadRejected:
+        return self.reject(413, "too_large", f"File too large. Maximum {self.max_bytes // (1024 * 1024)}MB allowed.", phase)
+
+    def check(self, head: bytes, phase: str, size: Optional[int] = None, tail: bytes = b"") -> Optional[AudioInfo]:
+        """
+        Raise UploadRejected unless `head` is a supported codec within the
+        duration limit. Returns None when `head` is too short to tell.
+        """
+        info = inspect(head, size, tail)
+        if info is None:
+            if len(head) < 12 and size is None:
+                return None
+            raise self.reject(400, "codec", "Unsupported audio format. Allowed: webm, wav, mp3, mpeg, ogg", phase)
+        if self.max_seconds and info.seconds is not None and info.seconds > self.max_seconds:
+            raise self.reject(413, "duration", f"Audio too long. Maximum {self.max_seconds:.0f} seconds allowed.", phase)
+        return info
+
+    def check_file(self, file: BinaryIO, size: int) -> AudioInfo:
+        """Check a parsed (spooled) upload; reads only its first and last few KB"""
+        file.seek(0)
+        head = file.read(HEAD_BYTES)
+        file.seek(max(size - TAIL_BYTES, 0))
+        tail = file.read(TAIL_BYTES)
+        file.seek(0)
+        return self.check(head, "parsed", size, tail)
+
+    def stats(self) -> Dict:
+        return {
+            "max_bytes": self.max_bytes,
+            "max_seconds": self.max_seconds,
+            "rejections": dict(self._rejections),
+        }
+
+
+async def _discard_body(receive, limit: int) -> None:
+    """Read and drop request body messages until the body ends or `limit` bytes"""
+    drained = 0
+    while drained <= limit:
+        message = await receive()
+        if message["type"] != "http.request":
+            return
+        drained += len(message.get("body", b""))
+        if not message.get("more_body", False):
+            return
+
+
+class _BodyGuard:
+    """Counts request body bytes and sniffs the audio part as it arrives"""
+
+    def __init__(self, receive, admission: UploadAdmission):
+        self._receive = receive
+        self.admission = admission
+        self.received = 0
+        self.head = bytearray()
+        self.checked = False
+
+    async def __call__(self):
+        message = await self._receive()
+        if message["type"] == "http.request":
+            body = message.get("body", b"")
+            self.received += len(body)
+            more = message.get("more_body", False)
+            try:
+                if self.received > self.admission.max_request_bytes:
+                    raise self.admission.too_large("stream")
+                if not self.checked:
+                    self.head += body[:HEAD_BYTES - len(self.head)]
+                    self._sniff(final=not more or len(self.head) >= HEAD_BYTES)
+            except UploadRejected:
+                if more:
+                    await _discard_body(self._receive, DRAIN_BYTES)
+                raise
+        return message
+
+    def _sniff(self, final: bool) -> None:
+        marker = self.head.find(b'filename="')
+        end = self.head.find(b"\r\n\r\n", marker) if marker >= 0 else -1
+        if end < 0:
+            # No file part header in sight yet; the parsed file is still checked
+            self.checked = final
+            return
+        audio = bytes(self.head[end + 4:])
+        if len(audio) < SNIFF_BYTES and not final:
+            return
+        self.checked = True
+        self.admission.check(audio, "stream")
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying UploadAdmission to the upload routes.
+
+    A Content-Length over the limit is answered before any of the body is
+    read; a body that runs over it (or whose audio part starts with the
+    wrong magic bytes or declares too long a duration) is abandoned at that
+    point, so the multipart parser never holds more than the limit.
+    """
+
+    def __init__(self, app, admission: UploadAdmission, paths: Sequence[str]):
+        self.app = app
+        self.admission = admission
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        try:
+            length = int(headers.get(b"content-length", b""))
+        except ValueError:
+            length = None
+        if length is not None and length > self.admission.max_request_bytes:
+            rejected = self.admission.too_large("header")
+            # Clients waiting on "Expect: 100-continue" never send the body;
+            # past DRAIN_BYTES the connection is dropped rather than read
+            if headers.get(b"expect", b"").lower() != b"100-continue" and length <= DRAIN_BYTES:
+                await _discard_body(receive, DRAIN_BYTES)
+            response = JSONResponse({"detail": rejected.detail}, status_code=413, headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+        await self.app(scope, _BodyGuard(receive, self.admission), send)
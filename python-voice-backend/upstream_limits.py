@@ -0,0 +1,306 @@
+"""
+Adaptive concurrency limits for upstream providers
+Each provider gets an AIMD limiter: concurrency grows while calls succeed and
+shrinks when the provider signals overload (429/503/timeouts). Excess calls
+wait in a bounded queue; when the queue is full or the estimated wait is too
+long, callers get an immediate ProviderBusy instead of piling on
+"""
+
+import asyncio
+import email.utils
+import os
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+import httpx
+
+from deadline import time_left
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+OVERLOAD_STATUS = {429, 503}
+
+
+class ProviderBusy(Exception):
+    """A provider is saturated; `retry_after` is the estimated wait in seconds"""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} is at capacity (estimated wait {retry_after:.1f}s)")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """HTTP status carried by an upstream error (OpenAI SDK, Minimax, httpx)"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_timeout(error: BaseException) -> bool:
+    return isinstance(error, (httpx.TimeoutException, asyncio.TimeoutError)) or "Timeout" in type(error).__name__
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Parse Retry-After / retry-after-ms from the upstream response, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    millis = headers.get("retry-after-ms")
+    if millis:
+        try:
+            return float(millis) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        # Malformed header: fall back to the default backoff
+        return None
+    return max(parsed.timestamp() - time.time(), 0.0) if parsed else None
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Retries for transient upstream failures.
+
+    Delays use full jitter (uniform between 0 and the exponential cap) unless
+    the upstream sent Retry-After; a Retry-After longer than `max_delay` is
+    not waited out, the error is surfaced instead.
+    """
+    max_attempts: int = 3
+    base_delay: float = 0.25
+    max_delay: float = 4.0
+
+    def delay(self, error: BaseException, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying after `attempt` (0-based), or None to give up"""
+        if attempt + 1 >= self.max_attempts:
+            return None
+        if error_status(error) not in RETRYABLE_STATUS and not is_timeout(error):
+            return None
+        hinted = retry_after_seconds(error)
+        if hinted is not None:
+            return hinted if hinted <= self.max_delay else None
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter with a bounded, deadline-aware wait queue.
+
+    Args:
+        name: Provider name (used in errors and stats)
+        initial_limit / min_limit / max_limit: Concurrency bounds
+        max_queue: Callers allowed to wait for a slot
+        max_wait: Longest a caller may wait; callers whose estimated wait is
+            longer are rejected up front. Inside a deadline stage, never
+            longer than what is left of its budget
+        backoff_ratio: Multiplicative decrease applied on overload
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        max_queue: int = 32,
+        max_wait: float = 10.0,
+        backoff_ratio: float = 0.7,
+    ):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.backoff_ratio = backoff_ratio
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._avg_latency = 1.0
+        self._last_decrease = 0.0
+        self._counters = {"admitted": 0, "queued": 0, "rejected": 0, "overloads": 0, "retries": 0}
+
+    @classmethod
+    def from_env(cls, name: str) -> "AdaptiveLimiter":
+        prefix = f"{name.upper()}_LIMIT_"
+        return cls(
+            name,
+            initial_limit=int(os.getenv(prefix + "INITIAL", "8")),
+            max_limit=int(os.getenv(prefix + "MAX", "64")),
+            max_queue=int(os.getenv(prefix + "QUEUE", "32")),
+            max_wait=float(os.getenv("UPSTREAM_MAX_QUEUE_WAIT", "10")),
+        )
+
+    def estimated_wait(self, position: Optional[int] = None) -> float:
+        """Expected seconds until a caller at `position` in the queue gets a slot"""
+        if position is None:
+            position = len(self._waiters)
+        return (position + 1) * self._avg_latency / max(self.limit, 1.0)
+
+    async def acquire(self, max_wait: Optional[float] = None) -> None:
+        max_wait = min(self.max_wait if max_wait is None else max_wait, time_left())
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self._counters["admitted"] += 1
+            return
+
+        estimate = self.estimated_wait()
+        if len(self._waiters) >= self.max_queue or estimate > max_wait:
+            self._counters["rejected"] += 1
+            raise ProviderBusy(self.name, estimate)
+
+        self._counters["queued"] += 1
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait({waiter}, timeout=max_wait)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        if not waiter.done():
+            self._abandon(waiter)
+            self._counters["rejected"] += 1
+            raise ProviderBusy(self.name, self.estimated_wait())
+        self._counters["admitted"] += 1
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        if waiter.done() and not waiter.cancelled():
+            # The slot was handed over just as the caller gave up
+            self.release()
+            return
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False) -> None:
+        self.in_flight -= 1
+        now = time.monotonic()
+        if overloaded:
+            self._counters["overloads"] += 1
+            # Back off at most once per typical call duration so one burst of
+            # 429s doesn't collapse the limit to the floor
+            if now - self._last_decrease >= self._avg_latency:
+                self.limit = max(float(self.min_limit), self.limit * self.backoff_ratio)
+                self._last_decrease = now
+        elif latency is not None:
+            self._avg_latency = 0.9 * self._avg_latency + 0.1 * latency
+            # Additive increase: about +1 per `limit` successful calls
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    async def call(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        retry: Optional[RetryPolicy] = None,
+        max_wait: Optional[float] = None,
+    ) -> T:
+        """
+        Run `fn()` inside a concurrency slot, retrying transient failures.
+
+        Raises ProviderBusy when no slot is available in time, or when the
+        provider is still overloaded after the last retry.
+        """
+        retry = retry or RetryPolicy()
+        attempt = 0
+        while True:
+            await self.acquire(max_wait)
+            started = time.perf_counter()
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                self.release()
+                raise
+            except Exception as e:
+                overloaded = error_status(e) in OVERLOAD_STATUS or is_timeout(e)
+                # Plain failures neither grow nor shrink the limit
+                self.release(overloaded=overloaded)
+                delay = retry.delay(e, attempt)
+                if delay is None:
+                    if overloaded:
+                        raise ProviderBusy(self.name, retry_after_seconds(e) or self.estimated_wait()) from e
+                    raise
+                self._counters["retries"] += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self.release(time.perf_counter() - started)
+            return result
+
+    async def stream(
+        self,
+        open_stream: Callable[[], AsyncIterator[T]],
+        retry: Optional[RetryPolicy] = None,
+        max_wait: Optional[float] = None,
+    ) -> AsyncIterator[T]:
+        """
+        Hold a slot for the whole life of a streamed call.
+
+        Failures are retried only before the first item has been yielded;
+        after that the caller has already seen partial output.
+        """
+        retry = retry or RetryPolicy()
+        attempt = 0
+        while True:
+            await self.acquire(max_wait)
+            started = time.perf_counter()
+            yielded = False
+            iterator = open_stream()
+            try:
+                async for item in iterator:
+                    yielded = True
+                    yield item
+            except Exception as e:
+                overloaded = error_status(e) in OVERLOAD_STATUS or is_timeout(e)
+                # Plain failures neither grow nor shrink the limit
+                self.release(overloaded=overloaded)
+                delay = None if yielded else retry.delay(e, attempt)
+                if delay is None:
+                    if overloaded and not yielded:
+                        raise ProviderBusy(self.name, retry_after_seconds(e) or self.estimated_wait()) from e
+                    raise
+                self._counters["retries"] += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self.release()
+                raise
+            finally:
+                if hasattr(iterator, "aclose"):
+                    await iterator.aclose()
+            self.release(time.perf_counter() - started)
+            return
+
+    def stats(self) -> Dict:
+        return {
+            **self._counters,
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued_now": len(self._waiters),
+            "avg_latency": round(self._avg_latency, 3),
+            "estimated_wait": round(self.estimated_wait(), 3),
+        }
@@ -0,0 +1,209 @@
+"""
+Full-duplex voice session primitives
+Bounded PCM ring buffer, energy-based endpoint detection and per-connection
+session state for the /ws/voice-session WebSocket endpoint
+"""
+
+import io
+import os
+import wave
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+SAMPLE_WIDTH = 2  # PCM16 little-endian mono
+# Rates a client may stream at; anything else is refused before buffers are sized
+SAMPLE_RATES = (8000, 11025, 12000, 16000, 22050, 24000, 32000, 44100, 48000)
+
+
+def parse_sample_rate(value) -> int:
+    """
+    Validate a client-supplied sample rate.
+
+    Raises:
+        ValueError: `value` is not one of SAMPLE_RATES
+    """
+    rate = None
+    if isinstance(value, int) and not isinstance(value, bool):
+        rate = value
+    elif isinstance(value, str) and value.strip().isdigit():
+        rate = int(value)
+    if rate not in SAMPLE_RATES:
+        raise ValueError(f"Unsupported sample_rate {value!r}. Allowed: {', '.join(map(str, SAMPLE_RATES))}")
+    return rate
+
+
+class PCMRingBuffer:
+    """Fixed-capacity byte ring buffer; the oldest audio is dropped on overflow"""
+
+    def __init__(self, capacity_bytes: int):
+        # Keep whole samples so a wrapped read never splits one in half
+        self.capacity = capacity_bytes - capacity_bytes % SAMPLE_WIDTH
+        self._buf = bytearray(self.capacity)
+        self._start = 0
+        self._size = 0
+        self.dropped_bytes = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def write(self, data: bytes) -> None:
+        if len(data) >= self.capacity:
+            self.dropped_bytes += self._size + len(data) - self.capacity
+            self._buf[:] = data[-self.capacity:]
+            self._start, self._size = 0, self.capacity
+            return
+
+        overflow = self._size + len(data) - self.capacity
+        if overflow > 0:
+            self._start = (self._start + overflow) % self.capacity
+            self._size -= overflow
+            self.dropped_bytes += overflow
+
+        end = (self._start + self._size) % self.capacity
+        first = min(len(data), self.capacity - end)
+        self._buf[end:end + first] = data[:first]
+        self._buf[:len(data) - first] = data[first:]
+        self._size += len(data)
+
+    def keep_last(self, nbytes: int) -> None:
+        """Discard everything except the most recent `nbytes`"""
+        nbytes -= nbytes % SAMPLE_WIDTH
+        if self._size > nbytes:
+            self._start = (self._start + self._size - nbytes) % self.capacity
+            self._size = nbytes
+
+    def read_all(self) -> bytes:
+        end = self._start + self._size
+        if end <= self.capacity:
+            return bytes(self._buf[self._start:end])
+        return bytes(self._buf[self._start:]) + bytes(self._buf[:end - self.capacity])
+
+    def clear(self) -> None:
+        self._start = 0
+        self._size = 0
+
+
+class EnergyEndpointDetector:
+    """
+    Frame-energy voice activity detector.
+
+    Speech starts after `min_speech_ms` of frames above the noise floor, and
+    the utterance ends after `end_silence_ms` of quiet frames. The noise floor
+    tracks the background level with a slow moving average so the detector
+    adapts to different microphones.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 20,
+        min_speech_ms: int = 160,
+        end_silence_ms: int = 700,
+        threshold_ratio: float = 3.0,
+        min_rms: float = 200.0,
+    ):
+        self.frame_bytes = sample_rate * frame_ms // 1000 * SAMPLE_WIDTH
+        self.frame_ms = frame_ms
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.end_silence_frames = max(1, end_silence_ms // frame_ms)
+        self.threshold_ratio = threshold_ratio
+        self.min_rms = min_rms
+
+        self.noise_floor = min_rms
+        self.in_speech = False
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._remainder = b""
+
+    def process(self, pcm: bytes) -> List[str]:
+        """
+        Feed PCM16 audio and return detector events in order.
+
+        Events are "speech_start" and "endpoint".
+        """
+        data = self._remainder + pcm
+        usable = len(data) - len(data) % self.frame_bytes
+        self._remainder = data[usable:]
+        if not usable:
+            return []
+
+        samples = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32)
+        frames = samples.reshape(-1, self.frame_bytes // SAMPLE_WIDTH)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+
+        events = []
+        for level in rms:
+            voiced = level > max(self.noise_floor * self.threshold_ratio, self.min_rms)
+            if not voiced and not self.in_speech:
+                self.noise_floor = 0.95 * self.noise_floor + 0.05 * max(level, 1.0)
+
+            if not self.in_speech:
+                self._voiced_run = self._voiced_run + 1 if voiced else 0
+                if self._voiced_run >= self.min_speech_frames:
+                    self.in_speech = True
+                    self._silent_run = 0
+                    events.append("speech_start")
+            else:
+                self._silent_run = 0 if voiced else self._silent_run + 1
+                if self._silent_run >= self.end_silence_frames:
+                    self.in_speech = False
+                    self._voiced_run = 0
+                    events.append("endpoint")
+        return events
+
+    def reset(self) -> None:
+        self.in_speech = False
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._remainder = b""
+
+
+def pcm_to_wav(pcm: bytes, sample_rate: int) -> bytes:
+    """Wrap raw PCM16 mono audio in a WAV container"""
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(SAMPLE_WIDTH)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return out.getvalue()
+
+
+MAX_UTTERANCE_SECONDS = int(os.getenv("VOICE_SESSION_MAX_SECONDS", "30"))
+PREROLL_MS = 300
+
+
+@dataclass
+class VoiceSession:
+    """State that lives for the lifetime of one WebSocket connection"""
+    user_id: str = ""
+    session_id: str = ""
+    provider: str = "openai"
+    sample_rate: int = 16000
+    buffer: Optional[PCMRingBuffer] = None
+    detector: Optional[EnergyEndpointDetector] = None
+
+    def __post_init__(self):
+        self.sample_rate = parse_sample_rate(self.sample_rate)
+        bytes_per_second = self.sample_rate * SAMPLE_WIDTH
+        self.buffer = PCMRingBuffer(MAX_UTTERANCE_SECONDS * bytes_per_second)
+        self.detector = EnergyEndpointDetector(sample_rate=self.sample_rate)
+        self.preroll_bytes = PREROLL_MS * bytes_per_second // 1000
+
+    def push_audio(self, pcm: bytes) -> List[str]:
+        """Buffer an incoming frame and return VAD events"""
+        self.buffer.write(pcm)
+        events = self.detector.process(pcm)
+        if not self.detector.in_speech and "endpoint" not in events:
+            # Between utterances only a short pre-roll is worth keeping
+            self.buffer.keep_last(self.preroll_bytes)
+        return events
+
+    def take_utterance(self) -> bytes:
+        """Return the buffered utterance as WAV and reset for the next turn"""
+        pcm = self.buffer.read_all()
+        self.buffer.clear()
+        self.detector.reset()
+        return pcm_to_wav(pcm, self.sample_rate)
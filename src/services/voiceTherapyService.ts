@@ -18,11 +18,12 @@ export interface VoiceSafetyData {
 export interface VoiceTherapyResponse {
   transcript: string;
   response: string;
-  audio_url: string;
+  audio_url: string | null; // null when the reply came back text only
   safety: VoiceSafetyData;
   wbc_score: number;
   risk_level: string;
   crisis_detected: boolean;
+  degraded?: string[] | null; // e.g. "llm:short_reply", "tts:text_only"
 }
 
 export class VoiceTherapyService {